@@ -0,0 +1,53 @@
+"""Time of computing `delta_t_hist` with the former per-point loop and the
+exact and approximate (FFT) methods, and the error of the approximation.
+
+Usage: python benchmarks/bench_delta_t_hist.py [max_loop_points]
+
+The per-point loop is only timed for series of up to `max_loop_points`
+(default 10000) points.
+"""
+import sys
+import time
+
+import numpy as np
+
+from cesium.features import cadence_features as cf
+
+
+def delta_t_hist_loop(t, nbins=50):
+    """Former implementation: two histograms per point."""
+    hist = np.zeros(nbins, dtype='int')
+    bins = np.linspace(0, max(t) - min(t), nbins+1)
+    for i in range(len(t)):
+        hist += np.histogram(t[i] - t[:i], bins=bins)[0]
+        hist += np.histogram(t[i+1:] - t[i], bins=bins)[0]
+    return hist / 2
+
+
+def timed(func, *args, **kwargs):
+    tic = time.time()
+    result = func(*args, **kwargs)
+    return result, time.time() - tic
+
+
+def main(max_loop_points=10000):
+    rng = np.random.RandomState(0)
+    print("{:>8} {:>10} {:>10} {:>10} {:>12}".format(
+        'n', 'loop (s)', 'exact (s)', 'fft (s)', 'fft error'))
+    for n in (1000, 10000, 100000):
+        # Nightly observations with gaps, as in ground-based surveys
+        t = np.sort(rng.randint(0, 3 * n, n) + rng.uniform(0, 0.3, n))
+        if n <= max_loop_points:
+            loop_time = '{:10.3f}'.format(timed(delta_t_hist_loop, t)[1])
+        else:
+            loop_time = '{:>10}'.format('-')
+        exact, exact_time = timed(cf.delta_t_hist, t, method='exact')
+        approx, fft_time = timed(cf.delta_t_hist, t, method='fft')
+        # Fraction of pairs assigned to a different bin
+        error = np.abs(approx - exact).sum() / (2 * exact.sum())
+        print("{:8d} {} {:10.3f} {:10.4f} {:12.2e}".format(
+            n, loop_time, exact_time, fft_time, error))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,43 @@
+"""Per-series overhead of the dask graph vs. a pre-compiled `FeaturePlan`.
+
+Usage: python benchmarks/bench_feature_plan.py [n_series] [n_points]
+"""
+import sys
+import time
+
+import dask.async
+import numpy as np
+
+from cesium.features import (CADENCE_FEATS, GENERAL_FEATS, FeaturePlan,
+                             generate_dask_graph)
+
+
+def main(n_series=500, n_points=30):
+    rng = np.random.RandomState(0)
+    series = [(np.sort(rng.uniform(0, 10, n_points)),
+               rng.normal(size=n_points), rng.exponential(0.1, n_points))
+              for i in range(n_series)]
+    features = [f for f in CADENCE_FEATS + GENERAL_FEATS
+                if f not in ('period_fast', 'qso_log_chi2_qsonu',
+                             'qso_log_chi2nuNULL_chi2nu')]
+
+    tic = time.time()
+    for t, m, e in series:
+        dask.async.get_sync(generate_dask_graph(t, m, e), features)
+    dask_time = (time.time() - tic) / n_series
+
+    tic = time.time()
+    plan = FeaturePlan(features)
+    for t, m, e in series:
+        plan.run(t, m, e)
+    plan_time = (time.time() - tic) / n_series
+
+    print("{} series x {} points, {} features".format(n_series, n_points,
+                                                      len(features)))
+    print("dask graph:   {:8.1f} us/series".format(1e6 * dask_time))
+    print("FeaturePlan:  {:8.1f} us/series".format(1e6 * plan_time))
+    print("speedup:      {:8.2f}x".format(dask_time / plan_time))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
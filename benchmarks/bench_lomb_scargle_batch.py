@@ -0,0 +1,43 @@
+"""Time of fitting `lomb_scargle_model` to k time series sharing the same
+time and error values, one series at a time vs. with
+`lomb_scargle_model_batch`.
+
+Usage: python benchmarks/bench_lomb_scargle_batch.py [n_points] [baseline]
+"""
+import sys
+import time
+
+import numpy as np
+
+from cesium.features.lomb_scargle import (lomb_scargle_model,
+                                          lomb_scargle_model_batch)
+
+
+N_SERIES = [1, 4, 16, 64]
+
+
+def main(n_points=500, baseline=100.):
+    rng = np.random.RandomState(0)
+    t = np.sort(rng.uniform(0, float(baseline), int(n_points)))
+    e = np.full(len(t), 0.2)
+    print("{} points, baseline {}".format(len(t), baseline))
+    print("{:>8} {:>12} {:>12} {:>8}".format(
+        'series', 'single (s)', 'batch (s)', 'speedup'))
+    for n_series in N_SERIES:
+        signals = np.array([np.sin(2 * np.pi * rng.uniform(0.1, 5) * t) +
+                            rng.normal(scale=0.5, size=len(t))
+                            for i in range(n_series)])
+        tic = time.time()
+        single = [lomb_scargle_model(t, m, e) for m in signals]
+        single_time = time.time() - tic
+        tic = time.time()
+        batch = lomb_scargle_model_batch(t, signals, e)
+        batch_time = time.time() - tic
+        assert all(a['freq_fits'][0]['freq'] == b['freq_fits'][0]['freq']
+                   for a, b in zip(single, batch))
+        print("{:8d} {:12.2f} {:12.2f} {:8.2f}".format(
+            n_series, single_time, batch_time, single_time / batch_time))
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
@@ -0,0 +1,85 @@
+"""Accuracy vs. speed of the coarse-to-fine frequency search of
+`lomb_scargle_model` (`n_candidates`, with candidates selected by a coarse
+grid search or by the fast periodogram) on the ASAS training set, compared
+to refining the full frequency grid, and of the candidate-restricted
+prewhitening searches for freq2/freq3 (`prewhiten_candidates`).
+
+The data are loaded with `datasets.fetch_asas_training` from `data_dir`
+(which should contain a previously downloaded copy).
+
+Usage: python benchmarks/bench_lomb_scargle_grid.py data_dir [n_series]
+"""
+import itertools
+import sys
+import time
+
+import numpy as np
+
+from cesium.datasets import fetch_asas_training
+from cesium.features.lomb_scargle import lomb_scargle_model
+
+
+CANDIDATES = [1, 3, 10]
+PREWHITEN_CANDIDATES = [3, 10, 30]
+OVERSAMPLING = [None, 5.]
+
+
+def fit_all(series, **kwargs):
+    tic = time.time()
+    models = [lomb_scargle_model(t, m, e, **kwargs) for t, m, e in series]
+    return models, (time.time() - tic) / len(series)
+
+
+def main(data_dir, n_series=None):
+    data = fetch_asas_training(data_dir)
+    series = list(zip(data['times'], data['measurements'], data['errors']))
+    if n_series is not None:
+        series = series[:int(n_series)]
+    print("{} ASAS light curves, median {:.0f} points".format(
+        len(series), np.median([len(t) for t, m, e in series])))
+    print("{:>12} {:>10} {:>6} {:>10} {:>8} {:>10} {:>12}".format(
+        'oversampling', 'candidates', 'method', 'ms/series', 'speedup',
+        'freq1 same', 'amp1 reldiff'))
+    for oversampling in OVERSAMPLING:
+        full, full_time = fit_all(series, oversampling=oversampling)
+        freq = np.array([model['freq_fits'][0]['freq'] for model in full])
+        amp = np.array([model['freq_fits'][0]['amplitude'][0]
+                        for model in full])
+        print("{:>12} {:>10} {:>6} {:10.1f} {:8.2f} {:>10} {:>12}".format(
+            oversampling or 1.25, 'all', '', 1e3 * full_time, 1., '', ''))
+        for n_candidates, fast in itertools.product(CANDIDATES,
+                                                    [False, True]):
+            models, elapsed = fit_all(series, oversampling=oversampling,
+                                      n_candidates=n_candidates,
+                                      fast_candidates=fast)
+            freq_c = np.array([model['freq_fits'][0]['freq']
+                               for model in models])
+            amp_c = np.array([model['freq_fits'][0]['amplitude'][0]
+                              for model in models])
+            same = np.isclose(freq_c, freq, rtol=1e-6)
+            print("{:>12} {:10d} {:>6} {:10.1f} {:8.2f} {:9.1f}% {:12.2e}".format(
+                oversampling or 1.25, n_candidates, 'fft' if fast else 'grid',
+                1e3 * elapsed,
+                full_time / elapsed, 100. * same.mean(),
+                np.median(np.abs(amp_c - amp) / np.abs(amp))))
+
+    print("{:>12} {:>10} {:>8} {:>10} {:>10}".format(
+        'prewhiten', 'ms/series', 'speedup', 'freq2 same', 'freq3 same'))
+    full, full_time = fit_all(series)
+    freqs = np.array([[fit['freq'] for fit in model['freq_fits']]
+                      for model in full])
+    print("{:>12} {:10.1f} {:8.2f} {:>10} {:>10}".format(
+        'all', 1e3 * full_time, 1., '', ''))
+    for prewhiten_candidates in PREWHITEN_CANDIDATES:
+        models, elapsed = fit_all(series,
+                                  prewhiten_candidates=prewhiten_candidates)
+        freqs_c = np.array([[fit['freq'] for fit in model['freq_fits']]
+                            for model in models])
+        same = np.isclose(freqs_c, freqs, rtol=1e-6).mean(axis=0)
+        print("{:>12} {:10.1f} {:8.2f} {:9.1f}% {:9.1f}%".format(
+            prewhiten_candidates, 1e3 * elapsed, full_time / elapsed,
+            100. * same[1], 100. * same[2]))
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
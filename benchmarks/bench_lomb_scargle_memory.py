@@ -0,0 +1,60 @@
+"""Peak memory of Lomb-Scargle model uncertainties for long time series.
+
+Compares the dense (ntime, ntime) covariance product previously used to
+obtain `model_error`/`trend_error` with the diagonal-only computation now
+used by `fit_lomb_scargle(..., model_error=True)`.
+
+Usage: python benchmarks/bench_lomb_scargle_memory.py [ntime ...]
+"""
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from cesium.features import lomb_scargle
+
+
+def peak_memory(func, *args, **kwargs):
+    tracemalloc.start()
+    tic = time.time()
+    func(*args, **kwargs)
+    elapsed = time.time() - tic
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak, elapsed
+
+
+def dense_diag(a, b):
+    return np.diag(np.dot(b.T, np.dot(a, b)))
+
+
+def main(sizes=(1000, 5000, 10000, 50000), nharm=8):
+    rng = np.random.RandomState(0)
+    print("{:>8} {:>14} {:>14} {:>14}".format('ntime', 'dense (MB)',
+                                              'diagonal (MB)', 'fit (MB)'))
+    for ntime in sizes:
+        hat_hat = rng.normal(size=(2 * nharm, 2 * nharm))
+        hat_matr = rng.normal(size=(2 * nharm, ntime))
+        # Dense products beyond ~1GB are extrapolated rather than allocated
+        if 8 * ntime ** 2 < 2 ** 30:
+            dense = peak_memory(dense_diag, hat_hat, hat_matr)[0] / 2. ** 20
+        else:
+            dense = 2 * 8 * ntime ** 2 / 2. ** 20
+        diag = peak_memory(lomb_scargle._diag_quad_form, hat_hat,
+                           hat_matr)[0] / 2. ** 20
+
+        t = np.sort(rng.uniform(0, 10, ntime))
+        m = np.sin(2 * np.pi * 1.7 * t) + rng.normal(scale=0.1, size=ntime)
+        e = 0.1 * np.ones(ntime)
+        fit = peak_memory(lomb_scargle.fit_lomb_scargle, t, m, e, 0.1, 0.08,
+                          400, nharm=nharm, model_error=True)[0] / 2. ** 20
+        print("{:>8} {:>14.1f} {:>14.1f} {:>14.1f}".format(ntime, dense,
+                                                           diag, fit))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        main([int(arg) for arg in sys.argv[1:]])
+    else:
+        main()
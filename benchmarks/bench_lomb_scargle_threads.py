@@ -0,0 +1,57 @@
+"""Scaling of Lomb-Scargle featurization with the number of threads of a
+`Featurizer(threads=True)` (the compiled kernel releases the GIL), compared
+to the same number of worker processes.
+
+Usage: python benchmarks/bench_lomb_scargle_threads.py [n_series] [n_points]
+"""
+import multiprocessing
+import sys
+import time
+
+import numpy as np
+
+from cesium.featurize import Featurizer, featurize_time_series
+
+
+FEATURES = ['freq1_freq', 'freq1_amplitude1', 'freq2_freq', 'freq3_freq']
+
+
+def featurize_time(featurizer, times, values, errors):
+    featurize_time_series(times[:2], values[:2], errors[:2], FEATURES,
+                          scheduler=featurizer)  # warm up
+    tic = time.time()
+    featurize_time_series(times, values, errors, FEATURES,
+                          scheduler=featurizer)
+    return time.time() - tic
+
+
+def main(n_series=64, n_points=1000):
+    rng = np.random.RandomState(0)
+    times, values, errors = [], [], []
+    for i in range(n_series):
+        t = np.sort(rng.uniform(0, 100, n_points))
+        times.append(t)
+        values.append(np.sin(2 * np.pi * rng.uniform(0.1, 5) * t) +
+                      rng.normal(scale=0.2, size=n_points))
+        errors.append(np.full(n_points, 0.2))
+
+    n_cpus = multiprocessing.cpu_count()
+    counts = sorted({n for n in (1, 2, 4, 8, 16, 32) if n < n_cpus} |
+                    {n_cpus})
+    print("{} series of {} points, {} CPUs".format(n_series, n_points,
+                                                   n_cpus))
+    print("{:>8} {:>12} {:>8} {:>12} {:>8}".format(
+        'workers', 'threads (s)', 'speedup', 'processes (s)', 'speedup'))
+    base = {}
+    for n in counts:
+        row = []
+        for threads in (True, False):
+            with Featurizer(n, threads=threads) as featurizer:
+                elapsed = featurize_time(featurizer, times, values, errors)
+            base.setdefault(threads, elapsed)
+            row += [elapsed, base[threads] / elapsed]
+        print("{:8d} {:12.2f} {:8.2f} {:12.2f} {:8.2f}".format(n, *row))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,86 @@
+"""Cost of `period_folding` with and without reusing the Lomb-Scargle
+frequencies, and the resulting differences in the affected features, on the
+reference light curves shipped with the tests (ASAS and dotastro).
+
+Usage: python benchmarks/bench_period_folding.py
+"""
+import glob
+import os
+import time
+
+import numpy as np
+
+from cesium import data_management, util
+from cesium.features import lomb_scargle, period_folding as pf
+
+
+CESIUM_PATH = os.path.join(os.path.dirname(__file__), os.pardir, 'cesium')
+DATA_FILES = (glob.glob(os.path.join(CESIUM_PATH, 'features', 'tests', 'data',
+                                     '*.dat')) +
+              [os.path.join(CESIUM_PATH, 'tests', 'data', filename)
+               for filename in ['247327.dat', 'dotastro_215153.dat']])
+DATA_ARCHIVES = [os.path.join(CESIUM_PATH, 'tests', 'data', filename)
+                 for filename in ['asas_training_subset.tar.gz',
+                                  '215153_215176_218272_218934.tar.gz']]
+
+
+def light_curves():
+    """Reference light curves, by file name (without duplicates)."""
+    series = {}
+    for path in DATA_FILES:
+        series[os.path.basename(path)] = data_management.parse_ts_data(path)
+    for archive in DATA_ARCHIVES:
+        with util.extract_time_series(archive, cleanup_archive=False,
+                                      cleanup_files=True) as paths:
+            for path in paths:
+                series[os.path.basename(path)] = \
+                    data_management.parse_ts_data(path)
+    return sorted(series.items())
+
+
+def folded_features(t, m, e, lomb_model, reuse_freqs):
+    model = pf.period_folding(t, m, e, lomb_model, reuse_freqs=reuse_freqs)
+    return np.array([
+        pf.get_medperc90_2p_p(model),
+        pf.get_fold2P_slope_percentile(model, 10),
+        pf.get_fold2P_slope_percentile(model, 90)])
+
+
+def main():
+    series = light_curves()
+    models = [lomb_scargle.lomb_scargle_model(*data) for name, data in series]
+
+    results = {}
+    for reuse_freqs in (False, True):
+        tic = time.time()
+        results[reuse_freqs] = [folded_features(*data, lomb_model=model,
+                                                reuse_freqs=reuse_freqs)
+                                for (name, data), model in zip(series, models)]
+        results[reuse_freqs, 'time'] = (time.time() - tic) / len(series)
+
+    full, reuse = np.array(results[False]), np.array(results[True])
+    rel_diff = np.abs(reuse - full) / np.maximum(np.abs(full), 1e-12)
+
+    print("{:24} {:>8} {:>14} {:>14} {:>10}".format(
+        'light curve', 'n', 'full search', 'reused freqs', 'rel. diff'))
+    for (name, data), full_i, reuse_i, diff_i in zip(series, full, reuse,
+                                                     rel_diff):
+        print("{:24} {:8d} {:14.6f} {:14.6f} {:10.2e}".format(
+            name, data.shape[1], full_i[0], reuse_i[0], diff_i[0]))
+    print("")
+    print("full grid search: {:8.1f} ms/series".format(1e3 * results[False, 'time']))
+    print("reused freqs:     {:8.1f} ms/series".format(1e3 * results[True, 'time']))
+    print("speedup:          {:8.2f}x".format(results[False, 'time'] /
+                                             results[True, 'time']))
+    print("")
+    print("relative difference        {:>10} {:>10} {:>10} {:>8}".format(
+        'median', '90%', 'max', 'changed'))
+    for j, name in enumerate(['medperc90_2p_p', 'fold2P_slope_10percentile',
+                              'fold2P_slope_90percentile']):
+        print("{:26} {:10.2e} {:10.2e} {:10.2e} {:5d}/{}".format(
+            name, np.median(rel_diff[:, j]), np.percentile(rel_diff[:, j], 90),
+            rel_diff[:, j].max(), np.sum(rel_diff[:, j] > 1e-8), len(series)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Time per series of the `freq_model_*` features (`periodic_model`) computed
+with `scipy.optimize.fmin` (the previous implementation), and with each
+extrema search method one model at a time and in batches
+(`periodic_model_batch`).
+
+Usage: python benchmarks/bench_periodic_model.py [n_series]
+"""
+import sys
+import time
+
+import numpy as np
+from scipy import optimize
+
+from cesium.features.periodic_model import (harmonic_model, periodic_model,
+                                            periodic_model_batch)
+
+
+def periodic_model_fmin(A, ph):
+    def model_f(t):
+        return harmonic_model(np.atleast_1d(t), A[None], ph[None])[0]
+
+    def model_neg(t):
+        return -1. * model_f(t)
+
+    min_1_a = optimize.fmin(model_neg, 0.05, disp=False)[0]
+    max_2_a = optimize.fmin(model_f, min_1_a + 0.01, disp=False)[0]
+    min_3_a = optimize.fmin(model_neg, max_2_a + 0.01, disp=False)[0]
+    max_4_a = optimize.fmin(model_f, min_3_a + 0.01, disp=False)[0]
+    return min_1_a, max_2_a, min_3_a, max_4_a
+
+
+def best_time(func, repeat=3):
+    times = []
+    for i in range(repeat):
+        tic = time.time()
+        func()
+        times.append(time.time() - tic)
+    return min(times)
+
+
+def main(n_series=1000):
+    rng = np.random.RandomState(0)
+    print("{:>6} {:>12} {:>8} {:>12} {:>12}".format(
+        'nharm', 'fmin (us)', 'method', 'single (us)', 'batch (us)'))
+    for nharm in (4, 8):
+        # Decaying harmonic amplitudes, as for typical fitted models
+        A = rng.uniform(0, 1, (n_series, nharm)) * 0.6**np.arange(nharm)
+        ph = rng.uniform(-np.pi, np.pi, (n_series, nharm))
+        models = [{'freq_fits': [{'amplitude': A_i, 'rel_phase': ph_i}]}
+                  for A_i, ph_i in zip(A, ph)]
+        n_fmin = min(n_series, 100)
+        fmin_time = best_time(lambda: [periodic_model_fmin(A_i, ph_i)
+                                       for A_i, ph_i in zip(A[:n_fmin],
+                                                            ph[:n_fmin])],
+                              repeat=1) / n_fmin
+        for method in ('fmin', 'grid'):
+            single_time = best_time(lambda: [periodic_model(model, method)
+                                             for model in models]) / n_series
+            batch_time = best_time(lambda: periodic_model_batch(
+                A, ph, method)) / n_series
+            print("{:6d} {:12.1f} {:>8} {:12.1f} {:12.1f}".format(
+                nharm, 1e6 * fmin_time, method, 1e6 * single_time,
+                1e6 * batch_time))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
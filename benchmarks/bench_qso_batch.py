@@ -0,0 +1,41 @@
+"""Time per series of the QSO (damped random walk) features computed one
+series at a time (`qso_fit`) and in batches (`qso_fit_batch`), and the
+largest relative difference between the two.
+
+Usage: python benchmarks/bench_qso_batch.py [n_series]
+"""
+import sys
+import time
+
+import numpy as np
+
+from cesium.features import qso_model
+
+
+KEYS = ['log_chi2_qsonu', 'log_chi2nuNULL_chi2nu']
+
+
+def main(n_series=2000):
+    rng = np.random.RandomState(0)
+    print("{:>8} {:>14} {:>14} {:>8} {:>10}".format(
+        'n', 'single (ms)', 'batch (ms)', 'speedup', 'max diff'))
+    for n in (20, 100, 500):
+        t = np.sort(rng.uniform(0, 3000, (n_series, n)), axis=1)
+        m = rng.normal(19, 0.2, (n_series, n))
+        e = rng.uniform(0.01, 0.05, (n_series, n))
+        tic = time.time()
+        single = [qso_model.qso_fit(t_i, m_i, e_i)
+                  for t_i, m_i, e_i in zip(t, m, e)]
+        single_time = (time.time() - tic) / n_series
+        tic = time.time()
+        batch = qso_model.qso_fit_batch(t, m, e, np.full(n_series, n))
+        batch_time = (time.time() - tic) / n_series
+        diff = max(np.max(np.abs(batch[key] - [s[key] for s in single]) /
+                          np.abs(batch[key])) for key in KEYS)
+        print("{:8d} {:14.4f} {:14.4f} {:8.1f} {:10.1e}".format(
+            n, 1e3 * single_time, 1e3 * batch_time, single_time / batch_time,
+            diff))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
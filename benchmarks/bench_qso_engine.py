@@ -0,0 +1,30 @@
+"""Time per call of the QSO (damped random walk) fit `qso_fit` on single long
+series.
+
+Usage: python benchmarks/bench_qso_engine.py
+"""
+import time
+
+import numpy as np
+
+from cesium.features import qso_model
+
+
+def main():
+    rng = np.random.RandomState(0)
+    print("{:>8} {:>12} {:>16}".format('n', 'time (ms)', 'log_chi2_qsonu'))
+    for n in (1000, 10000, 100000):
+        t = np.sort(rng.uniform(0, 3000, n))
+        m = rng.normal(19, 0.2, n)
+        e = rng.uniform(0.01, 0.05, n)
+        reps = max(1, 20000 // n)
+        tic = time.time()
+        for i in range(reps):
+            result = qso_model.qso_fit(t, m, e)
+        elapsed = (time.time() - tic) / reps
+        print("{:8d} {:12.3f} {:16.10f}".format(n, 1e3 * elapsed,
+                                                result['log_chi2_qsonu']))
+
+
+if __name__ == '__main__':
+    main()
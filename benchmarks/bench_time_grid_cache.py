@@ -0,0 +1,43 @@
+"""Time of computing the Cadence/Error features and the Lomb-Scargle model of
+multichannel time series with shared times, with and without the time grid
+cache (`features.time_cache.TIME_GRID_CACHE`).
+
+Usage: python benchmarks/bench_time_grid_cache.py [n_channels] [n_points]
+"""
+import sys
+import time
+
+import dask
+import numpy as np
+
+from cesium.featurize import featurize_time_series
+from cesium.features import CADENCE_FEATS, time_cache
+
+
+FEATURES = {'cadence': CADENCE_FEATS,
+            'lomb-scargle': ['freq1_freq', 'freq2_freq', 'freq3_freq']}
+
+
+def main(n_channels=16, n_points=500):
+    rng = np.random.RandomState(0)
+    t = np.sort(rng.uniform(0, 100, n_points))
+    m = rng.normal(size=(n_channels, n_points))
+    print("{} channels of {} points".format(n_channels, n_points))
+    print("{:>14} {:>12} {:>12} {:>8}".format('features', 'no cache (s)',
+                                              'cache (s)', 'speedup'))
+    cache = time_cache.TIME_GRID_CACHE
+    for name, features in sorted(FEATURES.items()):
+        elapsed = []
+        for max_bytes in (0, 2**26):
+            cache.clear()
+            cache.max_bytes = max_bytes
+            tic = time.time()
+            featurize_time_series(t, m, None, features,
+                                  scheduler=dask.get)
+            elapsed.append(time.time() - tic)
+        print("{:>14} {:12.2f} {:12.2f} {:8.2f}".format(
+            name, elapsed[0], elapsed[1], elapsed[0] / elapsed[1]))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
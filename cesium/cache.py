@@ -0,0 +1,288 @@
+import collections
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+import zlib
+
+import numpy as np
+
+
+__all__ = ['FeatureCache', 'INTERMEDIATE_NODES']
+
+
+# Intermediate nodes of `features.graphs.dask_feature_graph` that are expensive
+# to compute but consumed by cheap getters; see `FeatureCache`
+INTERMEDIATE_NODES = ('_lomb_model', '_period_folded_model', 'qso_model',
+                      'delta_t_hist')
+
+
+def _compact_lomb_model(lomb_model):
+    """Drop the pointwise model values (and errors) of each Lomb-Scargle fit,
+    which are not used by any feature; only the residuals are kept.
+    """
+    lomb_model = dict(lomb_model)
+    lomb_model['freq_fits'] = [
+        {k: v for k, v in fit.items()
+         if k not in ('model', 'trend', 'model_error', 'trend_error')}
+        for fit in lomb_model['freq_fits']]
+    return lomb_model
+
+
+_COMPACT_FUNCTIONS = {'_lomb_model': _compact_lomb_model}
+
+
+# Instances are shared within each process; see `FeatureCache.__reduce__`
+_OPEN_CACHES = {}
+
+
+def _open_cache(path, max_size, memory_items, persist_intermediates=False):
+    """Return the process-wide `FeatureCache` with the given settings."""
+    key = (os.path.abspath(path), max_size, memory_items,
+           persist_intermediates)
+    if key not in _OPEN_CACHES:
+        FeatureCache(path, max_size, memory_items, persist_intermediates)
+    return _OPEN_CACHES[key]
+
+
+class FeatureCache(object):
+    """Content-addressed on-disk cache of feature values.
+
+    Values are stored per channel of a time series, under a key computed from
+    the (t, m, e) arrays and meta features of the channel; within each entry,
+    feature values are identified by the `FeaturePlan.signatures` of the
+    corresponding features, which hash the feature name together with the
+    functions and parameters used to compute it (and its ancestors).
+
+    If `persist_intermediates` is True, the values of the expensive
+    intermediate nodes listed in `INTERMEDIATE_NODES` (e.g. the fitted
+    Lomb-Scargle model) are stored as well, with any data not needed by
+    features removed; later calls requesting other features derived from
+    these nodes then skip the corresponding fits entirely.
+
+    Each feature value is stored in its own small compressed pickle file (in
+    a directory per channel), written atomically via a temporary file and
+    `os.rename`. Files are never read and rewritten, so a cache directory can
+    safely be shared by several processes on the same machine: concurrent
+    writers of the same channel cannot drop each other's values. When the
+    total size of the cache exceeds `max_size`, the least recently used
+    values (by modification time, which is updated on every read) are
+    evicted. Recently used entries are also kept in an in-memory LRU cache of
+    `memory_items` entries.
+
+    Instances can be passed to worker processes: unpickling returns the
+    instance with the same settings that already exists in that process (if
+    any), so that the in-memory cache stays resident between tasks. Note that
+    each process then has its own copy of the instance, and of the hit/miss
+    counters: lookups performed by worker processes (e.g. with the default
+    `dask.multiprocessing.get` scheduler) are not counted by the instance
+    passed to `featurize_time_series`. Use a `featurize.Featurizer` with
+    `threads=True` (or a threaded scheduler) to count all lookups.
+
+    Parameters
+    ----------
+    path : str
+        Cache directory; created if it does not exist.
+    max_size : int, optional
+        Maximum size of the on-disk cache in bytes. Defaults to 1 GB.
+    memory_items : int, optional
+        Maximum number of entries in the in-memory cache. Defaults to 10000.
+    persist_intermediates : bool, optional
+        Whether to also store the values of `INTERMEDIATE_NODES`. Defaults to
+        False.
+
+    Attributes
+    ----------
+    hits, misses : int
+        Number of feature values found/not found in the cache by `lookup`
+        calls of the current process only.
+    memory_hits : int
+        Number of `hits` served by the in-memory cache.
+    """
+    def __init__(self, path, max_size=2**30, memory_items=10000,
+                 persist_intermediates=False):
+        self.path = path
+        self.max_size = max_size
+        self.memory_items = memory_items
+        self.persist_intermediates = persist_intermediates
+        self.hits = self.misses = self.memory_hits = 0
+        self._memory = collections.OrderedDict()
+        self._memory_lock = threading.Lock()  # see `featurize.Featurizer`
+        self._written = 0
+        if not os.path.isdir(path):
+            try:
+                os.makedirs(path)
+            except OSError:  # created concurrently
+                pass
+        self.evict()
+        _OPEN_CACHES.setdefault((os.path.abspath(path), max_size,
+                                 memory_items, persist_intermediates), self)
+
+    def __repr__(self):
+        return '<FeatureCache: {} ({} hits, {} misses)>'.format(
+            self.path, self.hits, self.misses)
+
+    def __reduce__(self):
+        return (_open_cache, (self.path, self.max_size, self.memory_items,
+                              self.persist_intermediates))
+
+    @property
+    def stats(self):
+        """Dictionary of hit/miss counters."""
+        return {'hits': self.hits, 'misses': self.misses,
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.hits - self.memory_hits}
+
+    @staticmethod
+    def series_key(t, m, e, meta_features={}):
+        """Compute the cache key of a single channel of a time series."""
+        h = hashlib.sha1()
+        for x in (t, m, e):
+            x = np.ascontiguousarray(x, dtype='float64')
+            h.update(repr(x.shape).encode('utf-8'))
+            h.update(x.data)
+        h.update(repr(sorted(dict(meta_features).items())).encode('utf-8'))
+        return h.hexdigest()
+
+    def _entry_path(self, key, signature):
+        return os.path.join(self.path, key[:2], key[2:], signature + '.pkl')
+
+    def _remember(self, key, entry):
+        with self._memory_lock:
+            self._memory.pop(key, None)
+            self._memory[key] = entry
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def _load(self, key, signatures):
+        """Read the given values of an entry from disk (marking them as
+        recently used); values that are not found are skipped.
+        """
+        entry = {}
+        for signature in signatures:
+            path = self._entry_path(key, signature)
+            try:
+                with open(path, 'rb') as f:
+                    entry[signature] = pickle.loads(zlib.decompress(f.read()))
+                os.utime(path, None)
+            except (IOError, OSError, EOFError, zlib.error,
+                    pickle.UnpicklingError):
+                pass
+        return entry
+
+    def lookup(self, key, signatures, count=True):
+        """Look up the values of the features (or intermediate nodes) with the
+        given signatures for the time series channel with cache key `key`.
+        Unless `count` is False, the hit/miss counters are updated.
+
+        Returns
+        -------
+        dict
+            Dictionary containing the signatures and values of all features
+            that were found.
+        """
+        entry = dict(self._memory.get(key, {}))
+        from_memory = sum(s in entry for s in signatures)
+        if from_memory < len(signatures):
+            # Values may have been added by other processes
+            entry.update(self._load(key, [s for s in signatures
+                                          if s not in entry]))
+        self._remember(key, entry)
+        found = {s: entry[s] for s in signatures if s in entry}
+        if count:
+            self.hits += len(found)
+            self.memory_hits += from_memory
+            self.misses += len(signatures) - len(found)
+        return found
+
+    def compact(self, node, value):
+        """Reduce the value of the intermediate node `node` to what is needed
+        by the features computed from it, before storing it.
+        """
+        if node in _COMPACT_FUNCTIONS:
+            value = _COMPACT_FUNCTIONS[node](value)
+        return value
+
+    def store(self, key, values):
+        """Add feature values (with signatures as keys) to the entry of the
+        time series channel with cache key `key`.
+        """
+        entry = dict(self._memory.get(key, {}))
+        entry.update(values)
+        self._remember(key, entry)
+
+        directory = os.path.dirname(self._entry_path(key, ''))
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:  # created concurrently
+                pass
+        for signature, value in values.items():
+            self._written += self._write(self._entry_path(key, signature),
+                                         value)
+
+        # Only check the total size of the cache once in a while
+        if self._written > self.max_size // 10:
+            self.evict()
+
+    @staticmethod
+    def _write(path, value):
+        """Atomically write a single value to `path`; returns its size."""
+        f = tempfile.NamedTemporaryFile(dir=os.path.dirname(path),
+                                        suffix='.tmp', delete=False)
+        with f:
+            f.write(zlib.compress(pickle.dumps(value, protocol=2)))
+        size = os.path.getsize(f.name)
+        try:
+            os.rename(f.name, path)
+        except OSError:  # e.g. existing destination on Windows
+            try:
+                os.remove(path)
+                os.rename(f.name, path)
+            except OSError:
+                return 0
+        return size
+
+    def evict(self):
+        """Delete least recently used values until the on-disk cache takes up
+        at most 80% of `max_size` (if it currently exceeds `max_size`).
+
+        Temporary files are only removed once they are an hour old, so that
+        writes in progress in other processes are not affected.
+        """
+        self._written = 0
+        entries = []
+        now = time.time()
+        for directory, _, filenames in os.walk(self.path):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:  # removed concurrently
+                    continue
+                if filename.endswith('.tmp') and now - stat.st_mtime < 3600:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total_size = sum(size for _, size, _ in entries)
+        if total_size <= self.max_size:
+            return
+        for mtime, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total_size -= size
+            if total_size <= 0.8 * self.max_size:
+                break
+
+    def clear(self):
+        """Remove all entries from the in-memory and on-disk caches."""
+        self._memory.clear()
+        for directory, _, filenames in os.walk(self.path):
+            for filename in filenames:
+                try:
+                    os.remove(os.path.join(directory, filename))
+                except OSError:
+                    pass
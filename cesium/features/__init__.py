@@ -1,3 +1,5 @@
 from .graphs import (CADENCE_FEATS, GENERAL_FEATS, LOMB_SCARGLE_FEATS,
                      generate_dask_graph, feature_categories,
                      dask_feature_graph, feature_tags)
+from .plan import FeaturePlan, SharedSteps
+from .batch import BATCH_FEATS, featurize_batch
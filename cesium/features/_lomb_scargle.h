@@ -1,4 +1,5 @@
 #include <math.h>
+#include <stdlib.h>
 #include "_eigs.h"
 
 static inline void copy_sincos (int numt, double sinx0[], double cosx0[], double sinx[], double cosx[]) {
@@ -19,12 +20,19 @@ static inline void update_sincos (int numt, double sinx0[], double cosx0[], doub
     }
 }
 
-static inline double _lomb_scargle(int numt, double cn[], double sinx[], double cosx[], double st, double ct, double cst) {
-  double cs=0.,s2=0.,c2=0.,sh=0.,ch=0.,px=0.,detm;
+/* Sums of `_lomb_scargle` that do not depend on the data values */
+static inline void trig_sums(int numt, double sinx[], double cosx[], double *cs, double *c2) {
+  int i;
+  for (*cs=0.,*c2=0.,i=0;i<numt;i++) {
+    *cs += cosx[i]*sinx[i];
+    *c2 += cosx[i]*cosx[i];
+  }
+}
+
+static inline double lomb_psd(int numt, double cn[], double sinx[], double cosx[], double st, double ct, double cst, double cs, double c2) {
+  double s2=0.,sh=0.,ch=0.,px=0.,detm;
   int i;
   for (i=0;i<numt;i++) {
-    cs += cosx[i]*sinx[i];
-    c2 += cosx[i]*cosx[i];
     sh += sinx[i]*cn[i];
     ch += cosx[i]*cn[i];
   }
@@ -34,6 +42,12 @@ static inline double _lomb_scargle(int numt, double cn[], double sinx[], double
   return px;
 }
 
+static inline double _lomb_scargle(int numt, double cn[], double sinx[], double cosx[], double st, double ct, double cst) {
+  double cs,c2;
+  trig_sums(numt,sinx,cosx,&cs,&c2);
+  return lomb_psd(numt,cn,sinx,cosx,st,ct,cst,cs,c2);
+}
+
 static inline void calc_dotprod(int numt, double sinx[], double cosx[], double wt[], int dord, double *st, double *ct) {
     int i;
     unsigned long n2=numt*dord;
@@ -43,13 +57,19 @@ static inline void calc_dotprod(int numt, double sinx[], double cosx[], double w
     }
 }
 
-static inline double do_lomb(int numt, int detrend_order, double cn[], double sinx[], double cosx[], double wth[]) {
+/* Projections of sin/cos onto the detrending basis */
+static inline void detrend_sums(int numt, int detrend_order, double sinx[], double cosx[], double wth[], double *st, double *ct, double *cst) {
     int i;
-    double st,cst,ct,st0,ct0;
-    for (i=0,ct=0,st=0,cst=0;i<=detrend_order;i++) {
+    double st0,ct0;
+    for (i=0,*ct=0,*st=0,*cst=0;i<=detrend_order;i++) {
         calc_dotprod(numt,sinx,cosx,wth,i,&st0,&ct0);
-        st += st0*st0; ct += ct0*ct0; cst += st0*ct0;
+        *st += st0*st0; *ct += ct0*ct0; *cst += st0*ct0;
     }
+}
+
+static inline double do_lomb(int numt, int detrend_order, double cn[], double sinx[], double cosx[], double wth[]) {
+    double st,cst,ct;
+    detrend_sums(numt,detrend_order,sinx,cosx,wth,&st,&ct,&cst);
     return _lomb_scargle(numt,cn,sinx,cosx,st,ct,cst);
 }
 
@@ -76,9 +96,11 @@ static inline double do_lomb_zoom(int numt, int detrend_order, double *cn, doubl
     return px;
 }
 
-static inline void def_hat(int numt, int nharm, int detrend_order, double hat_matr[], double hat0[], double sinx[], double cosx[], double wt[], double cn[], double hat_hat[], double vec[], double lambda0) {
+/* `work` is scratch space for 2*numt values (allocated by the caller rather
+ * than on the stack, which may be small for OpenMP worker threads) */
+static inline void def_hat(int numt, int nharm, int detrend_order, double hat_matr[], double hat0[], double sinx[], double cosx[], double wt[], double cn[], double hat_hat[], double vec[], double lambda0, double work[]) {
     int i,j=numt*nharm,k,j1,npar=2*nharm,dord1=detrend_order+1;
-    double sx0[numt],cx0[numt],ct,st,sum;
+    double *sx0=work,*cx0=work+numt,ct,st,sum;
     for (i=0;i<numt;i++) {
         sx0[i] = (hat_matr[i]=sinx[i])/wt[i]; cx0[i] = (hat_matr[i+j]=cosx[i])/wt[i];
     }
@@ -167,10 +189,10 @@ static inline void inv_hat(int n, double hat_hat[], double vec[], double vec1[],
     }
 }
 
-static inline double refine_psd(int numt, int nharm, int detrend_order, double hat_matr[], double hat0[], double hat_hat[], double sinx[], double cosx[], double wt[], double cn[], double vec1[], double *lambda0, double *lambda0_range, double chi0, double tc, double *Tr, int inv) {
+static inline double refine_psd(int numt, int nharm, int detrend_order, double hat_matr[], double hat0[], double hat_hat[], double sinx[], double cosx[], double wt[], double cn[], double vec1[], double *lambda0, double *lambda0_range, double chi0, double tc, double *Tr, int inv, double work[]) {
     int i,j,k,npar=2*nharm;
     double p[npar],vec[npar],eigs[npar],sum,px,lambda00=*lambda0;
-    def_hat(numt,nharm,detrend_order,hat_matr,hat0,sinx,cosx,wt,cn,hat_hat,vec,*lambda0);
+    def_hat(numt,nharm,detrend_order,hat_matr,hat0,sinx,cosx,wt,cn,hat_hat,vec,*lambda0,work);
     get_eigs(npar,hat_hat,eigs);
     for (i=0;i<npar;i++) {
         for (sum=0,j=0;j<npar;j++) sum += hat_hat[i+j*npar] * vec[j];
@@ -181,46 +203,216 @@ static inline double refine_psd(int numt, int nharm, int detrend_order, double h
     return px;
 }
 
-void lomb_scargle(int numt, int numf, int nharm, int detrend_order,
-                  double psd[], double cn[], double wth[], double sinx[],
-                  double cosx[], double sinx_step[], double cosx_step[],
-                  double sinx_back[], double cosx_back[],
-                  double sinx_smallstep[], double cosx_smallstep[],
-                  double hat_matr[], double hat_hat[],
-                  double hat0[], double soln[], double chi0,
-                  double freq_zoom, double psdmin, double tone_control,
-                  double lambda0[], double lambda0_range[],
-                  double Tr[], int ifreq[])
+/* Best fits found by `scan_block` in one block of the frequency grid */
+typedef struct {
+    unsigned long jmax, j0max;
+    int ifreq;
+    double psdmax, psd0max;
+    double *sinx2, *cosx2;  /* sin/cos at the best refined frequency */
+    double *sinx0, *cosx0;  /* at the best simple fit before any refinement */
+} block_result;
+
+/* Scan frequencies [start, stop) of the grid, starting from sin/cos values
+ * `sinx`/`cosx` at frequency `start`; returns 0, or -1 if out of memory. */
+static int scan_block(int numt, unsigned long start, unsigned long stop,
+                      int nharm, int detrend_order, double psd[],
+                      double cn[], double wth[], double sinx[],
+                      double cosx[], double sinx_step[], double cosx_step[],
+                      double sinx_back[], double cosx_back[],
+                      double sinx_smallstep[], double cosx_smallstep[],
+                      double chi0, double freq_zoom, double psdmin,
+                      double tone_control, double lambda0,
+                      double lambda0_range[], block_result *res)
 {
-  int i,k,npar=2*(int)nharm,ifr=(int)(freq_zoom)/2;
+  int npar=2*nharm,ifr=(int)(freq_zoom)/2;
   unsigned long j;
-  unsigned long jmax=0;
-  *ifreq = ifr;
-  double psdmax=0.,psd0max=0.,Trace,sinx1[numt],cosx1[numt],sinx2[numt],cosx2[numt],lambda,px,pxmax;
-  for (j=0;j<numf;j++) {
+  double Trace,lambda;
+  double *sinx1 = malloc(sizeof(double)*numt*(4 + npar));
+  double *hat_matr_hat = malloc(sizeof(double)*(npar*npar + npar*(detrend_order+1) + npar));
+  if (!sinx1 || !hat_matr_hat) {
+      free(sinx1); free(hat_matr_hat);
+      return -1;
+  }
+  double *cosx1 = sinx1 + numt, *hat_matr = sinx1 + 2*numt,
+         *work = hat_matr + npar*numt;
+  double *hat_hat = hat_matr_hat, *hat0 = hat_hat + npar*npar,
+         *soln = hat0 + npar*(detrend_order+1);
+
+  res->jmax = res->j0max = start;
+  res->ifreq = ifr;
+  res->psdmax = res->psd0max = 0.;
+  copy_sincos(numt,sinx,cosx,res->sinx0,res->cosx0);
+  for (j=start;j<stop;j++) {
       // do a simple lomb-scargle, sin+cos fit
       psd[j] = do_lomb(numt,detrend_order,cn,sinx,cosx,wth);
-      if (psd[j]>psd0max && psdmax==0) {
-          psd0max = psd[j];
-          copy_sincos(numt,sinx,cosx,sinx2,cosx2);
-          jmax = j;
+      if (psd[j]>res->psd0max && res->psdmax==0) {
+          res->psd0max = psd[j];
+          copy_sincos(numt,sinx,cosx,res->sinx0,res->cosx0);
+          res->j0max = j;
       }
       // refine the fit around significant sin+cos fits
       if (psd[j]>(double)psdmin) {
           // first let the frequency vary slightly
-          px = do_lomb_zoom(numt,detrend_order, cn, sinx, cosx, sinx1, cosx1, sinx_back, cosx_back, sinx_smallstep, cosx_smallstep, wth, freq_zoom, &ifr);
-          lambda = *lambda0;
+          do_lomb_zoom(numt,detrend_order, cn, sinx, cosx, sinx1, cosx1, sinx_back, cosx_back, sinx_smallstep, cosx_smallstep, wth, freq_zoom, &ifr);
+          lambda = lambda0;
           // now fit a multi-harmonic model with generalized cross-validation to avoid over-fitting
-          psd[j] = refine_psd(numt,nharm,detrend_order,hat_matr,hat0,hat_hat,sinx1,cosx1,wth,cn,soln,&lambda,lambda0_range,chi0,tone_control,&Trace,0);
-          if (psd[j]>psdmax) {
-              copy_sincos(numt,sinx1,cosx1,sinx2,cosx2);
-              psdmax=psd[j];
-              *ifreq = ifr;
-              jmax = j;
+          psd[j] = refine_psd(numt,nharm,detrend_order,hat_matr,hat0,hat_hat,sinx1,cosx1,wth,cn,soln,&lambda,lambda0_range,chi0,tone_control,&Trace,0,work);
+          if (psd[j]>res->psdmax) {
+              copy_sincos(numt,sinx1,cosx1,res->sinx2,res->cosx2);
+              res->psdmax=psd[j];
+              res->ifreq = ifr;
+              res->jmax = j;
           }
       }
       update_sincos(numt, sinx_step, cosx_step, sinx, cosx, 0);
   }
-  // finally, rerun at the best-fit period so we get some statistics
-  psd[jmax] = refine_psd(numt,nharm,detrend_order,hat_matr,hat0,hat_hat,sinx2,cosx2,wth,cn,soln,lambda0,lambda0_range,chi0,tone_control,Tr,1);
+  free(sinx1); free(hat_matr_hat);
+  return 0;
+}
+
+/* The frequency grid is split into `nblock` contiguous blocks, which are
+ * scanned in parallel (if compiled with OpenMP); `sinx`/`cosx` contain
+ * `nblock` rows of sin/cos values at the first frequency of each block, i.e.
+ * at index numf*b/nblock. Returns 0, or -1 if out of memory. */
+int lomb_scargle(int numt, int numf, int nharm, int detrend_order,
+                 double psd[], double cn[], double wth[], double sinx[],
+                 double cosx[], double sinx_step[], double cosx_step[],
+                 double sinx_back[], double cosx_back[],
+                 double sinx_smallstep[], double cosx_smallstep[],
+                 double hat_matr[], double hat_hat[],
+                 double hat0[], double soln[], double chi0,
+                 double freq_zoom, double psdmin, double tone_control,
+                 double lambda0[], double lambda0_range[],
+                 double Tr[], int ifreq[], int nblock)
+{
+  int b,best=0,failed=0;
+  block_result *res = malloc(sizeof(block_result)*nblock);
+  // sin/cos values of each block, then scratch space for the final fit
+  double *sincos = malloc(sizeof(double)*(4*nblock + 2)*numt);
+  if (!res || !sincos) {
+      free(res); free(sincos);
+      return -1;
+  }
+  for (b=0;b<nblock;b++) {
+      res[b].sinx2 = sincos + 4*numt*b; res[b].cosx2 = res[b].sinx2 + numt;
+      res[b].sinx0 = res[b].cosx2 + numt; res[b].cosx0 = res[b].sinx0 + numt;
+  }
+
+  #pragma omp parallel for schedule(static, 1) num_threads(nblock) reduction(|:failed)
+  for (b=0;b<nblock;b++) {
+      failed |= scan_block(numt, (unsigned long)numf*b/nblock,
+                           (unsigned long)numf*(b+1)/nblock, nharm,
+                           detrend_order, psd, cn, wth, sinx + numt*b,
+                           cosx + numt*b, sinx_step, cosx_step, sinx_back,
+                           cosx_back, sinx_smallstep, cosx_smallstep, chi0,
+                           freq_zoom, psdmin, tone_control, *lambda0,
+                           lambda0_range, res + b);
+  }
+
+  if (!failed) {
+      // combine blocks as if the whole grid had been scanned in order: the
+      // best refined fit, or the best simple fit if there is none
+      for (b=1;b<nblock;b++) {
+          if (res[b].psdmax>res[best].psdmax ||
+              (res[best].psdmax==0 && res[b].psd0max>res[best].psd0max)) best = b;
+      }
+      *ifreq = (int)(freq_zoom)/2;
+      double *sinx2 = res[best].sinx0, *cosx2 = res[best].cosx0;
+      unsigned long jmax = res[best].j0max;
+      if (res[best].psdmax>0) {
+          sinx2 = res[best].sinx2; cosx2 = res[best].cosx2;
+          jmax = res[best].jmax;
+          *ifreq = res[best].ifreq;
+      }
+      // finally, rerun at the best-fit period so we get some statistics
+      psd[jmax] = refine_psd(numt,nharm,detrend_order,hat_matr,hat0,hat_hat,sinx2,cosx2,wth,cn,soln,lambda0,lambda0_range,chi0,tone_control,Tr,1,sincos + 4*numt*nblock);
+  }
+  free(res); free(sincos);
+  return failed ? -1 : 0;
+}
+
+/* Scan the frequency grid for `nseries` time series sharing the same times
+ * and weights (`wth`), whose detrended, weighted values are the rows of
+ * `cn`. The sin/cos recurrence and the sums that only depend on the weights
+ * are computed once per frequency; the results for each series are the same
+ * as those of `lomb_scargle` with a single block. `psd`, `hat_matr`,
+ * `hat_hat`, `hat0` and `soln` contain one block per series, `chi0`,
+ * `psdmin`, `lambda0`, `Tr` and `ifreq` one value per series. Returns 0, or
+ * -1 if out of memory. */
+int lomb_scargle_batch(int numt, int numf, int nseries, int nharm,
+                       int detrend_order, double psd[], double cn[],
+                       double wth[], double sinx[], double cosx[],
+                       double sinx_step[], double cosx_step[],
+                       double sinx_back[], double cosx_back[],
+                       double sinx_smallstep[], double cosx_smallstep[],
+                       double hat_matr[], double hat_hat[], double hat0[],
+                       double soln[], double chi0[], double freq_zoom,
+                       double psdmin[], double tone_control, double lambda0[],
+                       double lambda0_range[], double Tr[], int ifreq[])
+{
+  int s,npar=2*nharm,dord1=detrend_order+1;
+  unsigned long j;
+  double st,ct,cst,cs,c2,Trace,lambda;
+  block_result *res = malloc(sizeof(block_result)*nseries);
+  double *sincos = malloc(sizeof(double)*4*numt*nseries);
+  double *sinx1 = malloc(sizeof(double)*numt*(4 + npar));
+  double *hat_matr_hat = malloc(sizeof(double)*(npar*npar + npar*dord1 + npar));
+  if (!res || !sincos || !sinx1 || !hat_matr_hat) {
+      free(res); free(sincos); free(sinx1); free(hat_matr_hat);
+      return -1;
+  }
+  double *cosx1 = sinx1 + numt, *hat_matr1 = sinx1 + 2*numt,
+         *work = hat_matr1 + npar*numt;
+  double *hat_hat1 = hat_matr_hat, *hat01 = hat_hat1 + npar*npar,
+         *soln1 = hat01 + npar*dord1;
+
+  for (s=0;s<nseries;s++) {
+      res[s].sinx2 = sincos + 4*numt*s; res[s].cosx2 = res[s].sinx2 + numt;
+      res[s].sinx0 = res[s].cosx2 + numt; res[s].cosx0 = res[s].sinx0 + numt;
+      res[s].jmax = res[s].j0max = 0;
+      res[s].ifreq = (int)(freq_zoom)/2;
+      res[s].psdmax = res[s].psd0max = 0.;
+      copy_sincos(numt,sinx,cosx,res[s].sinx0,res[s].cosx0);
+      ifreq[s] = (int)(freq_zoom)/2;
+  }
+  for (j=0;j<numf;j++) {
+      detrend_sums(numt,detrend_order,sinx,cosx,wth,&st,&ct,&cst);
+      trig_sums(numt,sinx,cosx,&cs,&c2);
+      // as in scan_block, for each series
+      for (s=0;s<nseries;s++) {
+          double *cn_s = cn + (unsigned long)numt*s, *psd_s = psd + (unsigned long)numf*s;
+          psd_s[j] = lomb_psd(numt,cn_s,sinx,cosx,st,ct,cst,cs,c2);
+          if (psd_s[j]>res[s].psd0max && res[s].psdmax==0) {
+              res[s].psd0max = psd_s[j];
+              copy_sincos(numt,sinx,cosx,res[s].sinx0,res[s].cosx0);
+              res[s].j0max = j;
+          }
+          if (psd_s[j]>psdmin[s]) {
+              do_lomb_zoom(numt,detrend_order, cn_s, sinx, cosx, sinx1, cosx1, sinx_back, cosx_back, sinx_smallstep, cosx_smallstep, wth, freq_zoom, &ifreq[s]);
+              lambda = lambda0[s];
+              psd_s[j] = refine_psd(numt,nharm,detrend_order,hat_matr1,hat01,hat_hat1,sinx1,cosx1,wth,cn_s,soln1,&lambda,lambda0_range,chi0[s],tone_control,&Trace,0,work);
+              if (psd_s[j]>res[s].psdmax) {
+                  copy_sincos(numt,sinx1,cosx1,res[s].sinx2,res[s].cosx2);
+                  res[s].psdmax=psd_s[j];
+                  res[s].ifreq = ifreq[s];
+                  res[s].jmax = j;
+              }
+          }
+      }
+      update_sincos(numt, sinx_step, cosx_step, sinx, cosx, 0);
+  }
+
+  for (s=0;s<nseries;s++) {
+      double *sinx2 = res[s].sinx0, *cosx2 = res[s].cosx0;
+      unsigned long jmax = res[s].j0max;
+      ifreq[s] = (int)(freq_zoom)/2;
+      if (res[s].psdmax>0) {
+          sinx2 = res[s].sinx2; cosx2 = res[s].cosx2;
+          jmax = res[s].jmax;
+          ifreq[s] = res[s].ifreq;
+      }
+      psd[(unsigned long)numf*s + jmax] = refine_psd(numt,nharm,detrend_order,hat_matr + (unsigned long)npar*numt*s,hat0 + npar*dord1*s,hat_hat + npar*npar*s,sinx2,cosx2,wth,cn + (unsigned long)numt*s,soln + npar*s,lambda0 + s,lambda0_range,chi0[s],tone_control,Tr + s,1,work);
+  }
+  free(res); free(sincos); free(sinx1); free(hat_matr_hat);
+  return 0;
 }
@@ -1,11 +1,13 @@
 from _lomb_scargle cimport lomb_scargle as _lomb_scargle
+from _lomb_scargle cimport lomb_scargle_batch as _lomb_scargle_batch
 
 cimport numpy as cnp
 import numpy as np
 
 def lomb_scargle(int numt, int numf, int nharm, int detrend_order,
                  double[:] psd, double[:] cn, cnp.ndarray wth,
-                 double[:] sinx, double[:] cosx, double[:] sinx_step,
+                 double[:, ::1] sinx, double[:, ::1] cosx,
+                 double[:] sinx_step,
                  double[:] cosx_step, double[:] sinx_back,
                  double[:] cosx_back, double[:] sinx_smallstep,
                  double[:] cosx_smallstep, double[:, :] hat_matr,
@@ -16,14 +18,69 @@ def lomb_scargle(int numt, int numf, int nharm, int detrend_order,
                  double[:] lambda0_range,
                  cnp.ndarray[dtype=double, ndim=0] Tr,
                  cnp.ndarray[dtype=cnp.int32_t, ndim=0] ifreq):
+    """Scan the frequency grid, which is split into `len(sinx)` blocks
+    (scanned in parallel if compiled with OpenMP); rows of `sinx`/`cosx`
+    contain the initial values for each block. See `_lomb_scargle.h`.
+    """
 
     assert wth.dtype == np.double
 
-    _lomb_scargle(numt, numf, nharm, detrend_order, &psd[0], &cn[0],
-                  <double*>(wth.data), &sinx[0], &cosx[0], &sinx_step[0],
-                  &cosx_step[0], &sinx_back[0], &cosx_back[0],
-                  &sinx_smallstep[0], &cosx_smallstep[0], &hat_matr[0, 0],
-                  &hat_hat[0, 0], &hat0[0, 0],
-                  &soln[0], chi0, freq_zoom, psdmin, tone_control,
-                  <double*>(lambda0.data), &lambda0_range[0],
-                  <double*>(Tr.data), <int*>(ifreq.data))
+    cdef double* wth_ptr = <double*>(wth.data)
+    cdef double* lambda0_ptr = <double*>(lambda0.data)
+    cdef double* Tr_ptr = <double*>(Tr.data)
+    cdef int* ifreq_ptr = <int*>(ifreq.data)
+    cdef int nblock = sinx.shape[0]
+    cdef int status
+
+    # The kernel only touches the buffers passed in, so other threads can run
+    # (e.g. periodograms of other time series) in the meantime
+    with nogil:
+        status = _lomb_scargle(numt, numf, nharm, detrend_order, &psd[0],
+                               &cn[0], wth_ptr, &sinx[0, 0], &cosx[0, 0],
+                               &sinx_step[0], &cosx_step[0], &sinx_back[0],
+                               &cosx_back[0], &sinx_smallstep[0],
+                               &cosx_smallstep[0], &hat_matr[0, 0],
+                               &hat_hat[0, 0], &hat0[0, 0], &soln[0], chi0,
+                               freq_zoom, psdmin, tone_control, lambda0_ptr,
+                               &lambda0_range[0], Tr_ptr, ifreq_ptr, nblock)
+    if status != 0:
+        raise MemoryError()
+
+
+def lomb_scargle_batch(int numt, int numf, int nharm, int detrend_order,
+                       double[:, ::1] psd, double[:, ::1] cn,
+                       cnp.ndarray wth, double[::1] sinx, double[::1] cosx,
+                       double[:] sinx_step, double[:] cosx_step,
+                       double[:] sinx_back, double[:] cosx_back,
+                       double[:] sinx_smallstep, double[:] cosx_smallstep,
+                       double[:, :, ::1] hat_matr, double[:, :, ::1] hat_hat,
+                       double[:, :, ::1] hat0, double[:, ::1] soln,
+                       double[::1] chi0, double freq_zoom, double[::1] psdmin,
+                       double tone_control, double[::1] lambda0,
+                       double[:] lambda0_range, double[::1] Tr,
+                       int[::1] ifreq):
+    """Scan the frequency grid for each row of `cn` (time series sharing the
+    same times and weights `wth`); all other array arguments contain one row
+    per series, except for the sin/cos tables. See `_lomb_scargle.h`.
+    """
+
+    assert wth.dtype == np.double and wth.flags['C_CONTIGUOUS']
+
+    cdef double* wth_ptr = <double*>(wth.data)
+    cdef int nseries = cn.shape[0]
+    cdef int status
+
+    with nogil:
+        status = _lomb_scargle_batch(numt, numf, nseries, nharm,
+                                     detrend_order, &psd[0, 0], &cn[0, 0],
+                                     wth_ptr, &sinx[0], &cosx[0],
+                                     &sinx_step[0], &cosx_step[0],
+                                     &sinx_back[0], &cosx_back[0],
+                                     &sinx_smallstep[0], &cosx_smallstep[0],
+                                     &hat_matr[0, 0, 0], &hat_hat[0, 0, 0],
+                                     &hat0[0, 0, 0], &soln[0, 0], &chi0[0],
+                                     freq_zoom, &psdmin[0], tone_control,
+                                     &lambda0[0], &lambda0_range[0], &Tr[0],
+                                     &ifreq[0])
+    if status != 0:
+        raise MemoryError()
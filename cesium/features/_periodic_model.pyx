@@ -0,0 +1,90 @@
+# cython: boundscheck=False, wraparound=False, cdivision=True
+
+import numpy as np
+from libc.math cimport sin, fabs, M_PI
+
+
+cdef inline double model(double[:, ::1] A, double[:, ::1] ph, Py_ssize_t i,
+                         double t, double sign) nogil:
+    """Harmonic model of series `i` at `t` (times `sign`), summed in the same
+    order as `periodic_model` originally did.
+    """
+    cdef Py_ssize_t j
+    cdef double f = A[i, 0] * sin(2. * M_PI * t + ph[i, 0])
+    for j in range(1, A.shape[1]):
+        f = f + A[i, j] * sin(2. * M_PI * (j + 1.) * t + ph[i, j])
+    return sign * f
+
+
+def fmin_harmonic(double[:, ::1] A, double[:, ::1] ph, double[::1] x0,
+                  bint maximum):
+    """Local extremum of the harmonic model of each series found by
+    Nelder-Mead from `x0`, with the same steps (and therefore results) as
+    `scipy.optimize.fmin(func, x0, disp=False)` with its default tolerances.
+
+    Returns the locations of the extrema and the values of the model there.
+    """
+    cdef Py_ssize_t n = A.shape[0]
+    cdef Py_ssize_t i, fcalls, iterations
+    cdef double sign = -1. if maximum else 1.
+    cdef double s0, s1, f0, f1, xr, fxr, xe, fxe, xc, fxc, tmp
+    X = np.empty(n, dtype='float64')
+    F = np.empty(n, dtype='float64')
+    cdef double[::1] x = X
+    cdef double[::1] fx = F
+
+    with nogil:
+        for i in range(n):
+            s0 = x0[i]
+            s1 = (1. + 0.05) * s0 if s0 != 0. else 0.00025
+            f0 = model(A, ph, i, s0, sign)
+            f1 = model(A, ph, i, s1, sign)
+            fcalls = 2
+            if f1 < f0:
+                s0, s1, f0, f1 = s1, s0, f1, f0
+            iterations = 1
+            while fcalls < 200 and iterations < 200:
+                if fabs(s1 - s0) <= 1e-4 and fabs(f0 - f1) <= 1e-4:
+                    break
+                # Reflection (rho=1) of the worst point through the best one
+                xr = 2. * s0 - 1. * s1
+                fxr = model(A, ph, i, xr, sign)
+                fcalls += 1
+                if fxr < f0:
+                    # Expansion (chi=2)
+                    xe = 3. * s0 - 2. * s1
+                    fxe = model(A, ph, i, xe, sign)
+                    fcalls += 1
+                    if fxe < fxr:
+                        s1, f1 = xe, fxe
+                    else:
+                        s1, f1 = xr, fxr
+                elif fxr < f1:
+                    # Outside contraction (psi=0.5)
+                    xc = 1.5 * s0 - 0.5 * s1
+                    fxc = model(A, ph, i, xc, sign)
+                    fcalls += 1
+                    if fxc <= fxr:
+                        s1, f1 = xc, fxc
+                    else:
+                        # Shrink (sigma=0.5)
+                        s1 = s0 + 0.5 * (s1 - s0)
+                        f1 = model(A, ph, i, s1, sign)
+                        fcalls += 1
+                else:
+                    # Inside contraction
+                    xc = 0.5 * s0 + 0.5 * s1
+                    fxc = model(A, ph, i, xc, sign)
+                    fcalls += 1
+                    if fxc < f1:
+                        s1, f1 = xc, fxc
+                    else:
+                        s1 = s0 + 0.5 * (s1 - s0)
+                        f1 = model(A, ph, i, s1, sign)
+                        fcalls += 1
+                if f1 < f0:
+                    s0, s1, f0, f1 = s1, s0, f1, f0
+                iterations += 1
+            x[i] = s0
+            fx[i] = sign * f0
+    return X, F
@@ -0,0 +1,26 @@
+# cython: boundscheck=False, wraparound=False, cdivision=True
+
+import numpy as np
+
+
+def chol_inverse_diag(double[:, :] t):
+    """Computes inverse of matrix given its Cholesky upper Triangular decomposition t.
+    matrix form: ab[u + i - j, j] == a[i,j] (here u=1)
+    (quick version: only calculates diagonal and neighboring elements)
+    """
+    cdef Py_ssize_t nrows = t.shape[1]
+    cdef Py_ssize_t j
+    cdef double tjj
+    B = np.zeros((2, nrows), dtype='float64')
+    cdef double[:, ::1] b = B
+
+    with nogil:
+        b[1, nrows - 1] = 1.0 / (t[1, nrows - 1] * t[1, nrows - 1])
+        b[0, nrows - 1] = (-t[0, nrows - 1] * b[1, nrows - 1] /
+                           t[1, (nrows - 2) % nrows])
+        for j in range(nrows - 2, -1, -1):
+            tjj = t[1, j]
+            b[1, j] = (1.0 / tjj - t[0, j + 1] * b[0, j + 1]) / tjj
+            # t[1, -1] (i.e., the last element) for j = 0, as in numpy
+            b[0, j] = -t[0, j] * b[1, j] / t[1, (j - 1 + nrows) % nrows]
+    return B
@@ -1,5 +1,7 @@
 import numpy as np
 
+from .common_functions import sorted_median, sorted_percentile
+
 
 def amplitude(x):
     """Half the difference between the maximum and minimum magnitude."""
@@ -15,10 +17,21 @@ def percent_amplitude(x, base=10., exponent=-0.4):
     x=10^(-0.4*y), corresponding to units of magnitudes. Computations are
     performed on the corresponding linear-scale values.
     """
-    linear_scale_data = base ** (exponent * x)
-    y_max = np.max(linear_scale_data)
-    y_min = np.min(linear_scale_data)
-    y_med = np.median(linear_scale_data)
+    return sorted_percent_amplitude(sorted_flux(x, base, exponent))
+
+
+def sorted_flux(x, base=10., exponent=-0.4):
+    """Sorted linear-scale values `base ** (exponent * x)` of log-scaled data;
+    shared by the flux percentile features.
+    """
+    return np.sort(base ** (exponent * x))
+
+
+def sorted_percent_amplitude(flux):
+    """`percent_amplitude` computed from sorted linear-scale values."""
+    y_max = flux[-1]
+    y_min = flux[0]
+    y_med = sorted_median(flux)
     return max(abs((y_max - y_med) / y_med), abs((y_med - y_min) / y_med))
 
 
@@ -32,8 +45,15 @@ def percent_difference_flux_percentile(x, base=10., exponent=-0.4):
     x=10^(-0.4*y), corresponding to units of magnitudes. Computations are
     performed on the corresponding linear-scale values.
     """
-    linear_scale_data = base ** (exponent * x)
-    y_95, y_50, y_5 = np.percentile(linear_scale_data, [95, 50, 5])
+    return sorted_percent_difference_flux_percentile(
+        sorted_flux(x, base, exponent))
+
+
+def sorted_percent_difference_flux_percentile(flux):
+    """`percent_difference_flux_percentile` computed from sorted linear-scale
+    values.
+    """
+    y_95, y_50, y_5 = sorted_percentile(flux, [95, 50, 5])
     return (y_95 - y_5) / y_50
 
 
@@ -45,7 +65,12 @@ def flux_percentile_ratio(x, percentile_range, base=10., exponent=-0.4):
     x=10^(-0.4*y), corresponding to units of magnitudes. Computations are
     performed on the corresponding linear-scale values.
     """
-    linear_scale_data = base ** (exponent * x)
-    y_high, y_low, y_95, y_5 = np.percentile(linear_scale_data,
+    return sorted_flux_percentile_ratio(sorted_flux(x, base, exponent),
+                                        percentile_range)
+
+
+def sorted_flux_percentile_ratio(flux, percentile_range):
+    """`flux_percentile_ratio` computed from sorted linear-scale values."""
+    y_high, y_low, y_95, y_5 = sorted_percentile(flux,
             [50 + percentile_range / 2., 50 - percentile_range / 2., 95, 5])
     return (y_high - y_low) / (y_95 - y_5)
@@ -0,0 +1,279 @@
+import numpy as np
+
+from .graphs import GENERAL_FEATS
+from .qso_model import qso_fit_batch
+
+
+__all__ = ['BATCH_FEATS', 'featurize_batch']
+
+
+# `period_fast` wraps gatspy's optimizer, so it cannot be vectorized across
+# series here
+BATCH_FEATS = [f for f in GENERAL_FEATS if f != 'period_fast']
+
+
+def _row_mean(x, valid, n):
+    """Mean of the valid entries of each row."""
+    return np.where(valid, x, 0.).sum(axis=1) / n
+
+
+def _row_percentile(sorted_x, n, q):
+    """Linearly-interpolated `q`th percentile of each row of `sorted_x`, whose
+    first `n` entries are valid (cf. `np.percentile`).
+    """
+    rows = np.arange(len(n))
+    index = q / 100. * (n - 1)
+    lower = np.floor(index).astype(int)
+    upper = np.minimum(lower + 1, n - 1)
+    frac = index - lower
+    x_lower = sorted_x[rows, lower]
+    x_upper = sorted_x[rows, upper]
+    return x_lower + (x_upper - x_lower) * frac
+
+
+def _row_median(sorted_x, n):
+    """Median of each row of `sorted_x`, whose first `n` entries are valid
+    (cf. `np.median`).
+    """
+    rows = np.arange(len(n))
+    return 0.5 * (sorted_x[rows, (n - 1) // 2] + sorted_x[rows, n // 2])
+
+
+class _Batch(object):
+    """Padded block of time series with lazily-computed shared quantities.
+
+    Each row contains a single time series; the first `n[i]` entries of row
+    `i` are valid and the remaining entries are padding.
+    """
+    def __init__(self, t, m, e, n):
+        self.t, self.m, self.e, self.n = t, m, e, n
+        self.valid = np.arange(m.shape[1]) < n[:, None]
+        self._cache = {}
+
+    def __getattr__(self, name):
+        # Shared intermediate values are computed by `_<name>` on first access
+        if name.startswith('_'):
+            raise AttributeError(name)
+        try:
+            return self._cache[name]
+        except KeyError:
+            value = self._cache[name] = getattr(self, '_' + name)()
+            return value
+
+    def _sorted_m(self):
+        return np.sort(np.where(self.valid, self.m, np.inf), axis=1)
+
+    def _median(self):
+        return _row_median(self.sorted_m, self.n)
+
+    def _maximum(self):
+        return np.where(self.valid, self.m, -np.inf).max(axis=1)
+
+    def _minimum(self):
+        return np.where(self.valid, self.m, np.inf).min(axis=1)
+
+    def _mean(self):
+        return _row_mean(self.m, self.valid, self.n)
+
+    def _central_moments(self):
+        dev = self.m - self.mean[:, None]
+        return (_row_mean(dev ** 2, self.valid, self.n),
+                _row_mean(dev ** 3, self.valid, self.n))
+
+    def _weights(self):
+        return np.where(self.valid, 1. / self.e ** 2, 0.)
+
+    def _weighted_average(self):
+        w = self.weights
+        return (w * np.where(self.valid, self.m, 0.)).sum(axis=1) / w.sum(axis=1)
+
+    def _weighted_std_dev(self):
+        w = self.weights
+        dev = np.where(self.valid, self.m - self.weighted_average[:, None], 0.)
+        return np.sqrt((w * dev ** 2).sum(axis=1) / w.sum(axis=1))
+
+    def _abs_dev_from_median(self):
+        return np.abs(self.m - self.median[:, None])
+
+    def _sorted_flux(self, base=10., exponent=-0.4):
+        flux = base ** (exponent * self.m)
+        return np.sort(np.where(self.valid, flux, np.inf), axis=1)
+
+    def flux_percentile(self, q):
+        key = ('flux_percentile', q)
+        if key not in self._cache:
+            self._cache[key] = _row_percentile(self.sorted_flux, self.n, q)
+        return self._cache[key]
+
+    def _qso_model(self):
+        return qso_fit_batch(self.t, self.m, self.e, self.n)
+
+    def _stetson_delta(self, dx=0.1):
+        mu = stetson_mean_batch(self.m, self.n, 1. / dx ** 2)
+        n = self.n[:, None]
+        return np.sqrt(n / (n - 1.)) * (self.m - mu[:, None]) / dx
+
+
+def stetson_mean_batch(x, n, weight=100., alpha=2., beta=2., tol=1.e-6,
+                       nmax=20):
+    """Iteratively weighted mean of each row of `x`, whose first `n` entries
+    are valid; see `stetson.stetson_mean`.
+
+    All rows are updated together; a row stops being updated once it has
+    converged.
+    """
+    valid = np.arange(x.shape[1]) < n[:, None]
+    mu = _row_median(np.sort(np.where(valid, x, np.inf), axis=1), n)
+    active = np.ones(len(x), dtype=bool)
+    for i in range(nmax):
+        resid = x - mu[:, None]
+        resid_err = np.abs(resid) * np.sqrt(weight)
+        weight1 = weight / (1. + (resid_err / alpha)**beta)
+        weight1 /= _row_mean(weight1, valid, n)[:, None]
+        diff = _row_mean(x * weight1, valid, n) - mu
+        mu = np.where(active, mu + diff, mu)
+        active &= ~((np.abs(diff) < tol * np.abs(mu)) | (np.abs(diff) < tol))
+        if not active.any():
+            break
+
+    return mu
+
+
+def _flux_percentile_ratio(percentile_range):
+    def ratio(b):
+        return ((b.flux_percentile(50 + percentile_range / 2.) -
+                 b.flux_percentile(50 - percentile_range / 2.)) /
+                (b.flux_percentile(95) - b.flux_percentile(5)))
+    return ratio
+
+
+def _percent_amplitude(b):
+    y_max, y_min = b.sorted_flux[np.arange(len(b.n)), b.n - 1], b.sorted_flux[:, 0]
+    y_med = _row_median(b.sorted_flux, b.n)
+    return np.maximum(np.abs((y_max - y_med) / y_med),
+                      np.abs((y_med - y_min) / y_med))
+
+
+def _max_slope(b):
+    slopes = np.diff(b.m, axis=1) / np.diff(b.t, axis=1)
+    return np.where(b.valid[:, 1:], np.abs(slopes), -np.inf).max(axis=1)
+
+
+def _percent_close_to_median(b, window_frac=0.1):
+    window = (b.maximum - b.minimum) * window_frac
+    return _row_mean(b.abs_dev_from_median < window[:, None], b.valid, b.n)
+
+
+def _stetson_j(b):
+    p_k = b.stetson_delta ** 2 - 1.
+    return _row_mean(np.sign(p_k) * np.sqrt(np.abs(p_k)), b.valid, b.n)
+
+
+def _stetson_k(b):
+    delta_x = b.stetson_delta
+    return (1. / 0.798 * _row_mean(np.abs(delta_x), b.valid, b.n) /
+            np.sqrt(_row_mean(delta_x ** 2, b.valid, b.n)))
+
+
+_BATCH_FUNCTIONS = {
+    'amplitude': lambda b: (b.maximum - b.minimum) / 2.0,
+    'flux_percentile_ratio_mid20': _flux_percentile_ratio(20),
+    'flux_percentile_ratio_mid35': _flux_percentile_ratio(35),
+    'flux_percentile_ratio_mid50': _flux_percentile_ratio(50),
+    'flux_percentile_ratio_mid65': _flux_percentile_ratio(65),
+    'flux_percentile_ratio_mid80': _flux_percentile_ratio(80),
+    'max_slope': _max_slope,
+    'maximum': lambda b: b.maximum,
+    'median': lambda b: b.median,
+    'median_absolute_deviation': lambda b: _row_median(
+        np.sort(np.where(b.valid, b.abs_dev_from_median, np.inf), axis=1),
+        b.n),
+    'minimum': lambda b: b.minimum,
+    'percent_amplitude': _percent_amplitude,
+    'percent_beyond_1_std': lambda b: _row_mean(
+        (b.m - b.weighted_average[:, None]) > b.weighted_std_dev[:, None],
+        b.valid, b.n),
+    'percent_close_to_median': _percent_close_to_median,
+    'percent_difference_flux_percentile': lambda b: (
+        (b.flux_percentile(95) - b.flux_percentile(5)) /
+        b.flux_percentile(50)),
+    'qso_log_chi2_qsonu': lambda b: b.qso_model['log_chi2_qsonu'],
+    'qso_log_chi2nuNULL_chi2nu': lambda b: (
+        b.qso_model['log_chi2nuNULL_chi2nu']),
+    'skew': lambda b: b.central_moments[1] / b.central_moments[0] ** 1.5,
+    'std': lambda b: np.sqrt(b.central_moments[0]),
+    'stetson_j': _stetson_j,
+    'stetson_k': _stetson_k,
+    'weighted_average': lambda b: b.weighted_average,
+}
+
+
+def featurize_batch(t, m, e, features_to_use, offsets=None, block_size=4096):
+    """Compute features for many (single-channel) time series at once.
+
+    Rather than evaluating each feature function separately for every time
+    series, all series are padded into two-dimensional blocks and every
+    feature is computed for all rows of a block in a few vectorized passes.
+    Only the features in `BATCH_FEATS` are supported.
+
+    Inputs may have the form:
+
+    - `t`, `m`, `e`: (k, n) arrays containing k time series of length n;
+    - `t`, `m`, `e`: (k, n) masked arrays, where masked entries are ignored
+      (the mask of `m` is used for all three arrays);
+    - `t`, `m`, `e`: flat arrays containing the concatenated values of all
+      time series, with the `i`th series stored in
+      `[offsets[i]:offsets[i + 1]]`.
+
+    Parameters
+    ----------
+    t, m, e : array or masked array
+        Time, measurement, and error values, as described above.
+    features_to_use : list of str
+        List of feature names to be generated.
+    offsets : (k + 1,) array of int, optional
+        Offsets of each time series in the flat arrays `t`, `m`, `e`.
+    block_size : int, optional
+        Number of time series padded and processed together. Series are
+        grouped by length so that padding is minimized.
+
+    Returns
+    -------
+    dict
+        Dictionary with feature names as keys and (k,) arrays of feature
+        values as values.
+    """
+    unsupported = [f for f in features_to_use if f not in _BATCH_FUNCTIONS]
+    if unsupported:
+        raise ValueError("Features {} cannot be computed in batch mode."
+                         .format(unsupported))
+
+    if offsets is None:
+        if isinstance(m, np.ma.MaskedArray):
+            valid = ~np.ma.getmaskarray(m)
+        else:
+            valid = np.ones(np.shape(m), dtype=bool)
+        lengths = valid.sum(axis=1)
+        t, m, e = (np.ma.getdata(np.asarray(x, dtype='float64'))[valid]
+                   for x in (t, m, e))
+        offsets = np.concatenate(([0], np.cumsum(lengths)))
+    else:
+        t, m, e = (np.asarray(x, dtype='float64') for x in (t, m, e))
+        offsets = np.asarray(offsets)
+        lengths = np.diff(offsets)
+
+    n_series = len(lengths)
+    out = {feature: np.empty(n_series) for feature in features_to_use}
+    order = np.argsort(lengths, kind='mergesort')
+    for start in range(0, n_series, block_size):
+        rows = order[start:start + block_size]
+        n = lengths[rows]
+        index = offsets[rows][:, None] + np.arange(n.max())
+        valid = np.arange(n.max()) < n[:, None]
+        index = np.where(valid, index, 0)
+        batch = _Batch(t[index], m[index], e[index], n)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for feature in features_to_use:
+                out[feature][rows] = _BATCH_FUNCTIONS[feature](batch)
+
+    return out
@@ -2,7 +2,7 @@ import numpy as np
 import scipy.stats as stats
 
 
-__all__ = ['double_to_single_step', 'cad_prob', 'delta_t_hist',
+__all__ = ['double_to_single_step', 'cad_prob', 'cad_probs', 'delta_t_hist',
            'normalize_hist', 'find_sorted_peaks', 'peak_ratio', 'peak_bin']
 
 
@@ -18,14 +18,155 @@ def cad_prob(cads, time):
     return stats.percentileofscore(cads, float(time) / (24.0 * 60.0)) / 100.0
 
 
-def delta_t_hist(t, nbins=50):
-    """Build histogram of all possible delta_t's without storing every value"""
-    hist = np.zeros(nbins, dtype='int')
+def cad_probs(cads, times):
+    """Compute `cad_prob(cads, time)` for each of `times` (in minutes) from a
+    single sort of `cads`.
+
+    The ranks of each time among the sorted lags are found by binary search;
+    the results are equal to those of `stats.percentileofscore` (with
+    `kind='rank'`).
+
+    Returns
+    -------
+    dict
+        Dictionary with `times` as keys and probabilities as values.
+    """
+    sorted_cads = np.sort(cads)
+    scores = np.array([float(time) / (24.0 * 60.0) for time in times])
+    n_below = np.searchsorted(sorted_cads, scores, side='left')
+    n_below_or_equal = np.searchsorted(sorted_cads, scores, side='right')
+    # Mean (1-based) rank of any lags equal to the score, or the number of
+    # lags below it if there are none
+    rank = np.where(n_below_or_equal > n_below,
+                    (n_below + 1 + n_below_or_equal) / 2., n_below)
+    probs = rank / len(cads) * 100.0 / 100.0
+    return dict(zip(times, probs))
+
+
+# Series with more than this many epochs use the approximate (FFT-based)
+# `delta_t_hist` by default; see `delta_t_hist`
+DELTA_T_HIST_EXACT_MAX = 100000
+
+# Maximum number of time differences held in memory at once by
+# `_delta_t_hist_exact`
+_DELTA_T_CHUNK_SIZE = 2 ** 22
+
+
+def _delta_t_hist_pairs(t, bins):
+    """Histogram of the differences t[i] - t[j] for all j < i, computed in
+    vectorized blocks of rows.
+    """
+    n = len(t)
+    hist = np.zeros(len(bins) - 1, dtype='int')
+    start = 1
+    while start < n:
+        # Rows [start, stop) contain at most `_DELTA_T_CHUNK_SIZE` pairs
+        stop = min(n, start + max(1, _DELTA_T_CHUNK_SIZE // start))
+        deltas = t[start:stop, np.newaxis] - t[np.newaxis, :stop - 1]
+        lower = (np.arange(stop - 1)[np.newaxis, :]
+                 < np.arange(start, stop)[:, np.newaxis])
+        hist += np.histogram(deltas[lower], bins=bins)[0]
+        start = stop
+    return hist
+
+
+def _delta_t_hist_sorted(t, bins):
+    """Histogram of the differences t[i] - t[j] for all j < i of sorted times.
+
+    For each i, the differences decrease with j, so the pairs with
+    differences of at least `bins[k]` are those with j below a threshold; the
+    thresholds are found by binary search and then corrected so that the
+    differences are compared exactly as in `np.histogram`.
+    """
+    n = len(t)
+    rows = np.arange(n)
+    # Number of pairs with differences >= each of the lower bin edges
+    at_least = np.zeros(len(bins) - 1, dtype='int')
+    for k, edge in enumerate(bins[:-1]):
+        q = np.minimum(np.searchsorted(t, t - edge, side='right'), rows)
+        while True:  # rounding of t[i] - edge vs. t[i] - t[j] >= edge
+            low = (q > 0) & (t - t[q - 1] < edge)
+            if not low.any():
+                break
+            q[low] = np.searchsorted(t, t[q[low] - 1], side='left')
+        while True:
+            high = (q < rows) & (t - t[np.minimum(q, n - 1)] >= edge)
+            if not high.any():
+                break
+            q[high] = np.minimum(np.searchsorted(t, t[q[high]], side='right'),
+                                 rows[high])
+        at_least[k] = q.sum()
+    return at_least - np.append(at_least[1:], 0)
+
+
+def _delta_t_hist_fft(t, nbins, oversampling):
+    """Approximate histogram of all pairwise time differences, computed from
+    the autocorrelation of the times binned on a grid `oversampling` times
+    finer than the output bins.
+
+    Pairs of times with a grid offset of `k` fine bins are split equally
+    between the differences [(k - 1) w, k w) and [k w, (k + 1) w), where `w`
+    is the fine bin width; the result is exact up to pairs that fall within
+    one fine bin of an output bin edge.
+    """
+    nfine = nbins * oversampling
+    total_time = max(t) - min(t)
+    if total_time == 0:
+        hist = np.zeros(nbins)
+        hist[0] = len(t) * (len(t) - 1) / 2
+        return hist
+    index = np.minimum(((t - min(t)) * (nfine / total_time)).astype(int),
+                       nfine - 1)
+    counts = np.bincount(index, minlength=nfine).astype(float)
+    nfft = 1 << int(np.ceil(np.log2(2 * nfine)))
+    fcounts = np.fft.rfft(counts, nfft)
+    lags = np.rint(np.fft.irfft(fcounts * np.conj(fcounts), nfft)[:nfine])
+    lags[0] = (lags[0] - len(t)) / 2  # unordered pairs within a fine bin
+    fine_hist = lags.copy()
+    fine_hist[1:] /= 2
+    fine_hist[:-1] += lags[1:] / 2
+    return fine_hist.reshape(nbins, oversampling).sum(axis=1)
+
+
+def delta_t_hist(t, nbins=50, method='auto', oversampling=16):
+    """Build histogram of all possible delta_t's without storing every value.
+
+    Parameters
+    ----------
+    t : (n,) array
+        Array of (sorted) time values.
+    nbins : int, optional
+        Number of equal-width bins between 0 and `max(t) - min(t)`.
+    method : {'auto', 'exact', 'fft'}, optional
+        'exact' counts the pairs of times in each bin by binary search
+        (O(n log n) per bin; unsorted times are histogrammed pair by pair in
+        vectorized blocks);
+        'fft' approximates the histogram from the autocorrelation of the
+        binned times (O(n + B log B) for `B = nbins * oversampling` grid
+        points). 'auto' (default) uses 'exact' for series of up to
+        `DELTA_T_HIST_EXACT_MAX` points and 'fft' otherwise.
+    oversampling : int, optional
+        Number of grid points per output bin used by the 'fft' method; the
+        fraction of misassigned pairs decreases as `1 / oversampling`.
+
+    Returns
+    -------
+    (nbins,) array
+        Number of pairs of times with differences in each bin.
+    """
+    if method == 'auto':
+        method = 'exact' if len(t) <= DELTA_T_HIST_EXACT_MAX else 'fft'
+    if method == 'fft':
+        return _delta_t_hist_fft(np.asarray(t), nbins, oversampling)
+    elif method != 'exact':
+        raise ValueError("Unknown delta_t_hist method: {}".format(method))
+    t = np.asarray(t)
     bins = np.linspace(0, max(t) - min(t), nbins+1)
-    for i in range(len(t)):
-        hist += np.histogram(t[i] - t[:i], bins=bins)[0]
-        hist += np.histogram(t[i+1:] - t[i], bins=bins)[0]
-    return hist / 2 # Double-counts since we loop over every pair twice
+    if np.all(t[1:] >= t[:-1]):
+        hist = _delta_t_hist_sorted(t, bins)
+    else:
+        hist = _delta_t_hist_pairs(t, bins)
+    return hist.astype(float)
 
 
 def normalize_hist(hist, total_time):
@@ -44,22 +185,23 @@ def find_sorted_peaks(x):
     Returns a list of tuples (i, x[i]) of peak indices i and values x[i],
     sorted in decreasing order by peak value.
     """
-    peak_inds = []
-    nbins = len(x)
-    for i in range(nbins):
-        if i == 0 or x[i] > x[i-1]: # Increasing from left
-            if i == nbins-1 or x[i] > x[i+1]: # Increasing from right
-                peak_inds.append(i)
-            elif x[i] == x[i+1]: # Tied; check the next non-equal value
-                for j in range(i+1, nbins):
-                    if x[j] != x[i]:
-                        if x[j] < x[i]:
-                            peak_inds.append(i)
-                        break
-                if j == nbins-1 and x[i] == x[j]: # Reached the end
-                    peak_inds.append(i)
-    sorted_peak_inds = sorted(peak_inds, key=lambda i: x[i], reverse=True)
-    return list(zip(sorted_peak_inds, x[sorted_peak_inds]))
+    x = np.asarray(x)
+    if len(x) == 0:
+        return []
+    # Runs of equal values are peaks if they are greater than the values on
+    # both sides; the first index of each run is reported
+    boundaries = np.flatnonzero(x[1:] != x[:-1]) + 1
+    starts = np.concatenate(([0], boundaries))
+    ends = np.concatenate((boundaries, [len(x)])) - 1
+    from_left = np.ones(len(starts), dtype=bool)
+    from_right = np.ones(len(starts), dtype=bool)
+    with np.errstate(invalid='ignore'):
+        from_left[1:] = x[starts[1:]] > x[starts[1:] - 1]
+        from_right[:-1] = x[ends[:-1] + 1] < x[ends[:-1]]
+    peak_inds = starts[from_left & from_right]
+    # Stable sort, so that equal peaks remain in increasing order of index
+    sorted_peak_inds = peak_inds[np.argsort(-x[peak_inds], kind='mergesort')]
+    return list(zip(sorted_peak_inds.tolist(), x[sorted_peak_inds]))
 
 
 def peak_ratio(peaks, i, j):
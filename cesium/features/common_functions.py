@@ -18,9 +18,33 @@ def median(x):
     return np.median(x)
 
 
-def median_absolute_deviation(x):
-    """Median absolute deviation (from the median) of the observed values."""
-    return np.median(np.abs(x - np.median(x)))
+def sorted_median(sorted_x):
+    """Median of sorted values; equal to `np.median(sorted_x)`."""
+    n = len(sorted_x)
+    return np.mean(sorted_x[(n - 1) // 2:n // 2 + 1])
+
+
+def sorted_percentile(sorted_x, q):
+    """Linearly-interpolated `q`th percentile(s) of sorted values; equal to
+    `np.percentile(sorted_x, q)`.
+    """
+    q = np.asarray(q, dtype=float) / 100.
+    index = q * (len(sorted_x) - 1)
+    lower = np.floor(index).astype(int)
+    upper = np.minimum(lower + 1, len(sorted_x) - 1)
+    weight_upper = index - lower
+    return (sorted_x[lower] * (1.0 - weight_upper) +
+            sorted_x[upper] * weight_upper)
+
+
+def median_absolute_deviation(x, x_median=None):
+    """Median absolute deviation (from the median) of the observed values.
+
+    The median of `x` is computed if `x_median` is not provided.
+    """
+    if x_median is None:
+        x_median = np.median(x)
+    return np.median(np.abs(x - x_median))
 
 
 def minimum(x):
@@ -34,10 +58,15 @@ def percent_beyond_1_std(x, e):
     return np.mean(dists_from_mu > weighted_std_dev(x, e))
 
 
-def percent_close_to_median(x, window_frac=0.1):
-    """Percentage of values within window_frac*(max(x)-min(x)) of median."""
+def percent_close_to_median(x, window_frac=0.1, x_median=None):
+    """Percentage of values within window_frac*(max(x)-min(x)) of median.
+
+    The median of `x` is computed if `x_median` is not provided.
+    """
+    if x_median is None:
+        x_median = np.median(x)
     window = (x.max() - x.min()) * window_frac
-    return np.mean(np.abs(x - np.median(x)) < window)
+    return np.mean(np.abs(x - x_median) < window)
 
 
 def skew(x):
@@ -1,15 +1,18 @@
+import operator
+
 import numpy as np
 
-from .cadence_features import (cad_prob, delta_t_hist, double_to_single_step,
+from .cadence_features import (cad_probs, delta_t_hist, double_to_single_step,
                                normalize_hist, find_sorted_peaks, peak_bin,
                                peak_ratio)
 
-from .common_functions import (maximum, median, max_slope,
+from .common_functions import (maximum, max_slope,
                                median_absolute_deviation, minimum,
                                percent_beyond_1_std, percent_close_to_median,
-                               skew, std, weighted_average)
-from .amplitude import (amplitude, percent_amplitude, flux_percentile_ratio,
-                        percent_difference_flux_percentile)
+                               skew, sorted_median, std, weighted_average)
+from .amplitude import (amplitude, sorted_flux, sorted_flux_percentile_ratio,
+                        sorted_percent_amplitude,
+                        sorted_percent_difference_flux_percentile)
 from .qso_model import (qso_fit, get_qso_log_chi2_qsonu,
                         get_qso_log_chi2nuNULL_chi2nu)
 from .stetson import (stetson_j, stetson_k)
@@ -96,6 +99,11 @@ GENERAL_FEATS = feature_categories['General']
 LOMB_SCARGLE_FEATS = feature_categories['Lomb-Scargle (Periodic)']
 
 
+# Thresholds (in minutes) of the `cad_probs_*` features
+CAD_PROB_TIMES = (1, 10, 20, 30, 40, 50, 100, 500, 1000, 5000, 10000, 50000,
+                  100000, 500000, 1000000, 5000000, 10000000)
+
+
 # See http://dask.pydata.org/en/latest/custom-graphs.html
 
 dask_feature_graph = {
@@ -110,23 +118,25 @@ dask_feature_graph = {
     'mean': (np.mean, 'm'),
     'cads_avg': (np.mean, 'cads'),
     'cads_med': (np.median, 'cads'),
-    'cad_probs_1': (cad_prob, 'cads', 1),
-    'cad_probs_10': (cad_prob, 'cads', 10),
-    'cad_probs_20': (cad_prob, 'cads', 20),
-    'cad_probs_30': (cad_prob, 'cads', 30),
-    'cad_probs_40': (cad_prob, 'cads', 40),
-    'cad_probs_50': (cad_prob, 'cads', 50),
-    'cad_probs_100': (cad_prob, 'cads', 100),
-    'cad_probs_500': (cad_prob, 'cads', 500),
-    'cad_probs_1000': (cad_prob, 'cads', 1000),
-    'cad_probs_5000': (cad_prob, 'cads', 5000),
-    'cad_probs_10000': (cad_prob, 'cads', 10000),
-    'cad_probs_50000': (cad_prob, 'cads', 50000),
-    'cad_probs_100000': (cad_prob, 'cads', 100000),
-    'cad_probs_500000': (cad_prob, 'cads', 500000),
-    'cad_probs_1000000': (cad_prob, 'cads', 1000000),
-    'cad_probs_5000000': (cad_prob, 'cads', 5000000),
-    'cad_probs_10000000': (cad_prob, 'cads', 10000000),
+    # All cadence probabilities are computed from a single sort of `cads`
+    '_cad_probs': (cad_probs, 'cads', CAD_PROB_TIMES),
+    'cad_probs_1': (operator.getitem, '_cad_probs', 1),
+    'cad_probs_10': (operator.getitem, '_cad_probs', 10),
+    'cad_probs_20': (operator.getitem, '_cad_probs', 20),
+    'cad_probs_30': (operator.getitem, '_cad_probs', 30),
+    'cad_probs_40': (operator.getitem, '_cad_probs', 40),
+    'cad_probs_50': (operator.getitem, '_cad_probs', 50),
+    'cad_probs_100': (operator.getitem, '_cad_probs', 100),
+    'cad_probs_500': (operator.getitem, '_cad_probs', 500),
+    'cad_probs_1000': (operator.getitem, '_cad_probs', 1000),
+    'cad_probs_5000': (operator.getitem, '_cad_probs', 5000),
+    'cad_probs_10000': (operator.getitem, '_cad_probs', 10000),
+    'cad_probs_50000': (operator.getitem, '_cad_probs', 50000),
+    'cad_probs_100000': (operator.getitem, '_cad_probs', 100000),
+    'cad_probs_500000': (operator.getitem, '_cad_probs', 500000),
+    'cad_probs_1000000': (operator.getitem, '_cad_probs', 1000000),
+    'cad_probs_5000000': (operator.getitem, '_cad_probs', 5000000),
+    'cad_probs_10000000': (operator.getitem, '_cad_probs', 10000000),
     'double_to_single_step': (double_to_single_step, 'cads'),
     'avg_double_to_single_step': (np.mean, 'double_to_single_step'),
     'med_double_to_single_step': (np.median, 'double_to_single_step'),
@@ -151,23 +161,36 @@ dask_feature_graph = {
     'all_times_nhist_peak3_bin': (peak_bin, 'nhist_peaks', 3),
     'all_times_nhist_peak4_bin': (peak_bin, 'nhist_peaks', 4),
 
+    # Order statistics of the magnitudes and of the linear-scale fluxes are
+    # computed from a single sort of each
+    '_sorted_m': (np.sort, 'm'),
+    '_sorted_flux': (sorted_flux, 'm'),
+    '_median_m': (sorted_median, '_sorted_m'),
+    'median': '_median_m',
+    'median_absolute_deviation': (median_absolute_deviation, '_sorted_m',
+                                  '_median_m'),
+    'percent_close_to_median': (percent_close_to_median, '_sorted_m', 0.1,
+                                '_median_m'),
+    'percent_amplitude': (sorted_percent_amplitude, '_sorted_flux'),
+    'percent_difference_flux_percentile': (
+        sorted_percent_difference_flux_percentile, '_sorted_flux'),
+    'flux_percentile_ratio_mid20': (sorted_flux_percentile_ratio,
+                                    '_sorted_flux', 20),
+    'flux_percentile_ratio_mid35': (sorted_flux_percentile_ratio,
+                                    '_sorted_flux', 35),
+    'flux_percentile_ratio_mid50': (sorted_flux_percentile_ratio,
+                                    '_sorted_flux', 50),
+    'flux_percentile_ratio_mid65': (sorted_flux_percentile_ratio,
+                                    '_sorted_flux', 65),
+    'flux_percentile_ratio_mid80': (sorted_flux_percentile_ratio,
+                                    '_sorted_flux', 80),
+
     # Standalone features (disconnected nodes)
     'amplitude': (amplitude, 'm'),
-    'flux_percentile_ratio_mid20': (flux_percentile_ratio, 'm', 20),
-    'flux_percentile_ratio_mid35': (flux_percentile_ratio, 'm', 35),
-    'flux_percentile_ratio_mid50': (flux_percentile_ratio, 'm', 50),
-    'flux_percentile_ratio_mid65': (flux_percentile_ratio, 'm', 65),
-    'flux_percentile_ratio_mid80': (flux_percentile_ratio, 'm', 80),
     'maximum': (maximum, 'm'),
     'max_slope': (max_slope, 't', 'm'),
-    'median': (median, 'm'),
-    'median_absolute_deviation': (median_absolute_deviation, 'm'),
     'minimum': (minimum, 'm'),
-    'percent_amplitude': (percent_amplitude, 'm'),
     'percent_beyond_1_std': (percent_beyond_1_std, 'm', 'e'),
-    'percent_close_to_median': (percent_close_to_median, 'm'),
-    'percent_difference_flux_percentile': (
-        percent_difference_flux_percentile, 'm'),
     'skew': (skew, 'm'),
     'std': (std, 'm'),
     'stetson_j': (stetson_j, 'm'),
@@ -294,6 +317,7 @@ feature_tags = {
     'mean': ['Astronomy', 'General'],
     'cads_avg': ['Astronomy', 'General', 'Cadence'],
     'cads_med': ['Astronomy', 'General', 'Cadence'],
+    '_cad_probs': ['Astronomy', 'General', 'Cadence'],
     'cad_probs_1': ['Astronomy', 'General', 'Cadence'],
     'cad_probs_10': ['Astronomy', 'General', 'Cadence'],
     'cad_probs_20': ['Astronomy', 'General', 'Cadence'],
@@ -343,6 +367,9 @@ feature_tags = {
     'flux_percentile_ratio_mid80': ['Astronomy'],
     'maximum': ['Astronomy', 'General'],
     'max_slope': ['Astronomy', 'General'],
+    '_sorted_m': ['Astronomy', 'General'],
+    '_sorted_flux': ['Astronomy', 'General'],
+    '_median_m': ['Astronomy', 'General'],
     'median': ['Astronomy', 'General'],
     'median_absolute_deviation': ['Astronomy', 'General'],
     'minimum': ['Astronomy', 'General'],
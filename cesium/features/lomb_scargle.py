@@ -1,9 +1,15 @@
 import numpy as np
 import scipy.stats as stats
-from ._lomb_scargle import lomb_scargle
+from ._lomb_scargle import lomb_scargle, lomb_scargle_batch
+from .lomb_scargle_fast import fast_periodogram
+from . import time_cache
 
 
-def lomb_scargle_model(time, signal, error, sys_err=0.05, nharm=8, nfreq=3, tone_control=5.0):
+def lomb_scargle_model(time, signal, error, sys_err=0.05, nharm=8, nfreq=3,
+                       tone_control=5.0, model_error=False, n_threads=1,
+                       fmin=None, fmax=33., oversampling=None,
+                       n_candidates=None, fast_candidates=None,
+                       prewhiten_candidates=None, min_signif=3.):
     """Simultaneous fit of a sum of sinusoids by weighted least squares:
            y(t) = Sum_k Ck*t^k + Sum_i Sum_j A_ij sin(2*pi*j*fi*(t-t0)+phi_j),
            i=[1,nfreq], j=[1,nharm]
@@ -25,6 +31,44 @@ def lomb_scargle_model(time, signal, error, sys_err=0.05, nharm=8, nfreq=3, tone
     nfreq : int
         Number of frequencies to fit.
 
+    model_error : bool
+        If True, compute pointwise model/trend uncertainties for each fitted
+        frequency (see `fit_lomb_scargle`). Defaults to False.
+
+    n_threads : int
+        Number of threads used to scan the frequency grid (see
+        `fit_lomb_scargle`); only worthwhile for very long time series.
+        Defaults to 1.
+
+    fmin, fmax : float
+        Range of frequencies to search. Defaults to 1 / baseline and 33.
+
+    oversampling : float
+        Number of grid points per 1 / baseline frequency interval. Defaults
+        to 1.25.
+
+    n_candidates : int
+        If given, only the `n_candidates` highest peaks of a single-harmonic
+        periodogram are refined (see `fit_lomb_scargle`). Defaults to None
+        (refine all significant frequencies).
+
+    fast_candidates : bool
+        Whether to select candidates using the O(N log N) periodogram
+        `lomb_scargle_fast.fast_periodogram` (see `fit_lomb_scargle`).
+        Defaults to None (choose the faster method).
+
+    prewhiten_candidates : int
+        If given, the `prewhiten_candidates` highest peaks of the periodogram
+        of the first frequency search are kept, and the searches for the
+        remaining frequencies (after prewhitening) only scan the full grid
+        around these peaks (see `fit_lomb_scargle`). Defaults to None (scan
+        the full grid for every frequency).
+
+    min_signif : float
+        With `prewhiten_candidates`, a frequency whose restricted search
+        finds a fit less significant than `min_signif` (in sigmas) is
+        searched for again on the full grid. Defaults to 3.
+
     Returns
     -------
     dict
@@ -43,24 +87,30 @@ def lomb_scargle_model(time, signal, error, sys_err=0.05, nharm=8, nfreq=3, tone
 
     chi0 = np.dot(signal**2, wt)
 
-# TODO parametrize?
-    f0 = 1. / max(time)
-    df = 0.8 / max(time) # 20120202 :    0.1/Xmax
-    fmax = 33. #pre 20120126: 10. # 25
-    numf = int((fmax - f0) / df) # TODO !!! this is off by 1 point, fix?
+    f0, df, numf = _frequency_grid(time, fmin, fmax, oversampling)
 
     model_dict = {'freq_fits' : []}
     lambda0_range = [-np.log10(len(time)), 8] # these numbers "fix" the strange-amplitude effect
+    fit_args = dict(tone_control=tone_control, lambda0_range=lambda0_range,
+                    nharm=nharm, model_error=model_error, n_threads=n_threads,
+                    n_candidates=n_candidates, fast_candidates=fast_candidates)
+    peaks = None
     for i in range(nfreq):
         if i == 0:
             fit = fit_lomb_scargle(time, signal, dy0, f0, df, numf,
-                    tone_control=tone_control, lambda0_range=lambda0_range,
-                    nharm=nharm, detrend_order=1)
+                                   detrend_order=1,
+                                   n_peaks=prewhiten_candidates, **fit_args)
             model_dict['trend'] = fit['trend_coef'][1]
+            peaks = fit.pop('peaks', None)
         else:
-            fit = fit_lomb_scargle(time, signal, dy0, f0, df, numf,
-                    tone_control=tone_control, lambda0_range=lambda0_range,
-                    nharm=nharm, detrend_order=0)
+            fit = None
+            if peaks is not None:
+                fit = fit_lomb_scargle(time, signal, dy0, f0, df, numf,
+                                       detrend_order=0, candidates=peaks,
+                                       **fit_args)
+            if fit is None or fit['signif'] < min_signif:
+                fit = fit_lomb_scargle(time, signal, dy0, f0, df, numf,
+                                       detrend_order=0, **fit_args)
         model_dict['freq_fits'].append(fit)
         signal -= fit['model']
         model_dict['freq_fits'][-1]['resid'] = signal.copy()
@@ -77,6 +127,87 @@ def lomb_scargle_model(time, signal, error, sys_err=0.05, nharm=8, nfreq=3, tone
     return model_dict
 
 
+def _frequency_grid(time, fmin, fmax, oversampling):
+    """First frequency, step and number of frequencies of the grid searched
+    by `lomb_scargle_model` (for times starting at 0).
+    """
+    f0 = 1. / max(time) if fmin is None else fmin
+    if oversampling is None:
+        df = 0.8 / max(time) # 20120202 :    0.1/Xmax
+    else:
+        df = 1. / (oversampling * max(time))
+    numf = int((fmax - f0) / df) # TODO !!! this is off by 1 point, fix?
+    return f0, df, numf
+
+
+def lomb_scargle_model_batch(time, signals, error, sys_err=0.05, nharm=8,
+                             nfreq=3, tone_control=5.0, model_error=False,
+                             fmin=None, fmax=33., oversampling=None):
+    """Fit `lomb_scargle_model` to several time series sharing the same time
+    and error values (e.g. channels of a multichannel time series).
+
+    The frequency grid is scanned once for all series (see
+    `fit_lomb_scargle_batch`), so that the sin/cos values and the sums that
+    only depend on the times and errors are computed once per frequency.
+
+    Parameters
+    ----------
+    time : array_like
+        Array containing time values.
+
+    signals : array_like
+        (k, n) array containing the data values of each time series.
+
+    error : array_like
+        Array containing measurement error values (shared by all series).
+
+    Other parameters are as for `lomb_scargle_model`.
+
+    Returns
+    -------
+    list of dict
+        Fitted models, the same as `lomb_scargle_model(time, signal, error)`
+        for each `signal` in `signals`.
+    """
+    dy0 = np.sqrt(error**2 + sys_err**2)
+
+    wt = 1. / dy0**2
+    time = time.copy() - min(time)
+    signals = np.array(signals, dtype='float64', ndmin=2)
+
+    chi0 = [np.dot(signal**2, wt) for signal in signals]
+
+    f0, df, numf = _frequency_grid(time, fmin, fmax, oversampling)
+
+    model_dicts = [{'freq_fits' : []} for signal in signals]
+    lambda0_range = [-np.log10(len(time)), 8]
+    for i in range(nfreq):
+        fits = fit_lomb_scargle_batch(time, signals, dy0, f0, df, numf,
+                                      tone_control=tone_control,
+                                      lambda0_range=lambda0_range,
+                                      nharm=nharm, detrend_order=int(i == 0),
+                                      model_error=model_error)
+        for model_dict, signal, fit, chi0_k in zip(model_dicts, signals, fits,
+                                                   chi0):
+            if i == 0:
+                model_dict['trend'] = fit['trend_coef'][1]
+            model_dict['freq_fits'].append(fit)
+            signal -= fit['model']
+            fit['resid'] = signal.copy()
+            if i == 0:
+                model_dict['varrat'] = np.dot(signal**2, wt) / chi0_k
+
+    for model_dict in model_dicts:
+        model_dict['nfreq'] = nfreq
+        model_dict['nharm'] = nharm
+        model_dict['chi2'] = model_dict['freq_fits'][-1]['chi2']
+        model_dict['f0'] = f0
+        model_dict['df'] = df
+        model_dict['numf'] = numf
+
+    return model_dicts
+
+
 def lprob2sigma(lprob):
     """Translate a log_e(probability) to units of Gaussian sigmas."""
     if lprob > -36.:
@@ -88,61 +219,134 @@ def lprob2sigma(lprob):
     return sigma
 
 
-def fit_lomb_scargle(time, signal, error, f0, df, numf, nharm=8, psdmin=6., detrend_order=0,
-         freq_zoom=10., tone_control=5., lambda0=1., lambda0_range=[-8,6]):
-    """Calls C implementation of Lomb Scargle sinusoid fitting, which fits a
-    single frequency with nharm harmonics to the data. Called repeatedly by
-    lomb_scargle_model in order to produce a fit with multiple distinct
-    frequencies.
+def _diag_quad_form(a, b):
+    """Diagonal of `np.dot(b.T, np.dot(a, b))` without forming the full
+    (ntime, ntime) product; requires O(npar * ntime) memory.
+    """
+    return np.einsum('ij,ij->j', np.dot(a, b), b)
 
-    Inputs:
-    time : array_like
-        Array containing time values.
 
-    signal : array_like
-        Array containing data values.
+def _candidate_peaks(psd, n_candidates, min_separation=1):
+    """Indices of the (at most) `n_candidates` highest local maxima of `psd`,
+    skipping any maximum closer than `min_separation` to a higher one.
+    """
+    padded = np.hstack((-np.inf, psd, -np.inf))
+    peaks = np.where((psd >= padded[:-2]) & (psd > padded[2:]))[0]
+    peaks = peaks[np.argsort(-psd[peaks], kind='mergesort')]
+    if min_separation <= 1:
+        return peaks[:n_candidates]
+    selected = []
+    for j in peaks:
+        if all(abs(j - k) >= min_separation for k in selected):
+            selected.append(j)
+            if len(selected) == n_candidates:
+                break
+    return np.array(selected, dtype=peaks.dtype)
+
+
+def _step_tables(tt, df, freq_zoom):
+    """sin/cos of the phase steps used by the C frequency grid search."""
+    sinx_step,cosx_step = np.sin(tt*df),np.cos(tt*df)
+    sinx_back,cosx_back = -np.sin(tt*df/2.),np.cos(tt*df/2)
+    sinx_smallstep,cosx_smallstep = np.sin(tt*df/freq_zoom),np.cos(tt*df/freq_zoom)
+    return (sinx_step, cosx_step, sinx_back, cosx_back, sinx_smallstep,
+            cosx_smallstep)
 
-    error : array_like
-        Array containing measurement error values.
 
-    f0 : float
-        Smallest frequency value to consider.
+def _scan_frequencies(tt, wth0, wth, cn, f0, df, numf, nharm, detrend_order,
+                      chi0, freq_zoom, psdmin, tone_control, lambda0,
+                      lambda0_range, n_threads):
+    """Run the C frequency grid search on `numf` frequencies starting at `f0`.
 
-    df : float
-        Step size for frequency grid search.
+    Returns
+    -------
+    tuple
+        Periodogram, the `hat_matr`, `hat_hat`, `hat0` and `soln` arrays of
+        the multiharmonic fit at the best frequency, its regularization
+        parameter, trace and zoom offset (see `fit_lomb_scargle`).
+    """
+    ntime = len(tt)
+    nblock = max(1, min(n_threads, numf))
+    fstart = f0 + df * (numf * np.arange(nblock) // nblock)
+    sinx = np.sin(np.outer(fstart, tt)) * wth0
+    cosx = np.cos(np.outer(fstart, tt)) * wth0
+    (sinx_step, cosx_step, sinx_back, cosx_back, sinx_smallstep,
+     cosx_smallstep) = time_cache.TIME_GRID_CACHE.grid(tt).get(
+         ('lomb_scargle_steps', df, freq_zoom), _step_tables, tt, df,
+         freq_zoom)
 
-    numf : int
-        Number of frequencies for frequency grid search.
+    npar = 2*nharm
+    hat_matr = np.zeros((npar,ntime),dtype='float64')
+    hat0 = np.zeros((npar,detrend_order+1),dtype='float64')
+    hat_hat = np.zeros((npar,npar),dtype='float64')
+    soln = np.zeros(npar,dtype='float64')
+    psd = np.zeros(numf,dtype='float64')
 
-    nharm : int
-        Number of harmonics to fit.
+    Tr = np.array(0., dtype='float64')
+    ifreq = np.array(0, dtype='int32')
+    lambda0 = np.array(lambda0, dtype='float64')
 
-    detrend_order : int
-        Order of polynomial detrending.
+    lomb_scargle(ntime, numf, nharm, detrend_order, psd, cn, wth, sinx, cosx,
+            sinx_step, cosx_step, sinx_back, cosx_back, sinx_smallstep,
+            cosx_smallstep, hat_matr, hat_hat, hat0, soln, chi0, freq_zoom,
+            psdmin, tone_control, lambda0, lambda0_range, Tr, ifreq)
+    return psd, hat_matr, hat_hat, hat0, soln, lambda0, Tr, ifreq
 
-    psdmin : int
-        Refine periodogram values with larger psd using multi-harmonic fit
 
-    nharm : int
-        Number of harmonics to use in refinement
+def _scan_frequencies_batch(tt, wth0, wth, cn, f0, df, numf, nharm,
+                            detrend_order, chi0, freq_zoom, psdmin,
+                            tone_control, lambda0, lambda0_range):
+    """Run the C frequency grid search for each row of `cn` (with values of
+    `chi0` and `psdmin` for each row), for data sharing the weights `wth0`.
 
-    lambda0 : float
-        Typical value for regularization parameter
+    Returns
+    -------
+    list of tuple
+        Results of `_scan_frequencies` (with a single block) for each row.
+    """
+    nseries, ntime = cn.shape
+    sinx = np.sin(np.outer(f0, tt))[0] * wth0
+    cosx = np.cos(np.outer(f0, tt))[0] * wth0
+    (sinx_step, cosx_step, sinx_back, cosx_back, sinx_smallstep,
+     cosx_smallstep) = time_cache.TIME_GRID_CACHE.grid(tt).get(
+         ('lomb_scargle_steps', df, freq_zoom), _step_tables, tt, df,
+         freq_zoom)
 
-    lambda0_range : [float, float]
-        Allowable range for log10 of regularization parameter
+    npar = 2*nharm
+    hat_matr = np.zeros((nseries,npar,ntime),dtype='float64')
+    hat0 = np.zeros((nseries,npar,detrend_order+1),dtype='float64')
+    hat_hat = np.zeros((nseries,npar,npar),dtype='float64')
+    soln = np.zeros((nseries,npar),dtype='float64')
+    psd = np.zeros((nseries,numf),dtype='float64')
+
+    Tr = np.zeros(nseries, dtype='float64')
+    ifreq = np.zeros(nseries, dtype='int32')
+    lambda0 = np.full(nseries, lambda0, dtype='float64')
+
+    lomb_scargle_batch(ntime, numf, nharm, detrend_order, psd, cn,
+                       np.ascontiguousarray(wth), sinx, cosx, sinx_step,
+                       cosx_step, sinx_back, cosx_back, sinx_smallstep,
+                       cosx_smallstep, hat_matr, hat_hat, hat0, soln,
+                       np.asarray(chi0, dtype='float64'), freq_zoom,
+                       np.asarray(psdmin, dtype='float64'), tone_control,
+                       lambda0, lambda0_range, Tr, ifreq)
+    return [(psd[k], hat_matr[k], hat_hat[k], hat0[k], soln[k],
+             lambda0[k, ...], Tr[k, ...], ifreq[k, ...])
+            for k in range(nseries)]
+
+
+def _prepare_fit(time, signal, error, detrend_order):
+    """Weight and detrend the data for `fit_lomb_scargle`.
 
     Returns
     -------
     dict
-        Dictionary describing various parameters of the multiharmonic fit at
-        the best-fit frequency
+        Normalized weights `wth0`, orthogonal detrending basis `wth`,
+        detrended weighted data `cn` and the other quantities needed to
+        describe the fit (see `_fit_results`).
     """
     ntime = len(time)
 
-# For some reason we round this to the nearest even integer
-    freq_zoom = round(freq_zoom/2.)*2.
-
 # Polynomial terms
     coef = np.zeros(detrend_order + 1, dtype='float64')
     norm = np.zeros(detrend_order + 1, dtype='float64')
@@ -158,19 +362,7 @@ def fit_lomb_scargle(time, signal, error, f0, df, numf, nharm=8, psdmin=6., detr
     cn -= coef[0] * wth0
     vcn = 1.
 
-    # np.sin's and cosin's for later
     tt = 2. * np.pi * time
-    sinx,cosx = np.sin(tt*f0)*wth0,np.cos(tt*f0)*wth0
-    sinx_step,cosx_step = np.sin(tt*df),np.cos(tt*df)
-    sinx_back,cosx_back = -np.sin(tt*df/2.),np.cos(tt*df/2)
-    sinx_smallstep,cosx_smallstep = np.sin(tt*df/freq_zoom),np.cos(tt*df/freq_zoom)
-
-    npar = 2*nharm
-    hat_matr = np.zeros((npar,ntime),dtype='float64')
-    hat0 = np.zeros((npar,detrend_order+1),dtype='float64')
-    hat_hat = np.zeros((npar,npar),dtype='float64')
-    soln = np.zeros(npar,dtype='float64')
-    psd = np.zeros(numf,dtype='float64')
 
     # Detrend the data and create the orthogonal detrending basis
     if detrend_order > 0:
@@ -192,18 +384,24 @@ def fit_lomb_scargle(time, signal, error, f0, df, numf, nharm=8, psdmin=6., detr
 
     chi0 = np.dot(cn,cn)
     varcn = chi0/(ntime-1-detrend_order)
-    psdmin *= 2*varcn
 
-    Tr = np.array(0., dtype='float64')
-    ifreq = np.array(0, dtype='int32')
-    lambda0 = np.array(lambda0 / s0, dtype='float64')
-    lambda0_range = 10**np.array(lambda0_range, dtype='float64') / s0
+    return {'wth0': wth0, 's0': s0, 'wth': wth, 'cn': cn, 'cn0': cn0,
+            'coef': coef, 'norm': norm, 'vcn': vcn, 'chi0': chi0,
+            'varcn': varcn}
+
+
+def _fit_results(time, prep, result, f0, df, nharm, detrend_order, freq_zoom,
+                 model_error):
+    """Describe the multiharmonic fit at the best frequency found by
+    `_scan_frequencies` (see `fit_lomb_scargle`).
+    """
+    ntime = len(time)
+    npar = 2*nharm
+    wth0, s0, wth, cn0, coef, norm, vcn, chi0, varcn = (
+        prep[k] for k in ('wth0', 's0', 'wth', 'cn0', 'coef', 'norm', 'vcn',
+                          'chi0', 'varcn'))
+    psd, hat_matr, hat_hat, hat0, soln, lambda0, Tr, ifreq = result
 
-    lomb_scargle(ntime, numf, nharm, detrend_order, psd, cn, wth, sinx, cosx,
-            sinx_step, cosx_step, sinx_back, cosx_back, sinx_smallstep,
-            cosx_smallstep, hat_matr, hat_hat, hat0, soln, chi0, freq_zoom,
-            psdmin, tone_control, lambda0, lambda0_range, Tr, ifreq)
-    
     hat_hat /= s0
     ii = np.arange(nharm, dtype='int32')
     soln[0:nharm] /= (1. + ii)**2
@@ -247,10 +445,13 @@ def fit_lomb_scargle(time, signal, error, f0, df, numf, nharm=8, psdmin=6., detr
     vA0, vB0 = err2[0:nharm], err2[nharm:]
     covA0B0 = hat_hat[(ii,nharm+ii)]
 
-    vmodl = vcn/s0 + np.dot((hat_matr/wth0).T, np.dot(hat_hat, hat_matr/wth0))
-    vmodl0 = vcn/s0 + np.dot((hat_matr0/wth0).T, np.dot(hat_hat, hat_matr0/wth0))
-    out_dict['model_error'] = np.sqrt(np.diag(vmodl))
-    out_dict['trend_error'] = np.sqrt(np.diag(vmodl0))
+    if model_error:
+        out_dict['model_error'] = np.sqrt(vcn / s0 +
+                                          _diag_quad_form(hat_hat,
+                                                          hat_matr / wth0))
+        out_dict['trend_error'] = np.sqrt(vcn / s0 +
+                                          _diag_quad_form(hat_hat,
+                                                          hat_matr0 / wth0))
 
     amp = np.sqrt(A0**2 + B0**2)
     damp = np.sqrt(A0**2 * vA0 + B0**2 * vB0 + 2. * A0 * B0 * covA0B0) / amp
@@ -281,6 +482,207 @@ def fit_lomb_scargle(time, signal, error, f0, df, numf, nharm=8, psdmin=6., detr
     return out_dict
 
 
+def fit_lomb_scargle(time, signal, error, f0, df, numf, nharm=8, psdmin=6., detrend_order=0,
+         freq_zoom=10., tone_control=5., lambda0=1., lambda0_range=[-8,6],
+         model_error=False, n_threads=1, n_candidates=None,
+         fast_candidates=None, candidates=None, n_peaks=None):
+    """Calls C implementation of Lomb Scargle sinusoid fitting, which fits a
+    single frequency with nharm harmonics to the data. Called repeatedly by
+    lomb_scargle_model in order to produce a fit with multiple distinct
+    frequencies.
+
+    Inputs:
+    time : array_like
+        Array containing time values.
+
+    signal : array_like
+        Array containing data values.
+
+    error : array_like
+        Array containing measurement error values.
+
+    f0 : float
+        Smallest frequency value to consider.
+
+    df : float
+        Step size for frequency grid search.
+
+    numf : int
+        Number of frequencies for frequency grid search.
+
+    nharm : int
+        Number of harmonics to fit.
+
+    detrend_order : int
+        Order of polynomial detrending.
+
+    psdmin : int
+        Refine periodogram values with larger psd using multi-harmonic fit
+
+    nharm : int
+        Number of harmonics to use in refinement
+
+    lambda0 : float
+        Typical value for regularization parameter
+
+    lambda0_range : [float, float]
+        Allowable range for log10 of regularization parameter
+
+    model_error : bool
+        If True, also compute the pointwise uncertainties of the fitted model
+        and trend (`model_error` and `trend_error`). Defaults to False.
+
+    n_threads : int
+        Number of blocks the frequency grid is split into; the blocks are
+        scanned in parallel threads if the C extension was built with OpenMP
+        (and sequentially otherwise). Each block uses O(nharm * ntime) extra
+        memory. Results are the same as for a single block up to rounding
+        errors in the sin/cos recurrences. Defaults to 1.
+
+    n_candidates : int
+        If given, a coarse grid (with about one point per 1 / baseline
+        frequency interval, regardless of `df`) is first scanned with a
+        single-harmonic fit only; the multiharmonic refinement (including the
+        `freq_zoom` search) is then only applied to the points of the full
+        grid around the `n_candidates` highest coarse peaks. Defaults to None
+        (refine every frequency whose periodogram value exceeds `psdmin`).
+
+    fast_candidates : bool
+        If True, the candidate peaks are instead the `n_candidates` highest
+        peaks of `lomb_scargle_fast.fast_periodogram` of the detrended data,
+        evaluated on the full grid in O(N + numf log numf) time, which is
+        faster than the coarse grid search for large N. Defaults to None,
+        which chooses the method with the lower estimated cost.
+
+    candidates : array_like
+        If given, indices of frequency grid points (e.g. the `peaks` of a
+        previous fit); only the points of the full grid around them are
+        scanned, as for `n_candidates`. Defaults to None.
+
+    n_peaks : int
+        If given, the grid indices of the `n_peaks` highest periodogram peaks
+        (at least one scanning window apart) are returned as `peaks` (for use as `candidates`). If only part of
+        the grid was scanned, these are the highest of the scanned
+        candidates. Defaults to None.
+
+    Returns
+    -------
+    dict
+        Dictionary describing various parameters of the multiharmonic fit at
+        the best-fit frequency
+    """
+# For some reason we round this to the nearest even integer
+    freq_zoom = round(freq_zoom/2.)*2.
+
+    prep = _prepare_fit(time, signal, error, detrend_order)
+    wth0, wth, cn, chi0, s0 = (prep[k] for k in ('wth0', 'wth', 'cn', 'chi0',
+                                                  's0'))
+    ntime = len(time)
+    tt = 2. * np.pi * time
+    psdmin *= 2*prep['varcn']
+
+    lambda0 = lambda0 / s0
+    lambda0_range = 10**np.array(lambda0_range, dtype='float64') / s0
+
+    def scan(f0, df, numf, psdmin):
+        return _scan_frequencies(tt, wth0, wth, cn, f0, df, numf, nharm,
+                                 detrend_order, chi0, freq_zoom, psdmin,
+                                 tone_control, lambda0, lambda0_range,
+                                 n_threads)
+
+    # The coarse grid has about one point per peak width (1 / baseline);
+    # refine around its highest peaks (or those of the fast periodogram)
+    baseline = np.ptp(time)
+    step = max(1, int(1. / (df * baseline))) if baseline > 0 else 1
+    width = step + 1
+    peaks = None
+    if candidates is not None:
+        peaks = np.asarray(candidates, dtype=int)
+    elif n_candidates is not None and numf > n_candidates * (2 * width + 1):
+        if fast_candidates is None:
+            # Measured cost of the FFTs relative to the grid search
+            fast_candidates = ntime > 15 * step * np.log2(5 * numf)
+        if fast_candidates:
+            fast_psd = fast_periodogram(time, cn / wth0, 1. / wth0, f0, df,
+                                        numf)
+            peaks = _candidate_peaks(fast_psd, n_candidates)
+        else:
+            coarse_psd = scan(f0, df * step, (numf - 1) // step + 1,
+                              np.inf)[0]
+            peaks = step * _candidate_peaks(coarse_psd, n_candidates)
+    if peaks is not None:
+        windows = []
+        for j in peaks:
+            start, stop = max(0, j - width), min(numf, j + width + 1)
+            windows.append((start, scan(f0 + df * start, df, stop - start,
+                                        psdmin)))
+        order = np.argsort([-window[1][0].max() for window in windows],
+                           kind='mergesort')
+        start, result = windows[order[0]]
+        peaks = peaks[order]
+        f0 += df * start
+    else:
+        result = scan(f0, df, numf, psdmin)
+        if n_peaks is not None:
+            peaks = _candidate_peaks(result[0], n_peaks, 2 * width + 1)
+    out_dict = _fit_results(time, prep, result, f0, df, nharm, detrend_order,
+                            freq_zoom, model_error)
+    if n_peaks is not None:
+        out_dict['peaks'] = peaks[:n_peaks]
+    return out_dict
+
+
+def fit_lomb_scargle_batch(time, signals, error, f0, df, numf, nharm=8,
+                           psdmin=6., detrend_order=0, freq_zoom=10.,
+                           tone_control=5., lambda0=1., lambda0_range=[-8,6],
+                           model_error=False):
+    """Fit a single frequency with nharm harmonics to each of several time
+    series sharing the same time and error values (see `fit_lomb_scargle`).
+
+    The frequency grid is scanned once: the sin/cos recurrence and the sums
+    that only depend on the times and errors are shared by all series, so
+    only two dot products per frequency are computed for each series.
+
+    Parameters
+    ----------
+    time : array_like
+        Array containing time values.
+
+    signals : array_like
+        (k, n) array containing the data values of each time series.
+
+    error : array_like
+        Array containing measurement error values (shared by all series).
+
+    Other parameters are as for `fit_lomb_scargle`.
+
+    Returns
+    -------
+    list of dict
+        The same as `fit_lomb_scargle(time, signal, error, ...)` for each
+        `signal` in `signals`.
+    """
+    freq_zoom = round(freq_zoom/2.)*2.
+
+    preps = [_prepare_fit(time, signal, error, detrend_order)
+             for signal in signals]
+    wth0, wth, s0 = preps[0]['wth0'], preps[0]['wth'], preps[0]['s0']
+    tt = 2. * np.pi * time
+    cn = np.array([prep['cn'] for prep in preps], ndmin=2)
+    chi0 = [prep['chi0'] for prep in preps]
+    psdmin = [psdmin * 2*prep['varcn'] for prep in preps]
+
+    lambda0 = lambda0 / s0
+    lambda0_range = 10**np.array(lambda0_range, dtype='float64') / s0
+
+    results = _scan_frequencies_batch(tt, wth0, wth, cn, f0, df, numf, nharm,
+                                      detrend_order, chi0, freq_zoom, psdmin,
+                                      tone_control, lambda0, lambda0_range)
+    return [_fit_results(time, prep, result, f0, df, nharm, detrend_order,
+                         freq_zoom, model_error)
+            for prep, result in zip(preps, results)]
+
+
 def get_lomb_frequency(lomb_model, i):
     """Get the ith frequency from a fitted Lomb-Scargle model."""
     return lomb_model['freq_fits'][i-1]['freq']
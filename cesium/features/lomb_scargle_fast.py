@@ -2,15 +2,163 @@ import numpy as np
 import gatspy
 
 
-def lomb_scargle_fast_period(t, m, e):
+def _extirpolate(x, y, n, m=4):
+    """Extirpolate values `y` at (real-valued) positions `x` onto the integer
+    grid 0, ..., n - 1, using Lagrange polynomials of order `m` (Press &
+    Rybicki 1989), so that sums of the form sum(y * f(x)) for smooth f are
+    approximated by sums over the grid.
+    """
+    result = np.zeros(n, dtype=y.dtype)
+
+    # Values at integer positions are simply added to the grid
+    integers = (x % 1 == 0)
+    np.add.at(result, x[integers].astype(int), y[integers])
+    x, y = x[~integers], y[~integers]
+
+    # Spread each remaining value over the m grid points ilo, ..., ilo + m - 1
+    # surrounding it (adjusted to lie within the grid)
+    ilo = np.clip((x - m // 2).astype(int), 0, n - m)
+    numerator = y * np.prod(x - ilo - np.arange(m)[:, np.newaxis], 0)
+    denominator = float(np.prod(np.arange(1, m)))
+    for j in range(m):
+        if j > 0:
+            denominator *= j / float(j - m)
+        ind = ilo + (m - 1 - j)
+        np.add.at(result, ind, numerator / (denominator * (x - ind)))
+    return result
+
+
+def trig_sums(t, h, f0, df, numf, freq_factor=1, oversampling=5,
+              use_fft=True):
+    """Compute the sums S_j = sum(h * sin(2 pi f_j t)) and
+    C_j = sum(h * cos(2 pi f_j t)) for the frequencies
+    f_j = freq_factor * (f0 + j * df), j = 0, ..., numf - 1, in
+    O(N + numf log numf) time by extirpolating `h` onto a regular grid and
+    using an FFT (or directly, in O(N * numf) time).
+
+    Parameters
+    ----------
+    t, h : array_like
+        Time values and weights.
+    f0, df : float
+        First frequency and frequency step.
+    numf : int
+        Number of frequencies.
+    freq_factor : int, optional
+        Factor by which all frequencies are multiplied. Defaults to 1.
+    oversampling : int, optional
+        Size of the FFT grid relative to `numf`; larger values are more
+        accurate. Defaults to 5.
+    use_fft : bool, optional
+        If False, compute the sums directly instead. Defaults to True.
+
+    Returns
+    -------
+    (np.ndarray, np.ndarray)
+        Sine and cosine sums.
+    """
+    df *= freq_factor
+    f0 *= freq_factor
+    if not use_fft:
+        ft = np.outer(f0 + df * np.arange(numf), 2 * np.pi * t)
+        return np.dot(np.sin(ft), h), np.dot(np.cos(ft), h)
+
+    nfft = 1 << int(np.ceil(np.log2(numf * oversampling)))
+    t0 = t.min()
+    h = h * np.exp(2j * np.pi * f0 * (t - t0))
+    tnorm = ((t - t0) * nfft * df) % nfft
+    grid = np.fft.ifft(_extirpolate(tnorm, h, nfft))[:numf]
+    grid *= nfft * np.exp(2j * np.pi * t0 * (f0 + df * np.arange(numf)))
+    return grid.imag, grid.real
+
+
+def fast_periodogram(t, y, dy, f0, df, numf, fit_mean=True, oversampling=5,
+                     use_fft=True):
+    """Compute the (generalized) Lomb-Scargle periodogram of irregularly
+    sampled data on a regular frequency grid in O(N + numf log numf) time,
+    following Press & Rybicki (1989).
+
+    Fits the model y(t) = A sin(2 pi f t) + B cos(2 pi f t) (+ c) by weighted
+    least squares at each frequency f = f0 + j * df, j = 0, ..., numf - 1.
+
+    Parameters
+    ----------
+    t, y, dy : array_like
+        Time, measurement, and error values.
+    f0, df : float
+        First frequency and frequency step.
+    numf : int
+        Number of frequencies.
+    fit_mean : bool, optional
+        Whether to fit a constant offset along with the sinusoid at each
+        frequency ("floating mean"). Defaults to True.
+    oversampling : int, optional
+        Oversampling factor of the FFT grid; see `trig_sums`. Defaults to 5.
+    use_fft : bool, optional
+        If False, compute the periodogram exactly in O(N * numf) time (e.g.
+        for a small number of frequencies). Defaults to True.
+
+    Returns
+    -------
+    np.ndarray
+        Fraction of the (weighted) variance of `y` explained by the sinusoid
+        at each frequency.
+    """
+    t = np.asarray(t, dtype='float64')
+    w = np.asarray(dy, dtype='float64') ** -2.
+    w /= w.sum()
+    y = np.asarray(y, dtype='float64')
+    y = y - np.dot(w, y)
+
+    # Sums required to compute the time offset tau at each frequency
+    kwargs = {'oversampling': oversampling, 'use_fft': use_fft}
+    sh, ch = trig_sums(t, w * y, f0, df, numf, **kwargs)
+    s2, c2 = trig_sums(t, w, f0, df, numf, freq_factor=2, **kwargs)
+    if fit_mean:
+        s, c = trig_sums(t, w, f0, df, numf, **kwargs)
+        tan_2wt = (s2 - 2 * s * c) / (c2 - (c * c - s * s))
+    else:
+        tan_2wt = s2 / c2
+    s2w = tan_2wt / np.sqrt(1 + tan_2wt * tan_2wt)
+    c2w = 1 / np.sqrt(1 + tan_2wt * tan_2wt)
+    cw = np.sqrt(0.5 * (1 + c2w))
+    sw = np.sign(s2w) * np.sqrt(0.5 * (1 - c2w))
+
+    yc = ch * cw + sh * sw
+    ys = sh * cw - ch * sw
+    cc = 0.5 * (1 + c2 * c2w + s2 * s2w)
+    ss = 0.5 * (1 - c2 * c2w - s2 * s2w)
+    if fit_mean:
+        cc -= (c * cw + s * sw) ** 2
+        ss -= (s * cw - c * sw) ** 2
+    return (yc * yc / cc + ys * ys / ss) / np.dot(w, y * y)
+
+
+def lomb_scargle_fast_period(t, m, e, use_gatspy=True):
     """Fits a simple sinuosidal model
 
         y(t) = A sin(2*pi*w*t + phi) + c
 
     and returns the estimated period 1/w. Much faster than fitting the
     full multi-frequency model used by `features.lomb_scargle`.
+
+    By default, the period is found using gatspy's `LombScargleFast`; if
+    `use_gatspy` is False, `fast_periodogram` is evaluated on a grid
+    oversampled 5 times, and the best frequency is then refined on a finer
+    local grid.
     """
     dt = t.max() - t.min()
+    if not use_gatspy:
+        # Same period range as below: dt / (N / 2) to dt
+        df = 0.2 / dt
+        numf = int((0.5 * len(t) - 1) / (dt * df)) + 1
+        power = fast_periodogram(t, m, e, 1. / dt, df, numf)
+        best = 1. / dt + df * np.argmax(power)
+        fine_df = df / 50.
+        power = fast_periodogram(t, m, e, best - df, fine_df, 101,
+                                 use_fft=False)
+        return 1. / (best - df + fine_df * np.argmax(power))
+
     opt_args = {'period_range': (2 * dt / len(t), dt), 'quiet': True}
     model = gatspy.periodic.LombScargleFast(fit_period=True,
                                             optimizer_kwds=opt_args,
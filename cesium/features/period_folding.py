@@ -3,15 +3,38 @@ from . import lomb_scargle as ls
 from . import common_functions as cf
 
 
-# TODO is this worth it since it doubles running time?
-def period_folding(x, y, dy, lomb_model, sys_err=0.05):
+# Default for `period_folding(..., reuse_freqs=None)`; set to True to choose
+# the 2P residual frequencies among those of the Lomb-Scargle model instead
+# of running a full grid search (faster, but changes `medperc90_2p_p`)
+REUSE_LOMB_FREQS = False
+
+
+def period_folding(x, y, dy, lomb_model, sys_err=0.05, reuse_freqs=None):
     """
     This section is used to calculate Dubath (10. Percentile90:2P/P),
     which requires regenerating a model using 2P where P is the original found period
 
-    NOTE: this essentially runs everything a second time, so makes feature
-    generation take roughly twice as long.
+    Parameters
+    ----------
+    x, y, dy : array_like
+        Time, measurement, and error values.
+    lomb_model : dict
+        Fitted model as returned by `lomb_scargle.lomb_scargle_model`.
+    sys_err : float, optional
+        Systematic error added in quadrature to `dy`.
+    reuse_freqs : bool, optional
+        If True, the additional frequencies removed from the 2P-prewhitened
+        residuals are chosen among those already found by `lomb_model`
+        (each at most once, and refined within half a grid step of that
+        frequency), which requires only a few single-frequency fits. If
+        False, they are re-estimated by a full frequency grid search, which
+        essentially runs the Lomb-Scargle model a second time and makes
+        feature generation take roughly twice as long, but gives the
+        reference values of `medperc90_2p_p`. Defaults to the module-level setting
+        `REUSE_LOMB_FREQS` (False).
     """
+    if reuse_freqs is None:
+        reuse_freqs = REUSE_LOMB_FREQS
     out_dict = {}
     model_vals = np.zeros(len(y))
     freq_2p = lomb_model['freq_fits'][0]['freq'] * 0.5
@@ -28,11 +51,25 @@ def period_folding(x, y, dy, lomb_model, sys_err=0.05):
     model_vals += fit['model']
 
     ytest_2p -= fit['model']
+    candidates = [f['freq'] for f in lomb_model['freq_fits']]
     for i in range(1, lomb_model['nfreq']):
-        fit = ls.fit_lomb_scargle(x, ytest_2p, dy0, lomb_model['f0'],
-                lomb_model['df'], lomb_model['numf'], 
-                lambda0_range=lambda0_range, nharm=lomb_model['nharm'],
-                detrend_order=0)
+        if reuse_freqs:
+            # Like the grid search, rank the remaining previously found
+            # frequencies by single-harmonic power, then fit all harmonics
+            # around the best one (which is not considered again); like any
+            # `numf=1` fit, the frequency is refined within +-df/2
+            psd = [ls.fit_lomb_scargle(x, ytest_2p, dy0, f0, lomb_model['df'],
+                        1, lambda0_range=lambda0_range, nharm=1,
+                        detrend_order=0)['psd'] for f0 in candidates]
+            fit = ls.fit_lomb_scargle(x, ytest_2p, dy0,
+                    candidates.pop(np.argmax(psd)), lomb_model['df'], 1,
+                    lambda0_range=lambda0_range, nharm=lomb_model['nharm'],
+                    detrend_order=0)
+        else:
+            fit = ls.fit_lomb_scargle(x, ytest_2p, dy0, lomb_model['f0'],
+                    lomb_model['df'], lomb_model['numf'],
+                    lambda0_range=lambda0_range, nharm=lomb_model['nharm'],
+                    detrend_order=0)
         ytest_2p -= fit['model']
 
     out_dict['1p_resid'] = lomb_model['freq_fits'][-1]['resid']
@@ -1,44 +1,299 @@
 import numpy as np
-from scipy import optimize
 
-        
-# TODO what is this exactly?
-def periodic_model(lomb_model):
+from ._periodic_model import fmin_harmonic
+
+
+# Default for `periodic_model(..., method=None)`: 'fmin' follows the
+# (Nelder-Mead) basins of `scipy.optimize.fmin`, which gives the reference
+# feature values; 'grid' finds the adjacent extrema exactly instead
+EXTREMA_METHOD = 'fmin'
+
+# Number of phase grid points per harmonic used to bracket the extrema
+GRID_POINTS_PER_HARMONIC = 64
+
+# cos/sin tables of the harmonics on the phase grid, keyed by (nharm, size)
+_PHASE_GRIDS = {}
+
+
+def _phase_grid(nharm, size):
+    """Cosine and (negative) sine of 2*pi*j*u for harmonics j=1..nharm and
+    phases u = i/size, i=0..size-1, stacked into a (2*nharm, size) array.
     """
-    Compute features related to the extreme points of the fitted Lomb Scargle
-    model.
+    try:
+        return _PHASE_GRIDS[(nharm, size)]
+    except KeyError:
+        arg = 2. * np.pi * np.outer(np.arange(1, nharm + 1),
+                                    np.arange(size) / size)
+        grid = _PHASE_GRIDS[(nharm, size)] = np.vstack((np.cos(arg),
+                                                        -np.sin(arg)))
+        return grid
+
+
+def harmonic_model(t, amplitude, phase, deriv=0):
+    """Evaluate the harmonic model sum_j A_j sin(2 pi j t + ph_j) (or its
+    `deriv`th derivative) at one time `t` per series.
+
+    Parameters
+    ----------
+    t : array_like
+        (k,) array of times (in units of the period).
+    amplitude, phase : array_like
+        (k, nharm) arrays of amplitudes A_j and phases ph_j of each series.
+    deriv : int, optional
+        Order of the derivative to evaluate (0, 1 or 2).
+
+    Returns
+    -------
+    (k,) array
     """
-    out_dict = {}
+    omega = 2. * np.pi * np.arange(1, amplitude.shape[1] + 1)
+    arg = omega * np.asarray(t)[:, None] + phase
+    if deriv == 0:
+        terms = amplitude * np.sin(arg)
+    elif deriv == 1:
+        terms = amplitude * omega * np.cos(arg)
+    else:
+        terms = -amplitude * omega**2 * np.sin(arg)
+    return terms.sum(axis=1)
 
-    A = lomb_model['freq_fits'][0]['amplitude']
-    ph = lomb_model['freq_fits'][0]['rel_phase']
 
-    def model_f(t):
-        return (A[0] * np.sin(2. * np.pi      * t + ph[0]) +
-                A[1] * np.sin(2. * np.pi * 2. * t + ph[1]) +
-                A[2] * np.sin(2. * np.pi * 3. * t + ph[2]) +
-                A[3] * np.sin(2. * np.pi * 4. * t + ph[3]) +
-                A[4] * np.sin(2. * np.pi * 5. * t + ph[4]) +
-                A[5] * np.sin(2. * np.pi * 6. * t + ph[5]) +
-                A[6] * np.sin(2. * np.pi * 7. * t + ph[6]) +
-                A[7] * np.sin(2. * np.pi * 8. * t + ph[7]))
+def _refine_roots(amplitude, phase, lo, hi, t, tol=1e-12, max_iter=100):
+    """Refine a root `t` of the derivative of the harmonic model of each
+    series within the bracket [lo, hi] (where the derivative is positive at
+    `lo` and non-positive at `hi`) by safeguarded Newton iterations.
+    """
+    nharm = amplitude.shape[1]
+    omega = 2. * np.pi * np.arange(1, nharm + 1)
+    # The derivatives are the real/imaginary parts of polynomials in
+    # z = exp(2j*pi*t) (so only one complex exponential is needed per root)
+    c1 = amplitude * omega * np.exp(1j * phase)
+    c2 = c1 * omega
+    t = t.copy()
+    # Only the roots that have not converged yet are updated
+    active = np.arange(len(t))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for i in range(max_iter):
+            z = np.exp(2j * np.pi * t[active])
+            powers = np.cumprod(np.repeat(z[:, None], nharm, axis=1), axis=1)
+            d1 = (c1[active] * powers).sum(axis=1).real
+            d2 = -(c2[active] * powers).sum(axis=1).imag
+            rising = d1 > 0.
+            lo[active] = np.where(rising, t[active], lo[active])
+            hi[active] = np.where(rising, hi[active], t[active])
+            t_new = t[active] - d1 / d2
+            outside = ~((t_new - lo[active]) * (t_new - hi[active]) <= 0.)
+            t_new[outside] = 0.5 * (lo[active] + hi[active])[outside]
+            converged = np.abs(t_new - t[active]) <= tol
+            t[active] = t_new
+            active = active[~converged]
+            if len(active) == 0:
+                break
+    return t
+
+
+def model_extrema(amplitude, phase, grid_size=None):
+    """Find all local extrema within one period of the harmonic model of
+    each series.
+
+    The derivative of the model is evaluated on a dense grid of phases (one
+    matrix product for all series); each grid interval in which it changes
+    sign brackets an extremum, which is then refined by safeguarded Newton
+    iterations on the analytic derivative.
+
+    Parameters
+    ----------
+    amplitude, phase : array_like
+        (k, nharm) arrays of amplitudes and phases of each series (see
+        `harmonic_model`).
+    grid_size : int, optional
+        Number of phase grid points; defaults to
+        `GRID_POINTS_PER_HARMONIC * nharm`. Extrema closer together than
+        the grid spacing may be missed.
+
+    Returns
+    -------
+    times : (k, n_extrema) array
+        Sorted times (within [0, 1]) of the extrema of each series, padded
+        with NaN.
+    is_maximum : (k, n_extrema) array
+        Whether each extremum is a maximum (False for padding).
+    """
+    k, nharm = amplitude.shape
+    if grid_size is None:
+        grid_size = GRID_POINTS_PER_HARMONIC * nharm
+
+    # Derivative (up to the factor 2*pi) of the model on the phase grid
+    a = amplitude * np.arange(1, nharm + 1)
+    grad = np.dot(np.hstack((a * np.cos(phase), a * np.sin(phase))),
+                  _phase_grid(nharm, grid_size))
+    rising = grad > 0.
+    rows, cols = np.nonzero(rising != np.roll(rising, -1, axis=1))
+    is_maximum = rising[rows, cols]
+
+    # Refine from the linear interpolation of the derivative in each bracket
+    g_lo = grad[rows, cols]
+    g_hi = grad[rows, (cols + 1) % grid_size]
+    with np.errstate(invalid='ignore'):
+        frac = np.nan_to_num(g_lo / (g_lo - g_hi))
+    lo = cols / grid_size
+    hi = (cols + 1) / grid_size
+    t = _refine_roots(amplitude[rows], phase[rows],
+                      np.where(is_maximum, lo, hi), np.where(is_maximum, hi, lo),
+                      lo + frac / grid_size)
 
-    def model_neg(t):
-        return -1. * model_f(t)
+    counts = np.bincount(rows, minlength=k)
+    position = np.arange(len(rows)) - (np.cumsum(counts) - counts)[rows]
+    # (at least one column, so that constant models can be handled too)
+    times = np.full((k, max(1, counts.max() if k else 0)), np.nan)
+    times[rows, position] = t
+    maxima = np.zeros(times.shape, dtype=bool)
+    maxima[rows, position] = is_maximum
+    return times, maxima
+
+
+def _next_extremum(times, is_target, start, forward):
+    """Time of the first target extremum (see `model_extrema`) after `start`
+    for the series where `forward` is True, and of the last one before
+    `start` for the others; `start` is returned for series without any
+    target extrema.
+    """
+    rows = np.arange(len(start))
+    last = times.shape[1] - 1
+    period = np.floor(start)
+    with np.errstate(invalid='ignore'):
+        after = is_target & (times >= (start - period)[:, None])
+        before = is_target & (times <= (start - period)[:, None])
+    # Otherwise, wrap around to the first (last) target extremum of the next
+    # (previous) period
+    index = np.where(forward, np.argmax(after, axis=1),
+                     last - np.argmax(before[:, ::-1], axis=1))
+    wrap = np.where(forward, ~after.any(axis=1), ~before.any(axis=1))
+    index[wrap] = np.where(forward, np.argmax(is_target, axis=1),
+                           last - np.argmax(is_target[:, ::-1], axis=1))[wrap]
+    t = period + times[rows, index] + wrap * np.where(forward, 1., -1.)
+    return np.where(is_target.any(axis=1), t, start)
+
+
+def find_extremum(amplitude, phase, start, maximum=True, extrema=None):
+    """Find the local extremum of the harmonic model of each series that is
+    reached by moving uphill (or downhill, for minima) from `start`.
+
+    Parameters
+    ----------
+    amplitude, phase : array_like
+        (k, nharm) arrays of amplitudes and phases of each series (see
+        `harmonic_model`).
+    start : array_like
+        (k,) array of starting times (in units of the period).
+    maximum : bool, optional
+        Whether to find local maxima (otherwise minima).
+    extrema : tuple, optional
+        Output of `model_extrema(amplitude, phase)`, if already computed.
+
+    Returns
+    -------
+    (k,) array
+        Times of the extrema (not reduced modulo the period), or `start` for
+        constant models.
+    """
+    if extrema is None:
+        extrema = model_extrema(amplitude, phase)
+    times, is_target = extrema
+    if not maximum:
+        is_target = ~is_target & ~np.isnan(times)
+    grad = harmonic_model(start, amplitude, phase, deriv=1)
+    return _next_extremum(times, is_target, start,
+                          grad >= 0. if maximum else grad <= 0.)
+
+
+def periodic_model_batch(amplitude, phase, method=None):
+    """Compute the features of `periodic_model` for several fitted
+    Lomb-Scargle models at once.
+
+    Parameters
+    ----------
+    amplitude, phase : array_like
+        (k, nharm) arrays of the amplitudes and relative phases of the
+        harmonics of the first frequency of each model.
+    method : {'fmin', 'grid'}, optional
+        How the extrema are found from each starting point; see
+        `periodic_model`. Defaults to the module-level setting
+        `EXTREMA_METHOD` ('fmin').
+
+    Returns
+    -------
+    dict
+        Same keys as `periodic_model`, with (k,) arrays of values.
+    """
+    if method is None:
+        method = EXTREMA_METHOD
+    amplitude = np.array(amplitude, dtype='float64', ndmin=2, order='C')
+    phase = np.array(phase, dtype='float64', ndmin=2, order='C')
 
     # Start finding 1st minima, at 5% of phase (fudge/magic number) > 0.018
-    min_1_a = optimize.fmin(model_neg, 0.05, disp=False)[0]
-    max_2_a = optimize.fmin(model_f, min_1_a + 0.01, disp=False)[0]
-    min_3_a = optimize.fmin(model_neg, max_2_a + 0.01, disp=False)[0]
-    max_4_a = optimize.fmin(model_f, min_3_a + 0.01, disp=False)[0]
+    # (the "minima" here are the maxima of the model, cf. magnitudes)
+    start = np.full(len(amplitude), 0.05)
+    if method == 'fmin':
+        min_1_a, min_1_f = fmin_harmonic(amplitude, phase, start, True)
+        max_2_a, max_2_f = fmin_harmonic(amplitude, phase, min_1_a + 0.01,
+                                         False)
+        min_3_a, min_3_f = fmin_harmonic(amplitude, phase, max_2_a + 0.01,
+                                         True)
+        max_4_a, max_4_f = fmin_harmonic(amplitude, phase, min_3_a + 0.01,
+                                         False)
+    elif method == 'grid':
+        extrema = model_extrema(amplitude, phase)
+        min_1_a = find_extremum(amplitude, phase, start, True, extrema)
+        max_2_a = find_extremum(amplitude, phase, min_1_a + 0.01, False,
+                                extrema)
+        min_3_a = find_extremum(amplitude, phase, max_2_a + 0.01, True,
+                                extrema)
+        max_4_a = find_extremum(amplitude, phase, min_3_a + 0.01, False,
+                                extrema)
+        min_1_f, max_2_f, min_3_f, max_4_f = [
+            harmonic_model(t, amplitude, phase)
+            for t in (min_1_a, max_2_a, min_3_a, max_4_a)]
+    else:
+        raise ValueError("Unknown method '{}'; expected 'fmin' or "
+                         "'grid'".format(method))
 
+    out_dict = {}
 # TODO !!! is this wrong? seems like it should be a minus
     out_dict['phi1_phi2'] = (min_3_a - max_2_a) / (max_4_a / min_3_a)
-    out_dict['min_delta_mags'] = abs(model_f(min_1_a) - model_f(min_3_a))
-    out_dict['max_delta_mags'] = abs(model_f(max_2_a) - model_f(max_4_a))
+    out_dict['min_delta_mags'] = abs(min_1_f - min_3_f)
+    out_dict['max_delta_mags'] = abs(max_2_f - max_4_f)
     return out_dict
 
 
+# TODO what is this exactly?
+def periodic_model(lomb_model, method=None):
+    """
+    Compute features related to the extreme points of the fitted Lomb Scargle
+    model.
+
+    Starting at 5% of the phase, the model's maximum, then minimum, maximum
+    and minimum are found in turn, each starting just past the previous one.
+
+    Parameters
+    ----------
+    lomb_model : dict
+        Fitted model as returned by `lomb_scargle.lomb_scargle_model`.
+    method : {'fmin', 'grid'}, optional
+        With 'fmin', each extremum is the one (within ~1e-4) that
+        `scipy.optimize.fmin` converges to from the starting point, as in
+        the reference feature values; its expanding Nelder-Mead steps may
+        skip over nearby small ripples. With 'grid', it is the adjacent
+        extremum uphill (or downhill) from the starting point, located
+        exactly (see `find_extremum`), which can give different features
+        for models with small ripples. Defaults to the module-level setting
+        `EXTREMA_METHOD` ('fmin').
+    """
+    A = lomb_model['freq_fits'][0]['amplitude']
+    ph = lomb_model['freq_fits'][0]['rel_phase']
+    out_dict = periodic_model_batch(A, ph, method)
+    return {key: value[0] for key, value in out_dict.items()}
+
+
 def get_max_delta_mags(model):
     """Largest value minus second largest value of fitted Lomb Scargle model."""
     return model['max_delta_mags']
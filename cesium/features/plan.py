@@ -0,0 +1,324 @@
+import hashlib
+
+import cloudpickle
+
+from ..version import version
+from .graphs import dask_feature_graph
+from . import time_cache
+
+
+__all__ = ['FeaturePlan', 'SharedSteps']
+
+
+# Argument kinds for compiled tasks
+_LITERAL, _KEY, _INPUT, _TASK, _LIST = range(5)
+
+
+def _is_task(x):
+    """Check whether `x` is a dask task, i.e. a tuple with a callable head."""
+    return isinstance(x, tuple) and len(x) > 0 and callable(x[0])
+
+
+def _is_key(x, graph):
+    """Check whether `x` refers to another node of `graph`."""
+    try:
+        return x in graph
+    except TypeError:  # unhashable
+        return False
+
+
+def _dependencies(x, graph):
+    """Return the list of graph keys referenced by the task/argument `x`."""
+    if _is_task(x):
+        return [d for arg in x[1:] for d in _dependencies(arg, graph)]
+    elif isinstance(x, list):
+        return [d for arg in x for d in _dependencies(arg, graph)]
+    elif _is_key(x, graph):
+        return [x]
+    else:
+        return []
+
+
+def _compile(x, graph):
+    """Convert a task/argument into a `(kind, value)` pair that can be
+    evaluated without inspecting the graph again.
+
+    Strings that are not keys of `graph` are marked as possible inputs: they
+    are looked up in the evaluation namespace at run time (e.g. meta features
+    referenced by custom dask graphs) and otherwise treated as literals, which
+    matches the semantics of `dask.async.get_sync`.
+    """
+    if _is_task(x):
+        return (_TASK, (x[0], tuple(_compile(arg, graph) for arg in x[1:])))
+    elif isinstance(x, list):
+        return (_LIST, [_compile(arg, graph) for arg in x])
+    elif _is_key(x, graph):
+        return (_KEY, x)
+    elif isinstance(x, str):
+        return (_INPUT, x)
+    else:
+        return (_LITERAL, x)
+
+
+def _evaluate(compiled, namespace):
+    """Evaluate a compiled task/argument using values from `namespace`."""
+    kind, value = compiled
+    if kind == _KEY:
+        return namespace[value]
+    elif kind == _LITERAL:
+        return value
+    elif kind == _TASK:
+        func, args = value
+        return func(*[_evaluate(arg, namespace) for arg in args])
+    elif kind == _INPUT:
+        return namespace.get(value, value)
+    else:
+        return [_evaluate(arg, namespace) for arg in value]
+
+
+def _inputs(compiled, step_inputs):
+    """Return the set of run-time inputs that a compiled task/argument depends
+    on, given the inputs of the graph keys it references (`step_inputs`).
+
+    Names looked up in the evaluation namespace (e.g. meta features) are
+    included as well.
+    """
+    kind, value = compiled
+    if kind == _KEY:
+        return step_inputs[value]
+    elif kind == _LITERAL:
+        return frozenset()
+    elif kind == _TASK:
+        return frozenset().union(*[_inputs(arg, step_inputs)
+                                   for arg in value[1]])
+    elif kind == _LIST:
+        return frozenset().union(*[_inputs(arg, step_inputs)
+                                   for arg in value])
+    else:
+        return frozenset([value])
+
+
+class SharedSteps(object):
+    """Values of plan steps that are shared between the channels of a
+    multichannel time series.
+
+    Channels with the same `inputs` (e.g. times 't' and/or errors 'e') and
+    meta features compute the same values for the steps that only depend on
+    them, such as the Cadence and Error features; see `FeaturePlan.evaluate`.
+
+    Attributes
+    ----------
+    inputs : frozenset of str
+        Names of the inputs shared by all channels.
+    values : dict
+        Values of the shared steps computed so far.
+    """
+    def __init__(self, inputs):
+        self.inputs = frozenset(inputs)
+        self.values = {}
+
+
+def _signature(compiled, signatures):
+    """Hash identifying the computation performed by a compiled task/argument,
+    given the signatures of the graph keys it references.
+
+    Functions are identified by their `cloudpickle` serialization (i.e., by
+    reference for importable functions and by code for others) and the
+    installed cesium version.
+    """
+    kind, value = compiled
+    if kind == _KEY:
+        return signatures[value]
+    elif kind == _LITERAL:
+        token = 'literal:' + repr(value)
+    elif kind == _INPUT:
+        token = 'input:' + value
+    elif kind == _TASK:
+        func, args = value
+        token = 'task:{}:{}:{}'.format(
+            version, hashlib.sha1(cloudpickle.dumps(func)).hexdigest(),
+            ','.join(_signature(arg, signatures) for arg in args))
+    else:
+        token = 'list:' + ','.join(_signature(arg, signatures)
+                                   for arg in value)
+    return hashlib.sha1(token.encode('utf-8')).hexdigest()
+
+
+class FeaturePlan(object):
+    """Pre-compiled execution plan for computing a fixed set of features.
+
+    Building a plan culls `dask_feature_graph` (plus any custom functions) to
+    the ancestors of the requested features and sorts the remaining nodes
+    topologically, so that featurizing a single channel of a time series
+    reduces to a flat sequence of function calls. The same plan can be reused
+    for any number of time series.
+
+    Attributes
+    ----------
+    features_to_use : list of str
+        Names of features computed by the plan, in output order.
+    inputs : set of str
+        Names of values that must be provided at run time rather than computed
+        (always includes 't', 'm', and 'e').
+    steps : list of tuple
+        Topologically-sorted list of `(key, compiled_task, builtin)` triples.
+    signatures : dict
+        Hash of the computation performed by each step, including that of all
+        its ancestors; also contains the requested features that are not
+        computed by the plan (e.g. meta features), which are identified by
+        name only. Used as cache keys (see `cesium.cache.FeatureCache`).
+    step_inputs : dict
+        Run-time inputs (and meta features) that each step depends on.
+    time_only : dict
+        Direct dependencies of each step that only depends on the time values
+        't'; the values of these steps are shared between time series with
+        the same times (see `time_cache.TimeGridCache`).
+    """
+    def __init__(self, features_to_use, custom_functions=None,
+                 inputs=('t', 'm', 'e')):
+        """Build a plan for computing `features_to_use`.
+
+        Parameters
+        ----------
+        features_to_use : list of str
+            List of feature names to be generated.
+        custom_functions : dict, optional
+            Dictionary of custom feature functions to be evaluated for the
+            given time series, or a dictionary representing a dask graph of
+            function evaluations; see `featurize.featurize_single_ts`.
+        inputs : iterable of str, optional
+            Names of nodes whose values will be provided at run time; any
+            ancestors of these nodes are not computed. Defaults to
+            `('t', 'm', 'e')`.
+        """
+        self.features_to_use = list(features_to_use)
+        self.inputs = set(inputs) | {'t', 'm', 'e'}
+
+        graph = dict(dask_feature_graph)
+        custom_keys = set()
+        if custom_functions:
+            # If values in custom_functions are functions, add calls to graph
+            if all(hasattr(v, '__call__') for v in custom_functions.values()):
+                custom_graph = {feat: (f, 't', 'm', 'e')
+                                for feat, f in custom_functions.items()}
+            # Otherwise, custom_functions is another dask graph
+            else:
+                custom_graph = custom_functions
+            graph.update(custom_graph)
+            custom_keys = set(custom_graph)
+        for key in self.inputs:
+            graph[key] = None
+
+        # Depth-first traversal from the requested features; nodes are
+        # appended after their dependencies (post-order)
+        order = []
+        visited = set(self.inputs)
+        for feature in self.features_to_use:
+            if feature in visited or feature not in graph:
+                continue
+            stack = [(feature, iter(_dependencies(graph[feature], graph)))]
+            visited.add(feature)
+            while stack:
+                key, deps = stack[-1]
+                for dep in deps:
+                    if dep not in visited:
+                        visited.add(dep)
+                        stack.append((dep, iter(_dependencies(graph[dep],
+                                                              graph))))
+                        break
+                else:
+                    stack.pop()
+                    order.append(key)
+
+        self.steps = [(key, _compile(graph[key], graph),
+                       key not in custom_keys) for key in order]
+        self.signatures = {key: _signature((_INPUT, key), {})
+                           for key in self.inputs | set(self.features_to_use)}
+        self.step_inputs = {key: frozenset([key]) for key in self.inputs}
+        self.time_only = {}
+        for key, compiled, builtin in self.steps:
+            self.signatures[key] = _signature(compiled, self.signatures)
+            self.step_inputs[key] = _inputs(compiled, self.step_inputs)
+            if self.step_inputs[key] <= {'t'}:
+                self.time_only[key] = set(_dependencies(graph[key], graph))
+        self._shared_steps = {}
+
+    def __repr__(self):
+        return '<FeaturePlan: {} features, {} steps>'.format(
+            len(self.features_to_use), len(self.steps))
+
+    def shared_steps(self, inputs):
+        """Return the set of steps that only depend on `inputs` and meta
+        features, and can therefore be shared between channels with the same
+        `inputs`.
+        """
+        inputs = frozenset(inputs)
+        if inputs not in self._shared_steps:
+            self._shared_steps[inputs] = {
+                key for key, compiled, builtin in self.steps
+                if all(i in inputs or i not in self.inputs
+                       for i in self.step_inputs[key])}
+        return self._shared_steps[inputs]
+
+    def evaluate(self, t, m, e, meta_features={}, values={}, shared=None):
+        """Compute all nodes of the plan for a single channel of data.
+
+        Parameters
+        ----------
+        t, m, e : (n,) array
+            Time, measurement, and error values of a single channel.
+        meta_features : dict, optional
+            Meta feature values, which can be referenced by custom functions
+            and take priority over cesium features with the same name.
+        values : dict, optional
+            Values of any other `inputs` of the plan.
+        shared : SharedSteps, optional
+            Values of the steps shared with other channels of the same time
+            series; shared steps found in `shared.values` are not evaluated
+            again, and those that are evaluated are added to it.
+
+        Returns
+        -------
+        dict
+            Dictionary containing the values of every evaluated node.
+        """
+        namespace = dict(meta_features)
+        namespace.update(values)
+        namespace.update({'t': t, 'm': m, 'e': e})
+        grid = None
+        overridden = set()  # and time-only steps depending on them
+        shared_steps = (self.shared_steps(shared.inputs) if shared is not None
+                        else ())
+        for key, compiled, builtin in self.steps:
+            # Meta features override cesium features, but not custom ones
+            if builtin and key in namespace:
+                overridden.add(key)
+                continue
+            if key in shared_steps and key in shared.values:
+                namespace[key] = shared.values[key]
+                continue
+            deps = self.time_only.get(key)
+            if deps is not None and deps.isdisjoint(overridden):
+                if grid is None:
+                    grid = time_cache.TIME_GRID_CACHE.grid(t)
+                namespace[key] = grid.get(self.signatures[key], _evaluate,
+                                          compiled, namespace)
+            else:
+                if deps is not None:
+                    overridden.add(key)
+                namespace[key] = _evaluate(compiled, namespace)
+            if key in shared_steps:
+                shared.values[key] = namespace[key]
+        return namespace
+
+    def run(self, t, m, e, meta_features={}, values={}, shared=None):
+        """Compute feature values for a single channel of data; see
+        `evaluate`.
+
+        Returns
+        -------
+        list
+            List of feature values in the order of `features_to_use`.
+        """
+        namespace = self.evaluate(t, m, e, meta_features, values, shared)
+        return [namespace[feature] for feature in self.features_to_use]
@@ -1,35 +1,31 @@
 import numpy as np
-from scipy.stats import norm
-from scipy.linalg import solveh_banded, cholesky_banded
-from scipy.special import gammaln, betainc, gammaincc
+from scipy.linalg.lapack import dpbtrf, dpbtrs
+from scipy.special import gammaln, betainc, gammaincc, ndtri
+
+from ._qso_model import chol_inverse_diag
+
+
+# Best-fit (lvar, dlvar/dmag, ltau, dltau/dmag) for Sesar Strip82 ugriz-bands;
+# see `qso_fit`
+QSO_PARAMETERS = {
+    'u': [-3.90, 0.12, 2.73, -0.02],
+    'g': [-4.10, 0.14, 2.92, -0.07],
+    'r': [-4.34, 0.20, 3.12, -0.15],
+    'i': [-4.23, 0.05, 2.83,  0.07],
+    'z': [-4.44, 0.13, 3.06, -0.07],
+}
 
 
 # TODO duplicate
 def lprob2sigma(lprob):
     """Translates a log_e(probability) to units of Gaussian sigmas."""
     if lprob>-36.:
-      sigma = norm.ppf(1.-0.5*np.exp(1.*lprob))
+      sigma = ndtri(1.-0.5*np.exp(1.*lprob))  # i.e. norm.ppf
     else:
       sigma = np.sqrt( np.log(2./np.pi) - 2.*np.log(8.2) - 2.*lprob )
     return float(sigma)
 
 
-def chol_inverse_diag(t):
-    """Computes inverse of matrix given its Cholesky upper Triangular decomposition t.
-    matrix form: ab[u + i - j, j] == a[i,j] (here u=1)
-    (quick version: only calculates diagonal and neighboring elements)
-    """
-    (uu,nrows) = t.shape
-    B = np.zeros((uu,nrows),dtype='float64')
-    B[1,nrows-1] = 1.0/t[1,nrows-1]**2
-    B[0,nrows-1] = -t[0,nrows-1]*B[1,nrows-1]/t[1,nrows-2]
-    for j in reversed(range(nrows-1)):
-      tjj = t[1,j]
-      B[1,j] = (1.0/tjj-t[0,j+1]*B[0,j+1])/tjj
-      B[0,j] = -t[0,j]*B[1,j]/t[1,j-1]
-    return B
-
-
 def qso_engine(time,data,error,ltau=3.,lvar=-1.7,sys_err=0.,return_model=False):
     """Calculates the fit quality of a damped random walk to a qso lightcurve.
     The formalism is from Rybicki & Press (1994; arXiv:comp-gas/9405004)
@@ -110,23 +106,14 @@ def qso_engine(time,data,error,ltau=3.,lvar=-1.7,sys_err=0.,return_model=False):
     fac = np.exp(np.log(10)*lvar0)/T0
     Tp = 1.*T
     Tp[1,:] += wt*fac
-    # solve Tp*z=y for z (y=wt*dat)
-    # This works for scipy __version__>='0.9.0' on anathem (20120809)
-    b1 = (wt*dat).reshape((1,ln))
-    b2 = b1.T
-    #(Tpc,z) = solveh_banded(Tp,b2)
-    z = solveh_banded(Tp,b2)
-    Tpc = cholesky_banded(Tp) # the solveh_banded() function used to return the cholesky matrix, now we get seperately
-    z = z.T
-    z = z[0,:]
-    c1 = wt.reshape((1,ln))
-    c2 = c1.T
-    #(Tpc,z0) = solveh_banded(Tp,c2)
-    z0 = solveh_banded(Tp,c2)
-    #HAS NOT CHANGED#Tpc2 = cholesky_banded(Tp)
-    z0 = z0.T
-    z0 = z0[0,:]
-
+    # solve Tp*z=y for z (y=wt*dat) and Tp*z0=wt, reusing a single Cholesky
+    # factorization of Tp for both solves, its determinant and its inverse
+    # (LAPACK is called directly, as in `cholesky_banded`/`cho_solve_banded`)
+    Tpc, info = dpbtrf(Tp)
+    if info != 0:
+        raise np.linalg.LinAlgError("%d-th leading minor not positive "
+                                    "definite" % info)
+    z, z0 = dpbtrs(Tpc, np.array([wt*dat, wt]).T)[0].T
 
     #finally, get u=T*z
     u = T[1,:]*z; u[1:] += T[0,1:]*z[:-1]; u[:-1] += T[0,1:]*z[1:]
@@ -141,10 +128,11 @@ def qso_engine(time,data,error,ltau=3.,lvar=-1.7,sys_err=0.,return_model=False):
     # -2*log(likelihood) = chi2_qso + ldet_C + log(u0sum)
     #   first term: use chi2_qso/nu for goodness of fit with fixed parameters;
     #   all terms: use chi2_qso/nu + chi2_qso/nu_extra for fitting with variable parameters
-    # get log of determinant for use later
-    Tc = cholesky_banded(T)
+    # get log of determinant for use later; T is the inverse of the
+    # correlation matrix exp(-|time_i-time_j|/tau) (scaled by 1/T0), whose
+    # determinant is prod(1-ri^2)
     ldet_Tp = 2*np.log(Tpc[1,:]).sum()
-    ldet_T = 2*np.log(Tc[1,:]).sum()
+    ldet_T = -np.log(-np.expm1(-2.*arg)).sum() - ln*np.log(T0)
     ldet_C = ldet_Tp-ldet_T-np.log(wt).sum()
     out_dict['chi2_qso/nu_extra'] = (ldet_C + np.log(u0sum))/out_dict['nu']
 
@@ -198,6 +186,176 @@ def qso_engine(time,data,error,ltau=3.,lvar=-1.7,sys_err=0.,return_model=False):
     return out_dict
 
 
+def _row_sum(x, valid):
+    """Sum of the valid entries of each row."""
+    return np.where(valid, x, 0.).sum(axis=1)
+
+
+def chol_banded_batch(ab):
+    """Cholesky factorizations of many symmetric positive definite tridiagonal
+    matrices, stored in the upper banded form of `cholesky_banded`
+    (ab[:, 0, j] == a[j-1, j], ab[:, 1, j] == a[j, j]) along the last axis.
+
+    The factorization proceeds along the diagonal, with all matrices updated
+    together, in the same order of operations as LAPACK's `dpbtf2` (used by
+    `dpbtrf` for tridiagonal matrices).
+    """
+    c = np.array(ab, dtype='float64')
+    for j in range(c.shape[2]):
+        c[:, 1, j] = np.sqrt(c[:, 1, j])
+        if j + 1 < c.shape[2]:
+            c[:, 0, j + 1] *= 1.0 / c[:, 1, j]
+            c[:, 1, j + 1] -= c[:, 0, j + 1] * c[:, 0, j + 1]
+    return c
+
+
+def chol_solve_batch(c, *rhs):
+    """Solve `(U^T U) x = b` for many upper banded Cholesky factors `U`, as
+    returned by `chol_banded_batch`, and one or more right-hand sides `b`
+    (one row per matrix).
+
+    All systems are solved together, in the same order of operations as
+    LAPACK's `dpbtrs`.
+    """
+    solutions = []
+    for b in rhs:
+        x = np.array(b, dtype='float64')
+        n = x.shape[1]
+        x[:, 0] /= c[:, 1, 0]
+        for j in range(1, n):
+            x[:, j] = (x[:, j] - c[:, 0, j] * x[:, j - 1]) / c[:, 1, j]
+        x[:, n - 1] /= c[:, 1, n - 1]
+        for j in range(n - 2, -1, -1):
+            x[:, j] = (x[:, j] - c[:, 0, j + 1] * x[:, j + 1]) / c[:, 1, j]
+        solutions.append(x)
+    return solutions
+
+
+def chol_inverse_diag_batch(c, n):
+    """Diagonal and neighboring elements of the inverses of many matrices,
+    given their upper banded Cholesky factors `c` (see `chol_inverse_diag`);
+    only the first `n[i]` rows/columns of matrix `i` are used.
+    """
+    t0, t1 = c[:, 0], c[:, 1]
+    B = np.zeros(c.shape, dtype='float64')
+    rows = np.arange(len(n))
+    last = n - 1
+    B[rows, 1, last] = 1.0 / t1[rows, last]**2
+    B[rows, 0, last] = -t0[rows, last] * B[rows, 1, last] / t1[rows, last - 1]
+    for j in range(c.shape[2] - 2, -1, -1):
+        active = j < last
+        tjj = t1[:, j]
+        B1 = (1.0 / tjj - t0[:, j + 1] * B[:, 0, j + 1]) / tjj
+        B0 = -t0[:, j] * B1 / t1[:, j - 1]
+        B[:, 1, j] = np.where(active, B1, B[:, 1, j])
+        B[:, 0, j] = np.where(active, B0, B[:, 0, j])
+    return B
+
+
+def qso_engine_batch(time, data, error, n, ltau=3., lvar=-1.7, sys_err=0.):
+    """Fit quality of a damped random walk to many qso lightcurves at once;
+    see `qso_engine`.
+
+    All lightcurves are padded into two-dimensional arrays and their
+    tridiagonal systems are factorized and solved together by
+    `chol_banded_batch` and `chol_solve_batch`, rather than by separate
+    LAPACK calls for each lightcurve.
+
+    Input:
+        time, data, error - (k, n_max) arrays of measurement times,
+                            magnitudes and uncertainties of k lightcurves
+        n - (k,) array of the number of valid entries in each row
+
+    Output (dictionary of (k,) arrays):
+        nu, chi2/nu, chi2_qso/nu, chi2_qso/nu_extra, chi2_qso/nu_NULL
+        (the significances and class of `qso_engine` are not computed)
+    """
+    n = np.asarray(n)
+    n_max = time.shape[1]
+    cols = np.arange(n_max)
+    valid = cols < n[:, None]
+    lvar0 = np.log10(0.5) + lvar + ltau
+
+    # Keep the first point and every point following a positive dt
+    dt = np.abs(time[:, 1:] - time[:, :-1])
+    keep = valid.copy()
+    keep[:, 1:] &= dt > 0.
+    ln = keep.sum(axis=1)
+    index = np.cumsum(keep, axis=1) - 1
+    rows = np.repeat(np.arange(len(n)), keep.sum(axis=1))
+    dat = np.zeros(time.shape)
+    dat[rows, index[keep]] = data[keep]
+    err = np.ones(time.shape)
+    err[rows, index[keep]] = error[keep]
+    tt = np.zeros(time.shape)
+    tt[rows, index[keep]] = time[keep]
+    valid = cols < ln[:, None]
+    dt = np.where(valid[:, 1:], np.abs(tt[:, 1:] - tt[:, :-1]), 1.)
+    wt = np.where(valid, 1. / (sys_err**2 + err**2), 0.)
+
+    out_dict = {}
+    nu = ln - 1.
+    out_dict['nu'] = nu
+    dat_mean = _row_sum(dat, valid) / ln
+    varx = _row_sum((dat - dat_mean[:, None])**2, valid) / ln
+    dat0 = _row_sum(dat * wt, valid) / wt.sum(axis=1)
+    out_dict['chi2/nu'] = (_row_sum((dat - dat0[:, None])**2 * wt, valid) /
+                           nu)
+
+    # tridiagonal matrices T = L^(-1), padded with identity matrices
+    pair = valid[:, 1:]
+    arg = dt*np.exp(-np.log(10)*ltau); ri = np.exp(-arg); ei = 1./(1./ri-ri)
+    T = np.zeros((len(n), 2, n_max), dtype='float64')
+    T[:, 0, 1:] = np.where(pair, -ei, 0.)
+    T[:, 1, :-1] = np.where(pair, 1.+ri*ei, 0.)
+    T[:, 1, 1:] += np.where(pair, ri*ei, 0.)
+    last = (np.arange(len(n)), ln - 1)
+    T[:, 1][last] += 1.
+    sorted_diag = np.sort(np.where(valid, T[:, 1], np.inf), axis=1)
+    T0 = 0.5 * (sorted_diag[np.arange(len(n)), (ln - 1) // 2] +
+                sorted_diag[np.arange(len(n)), ln // 2])
+    T /= T0[:, None, None]
+    T[:, 1] = np.where(valid, T[:, 1], 1.)
+
+    fac = np.exp(np.log(10)*lvar0)/T0
+    Tp = T.copy()
+    Tp[:, 1] += wt*fac[:, None]
+    Tpc = chol_banded_batch(Tp)
+    z, z0 = chol_solve_batch(Tpc, wt*dat, wt)
+
+    #finally, get u=T*z
+    u = T[:, 1]*z; u[:, 1:] += T[:, 0, 1:]*z[:, :-1]
+    u[:, :-1] += T[:, 0, 1:]*z[:, 1:]
+    u0 = T[:, 1]*z0; u0[:, 1:] += T[:, 0, 1:]*z0[:, :-1]
+    u0[:, :-1] += T[:, 0, 1:]*z0[:, 1:]
+
+    u0sum = _row_sum(u0, valid); x0 = _row_sum(u, valid)/u0sum
+    out_dict['chi2_qso/nu'] = _row_sum((dat - x0[:, None]) *
+                                       (u - u0*x0[:, None]), valid) / nu
+
+    ldet_Tp = 2*_row_sum(np.log(Tpc[:, 1]), valid)
+    ldet_T = (-_row_sum(np.log(-np.expm1(-2.*arg)), pair) -
+              ln*np.log(T0))
+    ldet_C = ldet_Tp-ldet_T-_row_sum(np.log(np.where(valid, wt, 1.)), valid)
+    out_dict['chi2_qso/nu_extra'] = (ldet_C + np.log(u0sum))/nu
+
+    Tpm = chol_inverse_diag_batch(Tpc, ln)
+    diagC = T[:, 1]*wt*Tpm[:, 1]
+    diagC[:, :-1] += T[:, 0, 1:]*wt[:, :-1]*Tpm[:, 0, 1:]
+    diagC[:, 1:] += T[:, 0, 1:]*wt[:, 1:]*Tpm[:, 0, 1:]
+    TrC = _row_sum(diagC, valid)
+    out_dict['chi2_qso/nu_NULL'] = TrC*varx/nu
+
+    # Lightcurves with fewer than 2 distinct times are not fit
+    unfit = ln < 2
+    out_dict['nu'][unfit] = 0.
+    for key, default in [('chi2/nu', 0.), ('chi2_qso/nu', 999),
+                         ('chi2_qso/nu_extra', 0.), ('chi2_qso/nu_NULL', 0.)]:
+        out_dict[key][unfit] = default
+
+    return out_dict
+
+
 def qso_fit(time, data, error, filter='g', mag0=19., sys_err=0.0, return_model=False):
     """Best-fit qso model determined for Sesar Strip82, ugriz-bands (default r).
     See additional notes for underlying code qso_engine.
@@ -228,14 +386,7 @@ def qso_fit(time, data, error, filter='g', mag0=19., sys_err=0.0, return_model=F
     """
 
     data = data.copy() - np.median(data) + mag0
-    pars={}
-    pars['u'] = [-3.90, 0.12, 2.73, -0.02]
-    pars['g'] = [-4.10, 0.14, 2.92, -0.07]
-    pars['r'] = [-4.34, 0.20, 3.12, -0.15]
-    pars['i'] = [-4.23, 0.05, 2.83,  0.07]
-    pars['z'] = [-4.44, 0.13, 3.06, -0.07]
-
-    par = pars[filter.lower()]
+    par = QSO_PARAMETERS[filter.lower()]
     lvar = par[0]+par[1]*(mag0-19.)
     ltau = par[2]+par[3]*(mag0-19.)
 
@@ -268,6 +419,43 @@ def qso_fit(time, data, error, filter='g', mag0=19., sys_err=0.0, return_model=F
     return out_dict
 
 
+def qso_fit_batch(time, data, error, n, filter='g', mag0=19., sys_err=0.0):
+    """Best-fit qso model for many lightcurves at once; see `qso_fit` and
+    `qso_engine_batch`.
+
+    Input:
+        time, data, error - (k, n_max) arrays of measurement times,
+                            magnitudes and uncertainties of k lightcurves
+        n - (k,) array of the number of valid entries in each row
+
+    Output (dictionary of (k,) arrays):
+        the entries of `qso_fit` other than the significances, class and
+        model
+    """
+    n = np.asarray(n)
+    valid = np.arange(data.shape[1]) < n[:, None]
+    sorted_data = np.sort(np.where(valid, data, np.inf), axis=1)
+    rows = np.arange(len(n))
+    median = 0.5 * (sorted_data[rows, (n - 1) // 2] + sorted_data[rows, n // 2])
+    data = data - median[:, None] + mag0
+    par = QSO_PARAMETERS[filter.lower()]
+    lvar = par[0]+par[1]*(mag0-19.)
+    ltau = par[2]+par[3]*(mag0-19.)
+
+    adict = qso_engine_batch(time, data, error, n, ltau=ltau, lvar=lvar,
+                             sys_err=sys_err)
+
+    out_dict = {}
+    out_dict['lvar'] = np.full(len(n), lvar)
+    out_dict['ltau'] = np.full(len(n), ltau)
+    for key in ['chi2/nu', 'nu', 'chi2_qso/nu', 'chi2_qso/nu_NULL']:
+        out_dict[key] = adict[key]
+    out_dict['chi2qso_nu_nuNULL_ratio'] = out_dict['chi2_qso/nu'] / out_dict['chi2_qso/nu_NULL']
+    out_dict['log_chi2_qsonu'] = np.log(out_dict['chi2_qso/nu'])
+    out_dict['log_chi2nuNULL_chi2nu'] = np.log(out_dict['chi2_qso/nu_NULL'] / out_dict['chi2_qso/nu'])
+    return out_dict
+
+
 def get_qso_log_chi2_qsonu(qso_model):
     """Natural log of goodness of fit of qso-model given fixed parameters."""
     return qso_model['log_chi2_qsonu']
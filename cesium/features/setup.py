@@ -1,17 +1,58 @@
 import os
+import shutil
+import tempfile
 import numpy as np
 from Cython.Build import cythonize
 
 base_path = os.path.abspath(os.path.dirname(__file__))
 
 
+def openmp_flags():
+    """Compiler/linker flags enabling OpenMP, if supported by the compiler
+    (otherwise the Lomb-Scargle frequency grid is scanned sequentially).
+    """
+    from distutils.ccompiler import new_compiler
+    from distutils.errors import CompileError, LinkError
+    from distutils.sysconfig import customize_compiler
+
+    compiler = new_compiler()
+    customize_compiler(compiler)
+    flag = '/openmp' if compiler.compiler_type == 'msvc' else '-fopenmp'
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        source = os.path.join(tmp_dir, 'test_openmp.c')
+        with open(source, 'w') as f:
+            f.write('#include <omp.h>\n'
+                    'int main(void) { return omp_get_max_threads() < 1; }\n')
+        objects = compiler.compile([source], output_dir=tmp_dir,
+                                   extra_postargs=[flag])
+        compiler.link_executable(objects, os.path.join(tmp_dir, 'test_openmp'),
+                                 extra_postargs=[flag])
+    except (CompileError, LinkError):
+        return []
+    finally:
+        shutil.rmtree(tmp_dir)
+    return [flag]
+
+
 def configuration(parent_package='', top_path=None):
     from numpy.distutils.misc_util import Configuration
     config = Configuration('features', parent_package, top_path)
 
     cythonize(os.path.join(base_path, '_lomb_scargle.pyx'))
 
+    flags = openmp_flags()
     config.add_extension('_lomb_scargle', '_lomb_scargle.c',
+                         include_dirs=[np.get_include()],
+                         extra_compile_args=flags,
+                         extra_link_args=flags if os.name != 'nt' else [])
+
+    cythonize(os.path.join(base_path, '_qso_model.pyx'))
+    config.add_extension('_qso_model', '_qso_model.c',
+                         include_dirs=[np.get_include()])
+
+    cythonize(os.path.join(base_path, '_periodic_model.pyx'))
+    config.add_extension('_periodic_model', '_periodic_model.c',
                          include_dirs=[np.get_include()])
 
     return config
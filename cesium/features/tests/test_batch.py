@@ -0,0 +1,62 @@
+import numpy as np
+import numpy.testing as npt
+
+from cesium.features import BATCH_FEATS, featurize_batch, qso_model
+from cesium.features.tests.util import generate_features, irregular_random
+
+
+def test_batch_ragged():
+    """Test batch featurization of ragged (flat values + offsets) input."""
+    series = [irregular_random(seed=i, size=size)
+              for i, size in enumerate([10, 50, 23, 50, 3])]
+    t, m, e = (np.concatenate(x) for x in zip(*series))
+    offsets = np.cumsum([0] + [len(s[0]) for s in series])
+    values = featurize_batch(t, m, e, BATCH_FEATS, offsets=offsets,
+                             block_size=2)
+    for i, (t_i, m_i, e_i) in enumerate(series):
+        expected = generate_features(t_i, m_i, e_i, BATCH_FEATS)
+        for feature in BATCH_FEATS:
+            npt.assert_allclose(values[feature][i], expected[feature],
+                                rtol=1e-10, err_msg=feature)
+
+
+def test_batch_padded():
+    """Test batch featurization of two-dimensional and masked input."""
+    t, m, e = (np.array(x) for x in zip(*[irregular_random(seed=i)
+                                          for i in range(4)]))
+    values = featurize_batch(t, m, e, ['median', 'stetson_j'])
+    npt.assert_allclose(values['median'], np.median(m, axis=1))
+
+    pad = np.zeros((len(m), 5))
+    masked = np.ma.masked_array(np.hstack((m, pad)),
+                                mask=np.hstack((np.zeros(m.shape), pad + 1)))
+    masked_values = featurize_batch(np.hstack((t, pad)), masked,
+                                    np.hstack((e, pad + 1.)),
+                                    ['median', 'stetson_j'])
+    npt.assert_allclose(masked_values['median'], values['median'])
+    npt.assert_allclose(masked_values['stetson_j'], values['stetson_j'])
+
+
+def test_batch_unsupported():
+    """Test that non-batchable features are rejected."""
+    t, m, e = irregular_random()
+    npt.assert_raises(ValueError, featurize_batch, t[None, :], m[None, :],
+                      e[None, :], ['freq1_freq'])
+
+
+def test_qso_fit_batch():
+    """Test batched QSO fits of series with repeated times."""
+    series = [irregular_random(seed=i, size=size)
+              for i, size in enumerate([10, 50, 23, 4])]
+    series[1][0][1:4] = series[1][0][0]  # repeated times are dropped
+    n = np.array([len(s[0]) for s in series])
+    t, m, e = (np.ones((len(series), n.max())) for i in range(3))
+    for i, s in enumerate(series):
+        t[i, :n[i]], m[i, :n[i]], e[i, :n[i]] = s
+    values = qso_model.qso_fit_batch(t, m, e, n)
+    for i, s in enumerate(series):
+        expected = qso_model.qso_fit(*s)
+        for key in ['nu', 'chi2/nu', 'chi2_qso/nu', 'chi2_qso/nu_NULL',
+                    'log_chi2_qsonu', 'log_chi2nuNULL_chi2nu']:
+            npt.assert_allclose(values[key][i], expected[key], rtol=1e-10,
+                                err_msg=key)
@@ -15,6 +15,24 @@ def test_delta_t_hist():
         bins=bins)[0])
 
 
+def test_delta_t_hist_methods():
+    """Test exact and approximate histograms of all time lags."""
+    times, values, errors = irregular_random()
+    nbins = 50
+    bins = np.linspace(0, max(times) - min(times), nbins+1)
+    for t in [np.round(times, 1), times[::-1], np.full(10, 1.5)]:
+        delta_ts = [pair[1] - pair[0] for pair in itertools.combinations(t, 2)]
+        npt.assert_array_equal(cf.delta_t_hist(t, nbins, method='exact'),
+                               np.histogram(delta_ts, bins=np.linspace(
+                                   0, max(t) - min(t), nbins+1))[0])
+
+    delta_ts = [pair[1] - pair[0] for pair in itertools.combinations(times, 2)]
+    exact = np.histogram(delta_ts, bins=bins)[0]
+    approx = cf.delta_t_hist(times, nbins, method='fft', oversampling=64)
+    npt.assert_allclose(approx.sum(), exact.sum())
+    assert np.abs(approx - exact).sum() < 0.02 * exact.sum()
+
+
 def test_normalize_hist():
     """Test normalization of histogram."""
     times, values, errors = irregular_random()
@@ -43,3 +61,22 @@ def test_find_sorted_peaks():
 
     x = np.array([0,3,3,5,0]) # Tie is a peak only if greater than next value
     npt.assert_allclose(cf.find_sorted_peaks(x), np.array([[3,5]]))
+
+    x = np.array([2,2,1,4,4]) # Ties at both ends
+    npt.assert_allclose(cf.find_sorted_peaks(x), np.array([[3,4],[0,2]]))
+
+    x = np.array([1,4,2,4,0]) # Equal peaks are sorted by index
+    peaks = cf.find_sorted_peaks(x)
+    npt.assert_allclose(peaks, np.array([[1,4],[3,4]]))
+    assert all(isinstance(i, int) for i, peak in peaks)
+
+
+def test_cad_probs():
+    """Test cadence probabilities computed from a single sort."""
+    times, values, errors = irregular_random()
+    cads = np.round(np.diff(times), 3)
+    cads[:3] = 10. / (24 * 60)  # ties with a threshold
+    thresholds = [1, 10, 100, 1000, 10000, 100000]
+    probs = cf.cad_probs(cads, thresholds)
+    for time in thresholds:
+        npt.assert_equal(probs[time], cf.cad_prob(cads, time))
@@ -6,6 +6,7 @@ import os
 import shutil
 import glob
 
+from cesium.features import amplitude, common_functions, lomb_scargle_fast
 from cesium.features.tests.util import (generate_features, irregular_random,
                                         regular_periodic, irregular_periodic)
 
@@ -133,6 +134,45 @@ def test_lomb_scargle_fast_irregular():
     npt.assert_allclose(f['period_fast'], 1. / frequencies[0], rtol=3e-2)
 
 
+def test_fast_periodogram():
+    """Test extirpolation-based periodogram against direct evaluation and the
+    in-package fast period estimate.
+    """
+    frequencies = np.array([4])
+    amplitudes = np.array([[1]])
+    times, values, errors = irregular_periodic(frequencies, amplitudes, 0.1)
+    values += 3.
+    errors = np.linspace(0.5, 1.5, len(times))
+    direct = lomb_scargle_fast.fast_periodogram(times, values, errors, 0.5,
+                                                0.05, 200, use_fft=False)
+    fast = lomb_scargle_fast.fast_periodogram(times, values, errors, 0.5,
+                                              0.05, 200)
+    npt.assert_allclose(fast, direct, atol=3e-3)
+    npt.assert_allclose(lomb_scargle_fast.fast_periodogram(
+        times, values, errors, 0.5, 0.05, 200, oversampling=20), direct,
+        atol=1e-4)
+    npt.assert_allclose(0.5 + 0.05 * np.argmax(fast), frequencies[0],
+                        atol=0.05)
+
+    # Direct weighted least-squares fit of a sinusoid plus offset
+    w = errors ** -2
+    y = values - np.dot(w, values) / w.sum()
+    for f in [1., 4.]:
+        X = np.column_stack([np.sin(2 * np.pi * f * times),
+                             np.cos(2 * np.pi * f * times),
+                             np.ones(len(times))])
+        coef = np.linalg.lstsq(X * np.sqrt(w)[:, None], y * np.sqrt(w),
+                               rcond=-1)[0]
+        resid = y - np.dot(X, coef)
+        npt.assert_allclose(lomb_scargle_fast.fast_periodogram(
+            times, values, errors, f, 1., 1, use_fft=False),
+            1 - np.dot(w, resid**2) / np.dot(w, y**2))
+
+    period = lomb_scargle_fast.lomb_scargle_fast_period(times, values, errors,
+                                                        use_gatspy=False)
+    npt.assert_allclose(period, 1. / frequencies[0], rtol=3e-2)
+
+
 def test_max():
     """Test maximum value feature."""
     times, values, errors = irregular_random()
@@ -166,6 +206,31 @@ def test_percent_close_to_median():
     npt.assert_allclose(f['percent_close_to_median'], np.mean(within_buffer))
 
 
+def test_order_statistics():
+    """Test that percentile features computed from sorted values match the
+    corresponding numpy functions exactly."""
+    times, values, errors = irregular_random()
+    for x in [values, values[:10], values[:1], np.round(values, 1)]:
+        sorted_x = np.sort(x)
+        npt.assert_equal(common_functions.sorted_median(sorted_x),
+                         np.median(x))
+        q = [0, 5, 17.5, 50, 82.5, 95, 100]
+        npt.assert_equal(common_functions.sorted_percentile(sorted_x, q),
+                         np.percentile(x, q))
+
+        flux = 10. ** (-0.4 * x)
+        sorted_flux = amplitude.sorted_flux(x)
+        npt.assert_equal(sorted_flux, np.sort(flux))
+        y_med = np.median(flux)
+        npt.assert_equal(amplitude.sorted_percent_amplitude(sorted_flux),
+                         max(abs((flux.max() - y_med) / y_med),
+                             abs((y_med - flux.min()) / y_med)))
+        y_95, y_50, y_5 = np.percentile(flux, [95, 50, 5])
+        npt.assert_equal(
+            amplitude.sorted_percent_difference_flux_percentile(sorted_flux),
+            (y_95 - y_5) / y_50)
+
+
 def test_median():
     """Test median value feature."""
     times, values, errors = irregular_random()
@@ -1,7 +1,9 @@
+import itertools
+
 import numpy as np
 import numpy.testing as npt
 
-from cesium.features import lomb_scargle
+from cesium.features import lomb_scargle, period_folding, periodic_model
 from cesium.features.graphs import LOMB_SCARGLE_FEATS
 from cesium.features.tests.util import (generate_features, irregular_random,
                                         regular_periodic, irregular_periodic)
@@ -229,3 +231,262 @@ def test_scatter_res_raw():
     value_mad = np.median(np.abs(values - np.median(values)))
     f = generate_features(times, values, errors, ['scatter_res_raw'])
     npt.assert_allclose(f['scatter_res_raw'], resid_mad / value_mad, atol=3e-2)
+
+
+def test_lomb_scargle_model_error():
+    """Test pointwise model uncertainties, which are only computed on request."""
+    times, values, errors = irregular_random()
+    lomb_model = lomb_scargle.lomb_scargle_model(times, values, errors)
+    assert 'model_error' not in lomb_model['freq_fits'][0]
+
+    lomb_model = lomb_scargle.lomb_scargle_model(times, values, errors,
+                                                 model_error=True)
+    for fit in lomb_model['freq_fits']:
+        assert fit['model_error'].shape == times.shape
+        assert fit['trend_error'].shape == times.shape
+        assert np.all(np.isfinite(fit['model_error']))
+
+    state = np.random.RandomState(0)
+    a = state.normal(size=(16, 16))
+    b = state.normal(size=(16, 100))
+    npt.assert_allclose(lomb_scargle._diag_quad_form(a, b),
+                        np.diag(np.dot(b.T, np.dot(a, b))))
+
+
+def test_period_folding_reuse_freqs():
+    """Test that reusing Lomb-Scargle frequencies leaves folded slopes intact."""
+    frequencies = WAVE_FREQS
+    amplitudes = np.zeros((len(frequencies),4))
+    amplitudes[:,0] = [4,2,1]
+    times, values, errors = irregular_periodic(frequencies, amplitudes, 0.1)
+    lomb_model = lomb_scargle.lomb_scargle_model(times, values, errors)
+    full = period_folding.period_folding(times, values, errors, lomb_model)
+    npt.assert_array_equal(full['2p_resid'], period_folding.period_folding(
+        times, values, errors, lomb_model, reuse_freqs=False)['2p_resid'])
+
+    reused = period_folding.period_folding(times, values, errors, lomb_model,
+                                           reuse_freqs=True)
+    npt.assert_allclose(reused['folded_slopes'], full['folded_slopes'])
+    npt.assert_allclose(np.std(reused['2p_resid']), np.std(full['2p_resid']),
+                        rtol=1e-1)
+
+
+def test_period_folding_reuse_freqs_once():
+    """Test that each reused Lomb-Scargle frequency is removed at most once."""
+    frequencies = WAVE_FREQS
+    amplitudes = np.zeros((len(frequencies),4))
+    amplitudes[:,0] = [4,2,1]
+    times, values, errors = irregular_periodic(frequencies, amplitudes, 0.1)
+    lomb_model = lomb_scargle.lomb_scargle_model(times, values, errors)
+    # A slightly offset frequency leaves most of the signal in the residuals
+    # after it is fitted, so it would otherwise be chosen again
+    lomb_model['freq_fits'][1]['freq'] = 1.02 * frequencies[1]
+    lomb_model['freq_fits'][2]['freq'] = 7.77
+    values = 2. * np.sin(2. * np.pi * frequencies[1] * times)
+
+    # Record the frequencies fitted with all harmonics, and the fits
+    fitted_freqs = []
+    fits = []
+    fit_lomb_scargle = lomb_scargle.fit_lomb_scargle
+    def recording_fit(x, y, dy, f0, *args, **kwargs):
+        fit = fit_lomb_scargle(x, y, dy, f0, *args, **kwargs)
+        if kwargs.get('nharm') != 1:
+            fitted_freqs.append(f0)
+            fits.append(fit)
+        return fit
+    period_folding.ls.fit_lomb_scargle = recording_fit
+    try:
+        period_folding.period_folding(times, values, errors, lomb_model,
+                                      reuse_freqs=True)
+    finally:
+        period_folding.ls.fit_lomb_scargle = fit_lomb_scargle
+    # The 2P frequency, then each previously found frequency at most once
+    npt.assert_allclose(fitted_freqs, [0.5 * lomb_model['freq_fits'][0]['freq'],
+                                       1.02 * frequencies[1], 7.77])
+    # ...each refined within half a grid step
+    assert all(abs(fit['freq'] - f0) <= 0.5 * lomb_model['df']
+               for fit, f0 in zip(fits, fitted_freqs))
+
+
+def test_lomb_scargle_model_threads():
+    """Test that splitting the frequency grid into blocks gives the same fit."""
+    frequencies = WAVE_FREQS
+    amplitudes = np.zeros((len(frequencies),4))
+    amplitudes[:,0] = [4,2,1]
+    times, values, errors = irregular_periodic(frequencies, amplitudes, 0.1)
+    expected = lomb_scargle.lomb_scargle_model(times, values, errors)
+    for n_threads in [2, 3]:
+        lomb_model = lomb_scargle.lomb_scargle_model(times, values, errors,
+                                                     n_threads=n_threads)
+        for fit, expected_fit in zip(lomb_model['freq_fits'],
+                                     expected['freq_fits']):
+            npt.assert_allclose(fit['freq'], expected_fit['freq'])
+            npt.assert_allclose(fit['amplitude'], expected_fit['amplitude'],
+                                rtol=1e-6)
+            npt.assert_allclose(fit['psd'], expected_fit['psd'], rtol=1e-6)
+
+
+def test_lomb_scargle_model_candidates():
+    """Test that refining only the highest coarse peaks finds the same
+    frequencies as refining the full grid.
+    """
+    frequencies = WAVE_FREQS
+    amplitudes = np.zeros((len(frequencies),4))
+    amplitudes[:,0] = [4,2,1]
+    times, values, errors = irregular_periodic(frequencies, amplitudes, 0.1)
+    for oversampling, fast in itertools.product([None, 5.], [True, False]):
+        expected = lomb_scargle.lomb_scargle_model(times, values, errors,
+                                                   oversampling=oversampling)
+        lomb_model = lomb_scargle.lomb_scargle_model(times, values, errors,
+                                                     oversampling=oversampling,
+                                                     n_candidates=3,
+                                                     fast_candidates=fast)
+        for i in range(len(frequencies)):
+            fit = lomb_model['freq_fits'][i]
+            expected_fit = expected['freq_fits'][i]
+            npt.assert_allclose(fit['freq'], expected_fit['freq'])
+            npt.assert_allclose(fit['amplitude'], expected_fit['amplitude'],
+                                rtol=1e-6)
+
+    lomb_model = lomb_scargle.lomb_scargle_model(times, values, errors,
+                                                 fmin=1., fmax=10.)
+    assert lomb_model['f0'] == 1.
+    assert lomb_model['numf'] < expected['numf']
+    npt.assert_allclose(lomb_model['freq_fits'][0]['freq'], frequencies[0],
+                        rtol=1e-2)
+
+
+def test_lomb_scargle_model_prewhiten_candidates():
+    """Test that restricting the prewhitened searches to the peaks of the
+    first periodogram finds the same frequencies as the full grid search.
+    """
+    frequencies = WAVE_FREQS
+    amplitudes = np.zeros((len(frequencies),4))
+    amplitudes[:,0] = [4,2,1]
+    times, values, errors = irregular_periodic(frequencies, amplitudes, 0.1)
+    expected = lomb_scargle.lomb_scargle_model(times, values, errors)
+    for min_signif in [3., np.inf]:
+        lomb_model = lomb_scargle.lomb_scargle_model(times, values, errors,
+                                                     prewhiten_candidates=10,
+                                                     min_signif=min_signif)
+        for i in range(len(frequencies)):
+            fit = lomb_model['freq_fits'][i]
+            expected_fit = expected['freq_fits'][i]
+            assert 'peaks' not in fit
+            npt.assert_allclose(fit['freq'], expected_fit['freq'])
+            npt.assert_allclose(fit['amplitude'], expected_fit['amplitude'],
+                                rtol=1e-6)
+
+
+def test_lomb_scargle_model_batch():
+    """Test that fitting several series sharing the same times at once gives
+    the same models as fitting each series separately.
+    """
+    times, values, errors = irregular_periodic(WAVE_FREQS, np.ones((3, 4)),
+                                               0.1)
+    signals = np.array([values, 2 * values[::-1], np.sin(times)])
+    models = lomb_scargle.lomb_scargle_model_batch(times, signals, errors,
+                                                   model_error=True)
+    assert len(models) == len(signals)
+    for signal, model in zip(signals, models):
+        expected = lomb_scargle.lomb_scargle_model(times, signal, errors,
+                                                   model_error=True)
+        assert set(model) == set(expected)
+        for key in ['trend', 'varrat', 'chi2', 'f0', 'df', 'numf']:
+            npt.assert_array_equal(model[key], expected[key])
+        for fit, expected_fit in zip(model['freq_fits'],
+                                     expected['freq_fits']):
+            assert set(fit) == set(expected_fit)
+            for key in fit:
+                npt.assert_array_equal(fit[key], expected_fit[key])
+
+
+def test_periodic_model():
+    """Test the extrema of the fitted harmonic model used by the
+    `freq_model_*` features, for single models and batches of models with
+    different numbers of harmonics.
+    """
+    # Single sinusoid: maxima at 0.25 (+ 1), minima at 0.75 (+ 1)
+    model = {'freq_fits': [{'amplitude': np.array([1., 0., 0.]),
+                            'rel_phase': np.zeros(3)}]}
+    for method, rtol in [('grid', 1e-7), ('fmin', 1e-3)]:
+        features = periodic_model.periodic_model(model, method=method)
+        npt.assert_allclose(features['phi1_phi2'], 0.5 / (1.75 / 1.25),
+                            rtol=rtol)
+        npt.assert_allclose(features['min_delta_mags'], 0., atol=1e-7)
+        npt.assert_allclose(features['max_delta_mags'], 0., atol=1e-7)
+
+    # Constant model: no extrema, so the grid search stays at the starting
+    # points
+    model['freq_fits'][0]['amplitude'][0] = 0.
+    features = periodic_model.periodic_model(model, method='grid')
+    npt.assert_allclose(features['phi1_phi2'], 0.01 / (0.08 / 0.07))
+    assert features['min_delta_mags'] == features['max_delta_mags'] == 0.
+
+    rng = np.random.RandomState(0)
+    for nharm in [2, 5, 8]:
+        A = rng.uniform(0, 1, (20, nharm))
+        ph = rng.uniform(-np.pi, np.pi, (20, nharm))
+        times, is_maximum = periodic_model.model_extrema(A, ph)
+        for A_i, ph_i, times_i, is_maximum_i in zip(A, ph, times, is_maximum):
+            # Compare to the extrema of the model on a fine grid
+            t = np.linspace(0., 1., 100001)[:-1]
+            f = periodic_model.harmonic_model(
+                t, np.tile(A_i, (len(t), 1)), np.tile(ph_i, (len(t), 1)))
+            f_prev, f_next = np.roll(f, 1), np.roll(f, -1)
+            maxima = t[(f > f_prev) & (f >= f_next)]
+            minima = t[(f < f_prev) & (f <= f_next)]
+            valid = ~np.isnan(times_i)
+            npt.assert_allclose(times_i[valid & is_maximum_i], maxima,
+                                atol=1e-5)
+            npt.assert_allclose(times_i[valid & ~is_maximum_i], minima,
+                                atol=1e-5)
+
+        start = rng.uniform(-1, 2, 20)
+        for maximum in [True, False]:
+            t = periodic_model.find_extremum(A, ph, start, maximum)
+            d1 = periodic_model.harmonic_model(t, A, ph, deriv=1)
+            d2 = periodic_model.harmonic_model(t, A, ph, deriv=2)
+            npt.assert_allclose(d1, 0., atol=1e-8)
+            assert np.all((d2 < 0) if maximum else (d2 > 0))
+            # Moving uphill (or downhill) from `start` never passes another
+            # extremum
+            assert np.all(np.abs(t - start) < 1)
+
+        for method in ['fmin', 'grid']:
+            batch = periodic_model.periodic_model_batch(A, ph, method)
+            for i in range(len(A)):
+                model = {'freq_fits': [{'amplitude': A[i],
+                                        'rel_phase': ph[i]}]}
+                features = periodic_model.periodic_model(model, method)
+                for key in features:
+                    npt.assert_allclose(features[key], batch[key][i],
+                                        rtol=1e-12)
+
+
+def test_periodic_model_fmin_reference():
+    """Test that the default extrema search reproduces the features computed
+    with `scipy.optimize.fmin`, including for models with small ripples
+    (where the adjacent extrema found by the grid search differ).
+    """
+    amplitudes = [[1., 0.3, 0.2, 0.15, 0.1, 0.05, 0.02, 0.01],
+                  [1., 0.05, 0.3, 0.02, 0.25, 0.01, 0.1, 0.05],
+                  [0.8, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1]]
+    phases = [[0., 1., 2., -1., 0.5, -2., 3., 1.5],
+              [0.3, -0.2, 1.1, 2.5, -1.7, 0.9, -2.8, 0.4],
+              [1., 1., 1., 1., 1., 1., 1., 1.]]
+    # Values from the previous implementation (four `optimize.fmin` calls)
+    expected = {'phi1_phi2': [0.046801738189356859, 0.032212455471434039,
+                              0.013361014942653718],
+                'min_delta_mags': [0.02326254913026593, 0.056457009995353191,
+                                   0.63586041519862102],
+                'max_delta_mags': [0.73390358972491843, 1.6115953869860422,
+                                   1.3718488779872795]}
+    batch = periodic_model.periodic_model_batch(amplitudes, phases)
+    for i in range(len(amplitudes)):
+        model = {'freq_fits': [{'amplitude': np.array(amplitudes[i]),
+                                'rel_phase': np.array(phases[i])}]}
+        features = periodic_model.periodic_model(model)
+        for key in expected:
+            npt.assert_allclose(features[key], expected[key][i], rtol=1e-12)
+            npt.assert_allclose(batch[key][i], expected[key][i], rtol=1e-12)
@@ -0,0 +1,88 @@
+import numpy as np
+import numpy.testing as npt
+
+from cesium.features import FeaturePlan, graphs, time_cache
+from cesium.features.tests.util import generate_features, irregular_random
+
+
+def test_plan_matches_dask_graph():
+    """Test that a FeaturePlan reproduces the dask graph feature values."""
+    times, values, errors = irregular_random()
+    features_to_use = [f for f in graphs.CADENCE_FEATS + graphs.GENERAL_FEATS
+                       if f != 'period_fast']
+    expected = generate_features(times, values, errors, features_to_use)
+    computed = FeaturePlan(features_to_use).run(times, values, errors)
+    for feature, value in zip(features_to_use, computed):
+        npt.assert_equal(value, expected[feature])
+
+
+def test_plan_culls_graph():
+    """Test that only the ancestors of requested features are computed."""
+    plan = FeaturePlan(['amplitude', 'freq1_freq'])
+    assert [key for key, _, _ in plan.steps] == ['amplitude', '_lomb_model',
+                                                 'freq1_freq']
+    plan = FeaturePlan(['all_times_nhist_peak_val'])
+    steps = [key for key, _, _ in plan.steps]
+    assert steps.index('delta_t_hist') < steps.index('delta_t_nhist')
+    assert steps.index('total_time') < steps.index('delta_t_nhist')
+    assert 'cads' not in steps
+
+
+def test_plan_custom_functions():
+    """Test FeaturePlan with custom functions/graphs and meta features."""
+    times, values, errors = irregular_random()
+    plan = FeaturePlan(['amplitude', 'mean_plus_meta'],
+                       {'amplitude': lambda t, m, e: -1.,
+                        'mean_plus_meta': lambda t, m, e: np.mean(m) + 1.})
+    npt.assert_allclose(plan.run(times, values, errors),
+                        [-1., np.mean(values) + 1.])
+
+    plan = FeaturePlan(['scaled_std', 'meta1', 'maximum'],
+                       {'scaled_std': (lambda x, y: x * y, 'std', 'meta1')})
+    npt.assert_allclose(plan.run(times, values, errors,
+                                 {'meta1': 2., 'maximum': 5.}),
+                        [2. * np.std(values), 2., 5.])
+
+
+def test_plan_time_grid_cache():
+    """Test that time-only steps are shared between series with the same
+    times (unless they depend on overridden features).
+    """
+    times, values, errors = irregular_random()
+    features_to_use = ['cads_std', 'cad_probs_10', 'all_times_nhist_peak_val',
+                       'amplitude']
+    plan = FeaturePlan(features_to_use)
+    assert set(plan.time_only) >= {'cads', 'cads_std', 'cad_probs_10',
+                                   'delta_t_hist', 'all_times_nhist_peak_val'}
+    assert 'amplitude' not in plan.time_only
+
+    cache = time_cache.TIME_GRID_CACHE
+    cache.clear()
+    expected = plan.run(times, values, errors)
+    misses = cache.misses
+    hits = cache.hits
+    computed = plan.run(times.copy(), 2 * values, errors)
+    npt.assert_equal(computed[:3], expected[:3])
+    assert cache.misses == misses
+    assert cache.hits > hits
+
+    # Values derived from overridden features are not taken from the cache
+    computed = plan.run(times, values, errors, {'cads': np.array([1., 3.])})
+    npt.assert_allclose(computed[0], 1.)
+
+    computed = plan.run(times + 1., values, errors)
+    assert cache.misses > misses
+
+
+def test_time_grid_cache_eviction():
+    """Test that TimeGridCache evicts the least recently used grids."""
+    t = np.arange(100.)
+    cache = time_cache.TimeGridCache(max_bytes=3 * t.nbytes)
+    grid = cache.grid(t)
+    npt.assert_equal(grid.get('x', np.diff, t), np.ones(99))
+    assert cache.grid(t.copy()) is grid
+    cache.grid(t + 1).get('x', np.diff, t + 1)
+    assert cache.nbytes <= cache.max_bytes
+    assert cache.grid(t) is not grid
+    assert cache.grid(t + 1).get('x', len, t) is not None
+    assert cache.hits == 1 and cache.misses == 2
@@ -0,0 +1,144 @@
+import collections
+import sys
+import threading
+
+import numpy as np
+
+
+__all__ = ['TimeGridCache', 'TIME_GRID_CACHE']
+
+
+def _nbytes(value):
+    """Approximate memory footprint of a cached value."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    elif isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_nbytes(v) for v in value)
+    elif isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_nbytes(v) for v in value.values())
+    else:
+        return sys.getsizeof(value)
+
+
+class TimeGrid(object):
+    """Values computed from a single array of time values; see
+    `TimeGridCache.grid`.
+    """
+    def __init__(self, cache, fingerprint, t):
+        self.cache = cache
+        self.fingerprint = fingerprint
+        self.t = t
+        self.values = {}
+        self.nbytes = t.nbytes
+
+    def get(self, key, func, *args):
+        """Return the value stored under `key`, or compute it as
+        `func(*args)` and store it.
+        """
+        try:
+            value = self.values[key]
+        except KeyError:
+            self.cache.misses += 1
+            value = func(*args)
+            self.cache._store(self, key, value)
+        else:
+            self.cache.hits += 1
+        return value
+
+
+class TimeGridCache(object):
+    """In-memory LRU cache of values that only depend on the time values of a
+    time series, such as the time-only features (e.g. the Cadence family) and
+    the Lomb-Scargle trig tables.
+
+    Channels of multichannel time series with shared times, and datasets on a
+    common (e.g. uniform) time grid, would otherwise compute these values for
+    every channel and time series. Grids are looked up by a fingerprint of
+    the time array (its length and a strided sample of its values); as
+    fingerprints can collide, the full array is then compared to the stored
+    copy before any values are reused.
+
+    The cache is shared by all threads of a process (each worker process of
+    a `featurize.Featurizer` has its own). When the total size of the stored
+    values and grids exceeds `max_bytes`, the least recently used grids are
+    evicted; with `max_bytes=0`, nothing is stored. Cached values are shared
+    between callers and must not be modified.
+
+    Parameters
+    ----------
+    max_bytes : int, optional
+        Maximum total size of the cache in bytes. Defaults to 64 MB.
+
+    Attributes
+    ----------
+    hits, misses : int
+        Number of values found/not found in the cache.
+    nbytes : int
+        Current size of the cache in bytes.
+    """
+    def __init__(self, max_bytes=2**26):
+        self.max_bytes = max_bytes
+        self.hits = self.misses = 0
+        self.nbytes = 0
+        self._grids = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return ('<TimeGridCache: {} grids, {} bytes ({} hits, {} misses)>'
+                .format(len(self._grids), self.nbytes, self.hits,
+                        self.misses))
+
+    @staticmethod
+    def fingerprint(t):
+        """Cheap (non-unique) fingerprint of the time array `t`."""
+        sample = t[::max(1, len(t) // 16)]
+        return (len(t), t.dtype.str, tuple(sample.tolist()),
+                t[-1].item() if len(t) else None)
+
+    def grid(self, t):
+        """Return the `TimeGrid` holding the values computed for the time
+        values `t`, creating a new (empty) one if necessary.
+        """
+        t = np.asarray(t)
+        fingerprint = self.fingerprint(t)
+        with self._lock:
+            grid = self._grids.get(fingerprint)
+            if grid is not None and np.array_equal(grid.t, t):
+                self._grids[fingerprint] = self._grids.pop(fingerprint)
+                return grid
+        return TimeGrid(self, fingerprint, np.array(t))
+
+    def _store(self, grid, key, value):
+        """Add `value` to `grid` (and `grid` to the cache), evicting the least
+        recently used grids as needed.
+        """
+        size = _nbytes(value)
+        with self._lock:
+            if self._grids.get(grid.fingerprint) is not grid:
+                if grid.nbytes + size > self.max_bytes:
+                    return
+                old = self._grids.pop(grid.fingerprint, None)
+                if old is not None:
+                    self.nbytes -= old.nbytes
+                self._grids[grid.fingerprint] = grid
+                self.nbytes += grid.nbytes
+            elif grid.nbytes + size > self.max_bytes:
+                return
+            grid.values[key] = value
+            grid.nbytes += size
+            self.nbytes += size
+            self._grids[grid.fingerprint] = self._grids.pop(grid.fingerprint)
+            while self.nbytes > self.max_bytes:
+                fingerprint, old = self._grids.popitem(last=False)
+                self.nbytes -= old.nbytes
+
+    def clear(self):
+        """Remove all grids from the cache."""
+        with self._lock:
+            self._grids.clear()
+            self.nbytes = 0
+
+
+# Used by `FeaturePlan.evaluate` and the Lomb-Scargle features; set
+# `TIME_GRID_CACHE.max_bytes = 0` to disable caching
+TIME_GRID_CACHE = TimeGridCache()
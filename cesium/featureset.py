@@ -60,6 +60,55 @@ class Featureset(xr.Dataset):
             raise NotImplementedError("Imputation strategy '{}' not"
                                       "recognized.".format(strategy))
 
+    def extend(self, ts_source, new_features, custom_functions=None,
+               featurizer=None, cache=None, chunk_size=1000):
+        """Add features to the featureset, computing only those that are not
+        already present.
+
+        The new feature values are computed for the time series in
+        `ts_source` (which must have the same `name`s as the time series in
+        the featureset) and merged into this featureset in place, aligned by
+        `name`. Intermediate values shared by several of the new features
+        (e.g., the Lomb-Scargle model) are only computed once per time series;
+        see also `cesium.cache.FeatureCache` for reusing values computed by
+        previous calls.
+
+        Parameters
+        ----------
+        ts_source : iterable of TimeSeries or str
+            Time series (or paths to time series stored in NetCDF format)
+            from which the featureset was generated.
+        new_features : list of str
+            List of feature names to be added.
+        custom_functions : dict, optional
+            Dictionary of custom feature functions or dask graph; see
+            `featurize.featurize_time_series`.
+        featurizer : featurize.Featurizer, optional
+            Executor used to featurize the time series in parallel.
+        cache : cache.FeatureCache, optional
+            Cache of previously computed feature values.
+        chunk_size : int, optional
+            Number of time series featurized per task. Defaults to 1000.
+
+        Returns
+        -------
+        cesium.Featureset
+            This featureset, with the new features added.
+        """
+        from .featurize import iter_featurize
+
+        missing = [f for f in new_features if f not in self.data_vars]
+        if not missing:
+            return self
+        chunks = [fset.reset_coords(drop=True)[missing]
+                  for fset in iter_featurize(ts_source, missing,
+                                             custom_functions=custom_functions,
+                                             featurizer=featurizer,
+                                             chunk_size=chunk_size,
+                                             cache=cache)]
+        self.update(xr.concat(chunks, dim='name'))
+        return self
+
     def __getitem__(self, key):
         """Overloads indexing of `xarray.Dataset` to handle special cases for
         extracting features for specific time series. The `name` attribute is
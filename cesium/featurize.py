@@ -1,26 +1,238 @@
+import collections
 import copy
+from itertools import islice
+import multiprocessing
+import multiprocessing.pool
 import os
+from os.path import join as pjoin
+import shutil
+import tempfile
+import time
 from collections import Iterable
 import numpy as np
 import pandas as pd
 import xarray as xr
-import dask.async
+import cloudpickle
+import dask
+import dask.base
 import dask.multiprocessing
+import dask.threaded
 from dask import delayed
 
 from . import data_management
 from . import time_series
 from . import util
+from .cache import INTERMEDIATE_NODES
 from .featureset import Featureset
 from .time_series import TimeSeries
-from .features import generate_dask_graph
+from .features import BATCH_FEATS, FeaturePlan, SharedSteps, featurize_batch
 
 __all__ = ['load_and_store_feature_data', 'featurize_time_series',
-           'featurize_single_ts', 'assemble_featureset']
+           'featurize_single_ts', 'featurize_ts_batch', 'assemble_featureset',
+           'iter_featurize', 'Featurizer']
+
+
+# Plans are reused across calls within a (worker) process; see `_feature_plan`
+_PLAN_CACHE = {}
+_PLAN_CACHE_SIZE = 32
+
+# Target duration (in seconds) of a single featurization task, and number of
+# partial featuresets combined by each concatenation task; see `_chunk_costs`
+_CHUNK_DURATION = 0.5
+_CONCAT_FAN_IN = 8
+
+
+def _feature_plan(features_to_use, custom_functions=None, inputs=()):
+    """Return a (cached) `FeaturePlan` for the given features/custom functions
+    (and additional inputs).
+
+    Custom functions are identified by their dask token, so that plans survive
+    the functions being pickled and sent to another process.
+    """
+    key = (tuple(features_to_use),
+           dask.base.tokenize(custom_functions) if custom_functions else None,
+           tuple(sorted(inputs)))
+    try:
+        return _PLAN_CACHE[key]
+    except KeyError:
+        if len(_PLAN_CACHE) >= _PLAN_CACHE_SIZE:
+            _PLAN_CACHE.clear()
+        plan = _PLAN_CACHE[key] = FeaturePlan(
+            features_to_use, custom_functions,
+            inputs=('t', 'm', 'e') + tuple(inputs))
+        return plan
+
+
+def _initialize_worker(features_to_use=None, custom_functions=None):
+    """Warm up a `Featurizer` worker process.
+
+    The feature modules (and hence numpy/scipy/gatspy) are imported along with
+    this module when the worker starts; if `features_to_use` is given, the
+    corresponding `FeaturePlan` is also built and cached up front.
+    """
+    if features_to_use:
+        _feature_plan(features_to_use, custom_functions)
+
+
+def _apply_pickled(payload):
+    """Evaluate a `(func, args)` pair serialized with `cloudpickle`."""
+    func, args = cloudpickle.loads(payload)
+    return func(*args)
+
+
+class Featurizer(object):
+    """Reusable executor for feature extraction backed by a persistent pool
+    of worker processes (or threads).
+
+    `dask.multiprocessing.get` creates (and tears down) a new process pool
+    every time it is called, so that each call pays for starting the workers
+    and re-importing the scientific Python stack. A `Featurizer` keeps its
+    pool alive between calls, so that imports, `FeaturePlan`s and other
+    per-process caches stay resident in the workers. Instances are `dask`
+    schedulers and can be passed as the `scheduler` argument of
+    `featurize_time_series` and `featurize_ts_files`:
+
+    >>> with Featurizer() as featurizer:  # doctest: +SKIP
+    ...     for t, m, e in batches:
+    ...         fset = featurize_time_series(t, m, e, features_to_use,
+    ...                                      scheduler=featurizer)
+
+    With `threads=True`, tasks are instead run by a pool of threads in the
+    current process, so that time series are never copied or pickled. This
+    scales well for workloads dominated by the Lomb-Scargle features (and
+    other numpy-heavy computations), whose compiled kernel releases the GIL.
+
+    Parameters
+    ----------
+    n_workers : int, optional
+        Number of worker processes/threads; defaults to the number of CPUs.
+    features_to_use : list of str, optional
+        Features whose execution plan is built in each worker on startup.
+    custom_functions : dict, optional
+        Custom functions/graph used together with `features_to_use` when
+        pre-building plans; see `featurize_single_ts`.
+    shared_memory : bool, optional
+        If True, `featurize_time_series` sends time series to the workers
+        through shared memory instead of pickling them with each task: all
+        channels are packed into one flat memory-mapped buffer (plus
+        offsets), workers receive only ranges of series indices, and feature
+        values are written directly into a shared output matrix (so they must
+        be numeric). Defaults to False.
+    threads : bool, optional
+        If True, use a pool of threads instead of processes. Cannot be
+        combined with `shared_memory`. Defaults to False.
+    """
+    def __init__(self, n_workers=None, features_to_use=None,
+                 custom_functions=None, shared_memory=False, threads=False):
+        if threads and shared_memory:
+            raise ValueError("shared_memory requires worker processes "
+                             "(threads=False).")
+        self.n_workers = n_workers or multiprocessing.cpu_count()
+        self.shared_memory = shared_memory
+        self.threads = threads
+        pool_class = (multiprocessing.pool.ThreadPool if threads
+                      else multiprocessing.Pool)
+        self.pool = pool_class(self.n_workers, initializer=_initialize_worker,
+                               initargs=(features_to_use, custom_functions))
+
+    def __repr__(self):
+        return '<Featurizer: {} {}{}>'.format(
+            self.n_workers, 'threads' if self.threads else 'workers',
+            '' if self.pool is not None else ' (closed)')
+
+    def __call__(self, dsk, keys, **kwargs):
+        """Compute `keys` of the dask graph `dsk` using the worker pool."""
+        if self.pool is None:
+            raise ValueError("Featurizer has been closed.")
+        get = dask.threaded.get if self.threads else dask.multiprocessing.get
+        with dask.set_options(pool=self.pool):
+            return get(dsk, keys, **kwargs)
+
+    get = __call__
+
+    def submit(self, func, *args):
+        """Evaluate `func(*args)` asynchronously in a worker process (or
+        thread).
+
+        For worker processes, functions and arguments are serialized using
+        `cloudpickle`, so that e.g. custom feature functions defined
+        interactively can be used.
+
+        Returns
+        -------
+        multiprocessing.pool.AsyncResult
+            Handle whose `get()` method returns the result.
+        """
+        if self.pool is None:
+            raise ValueError("Featurizer has been closed.")
+        if self.threads:
+            return self.pool.apply_async(func, args)
+        return self.pool.apply_async(_apply_pickled,
+                                     (cloudpickle.dumps((func, args)),))
+
+    def close(self):
+        """Shut down the worker processes/threads."""
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _run_features(features_to_use, t, m, e, meta_features={},
+                  custom_functions=None, cache=None, shared=None):
+    """Compute feature values for a single channel of data, looking up and
+    storing values in `cache` (a `cache.FeatureCache`), if provided. Steps
+    shared with other channels are looked up in/added to `shared` (a
+    `features.SharedSteps`), if provided.
+
+    If `cache.persist_intermediates` is set, the values of any intermediate
+    nodes (see `cache.INTERMEDIATE_NODES`) required by features that are not
+    in the cache are looked up as well, and those that are found are passed
+    as inputs to the plan instead of being recomputed.
+    """
+    plan = _feature_plan(features_to_use, custom_functions)
+    if cache is None:
+        return plan.run(t, m, e, meta_features, shared=shared)
+
+    key = cache.series_key(t, m, e, meta_features)
+    signatures = [plan.signatures[feature] for feature in features_to_use]
+    found = cache.lookup(key, signatures)
+    missing = [feature for feature, signature in zip(features_to_use,
+                                                     signatures)
+               if signature not in found]
+    if missing:
+        subplan = _feature_plan(missing, custom_functions)
+        intermediates = {}
+        if cache.persist_intermediates:
+            intermediates = {step[0]: subplan.signatures[step[0]]
+                             for step in subplan.steps
+                             if step[0] in INTERMEDIATE_NODES}
+        stored = (cache.lookup(key, list(intermediates.values()), count=False)
+                  if intermediates else {})
+        inputs = {node: stored[signature]
+                  for node, signature in intermediates.items()
+                  if signature in stored}
+        if inputs:
+            subplan = _feature_plan(missing, custom_functions, inputs)
+        namespace = subplan.evaluate(t, m, e, meta_features, inputs, shared)
+        computed = {plan.signatures[feature]: namespace[feature]
+                    for feature in missing}
+        found.update(computed)
+        computed.update({signature: cache.compact(node, namespace[node])
+                         for node, signature in intermediates.items()
+                         if node not in inputs and node in namespace})
+        cache.store(key, computed)
+    return [found[signature] for signature in signatures]
 
 
 def featurize_single_ts(ts, features_to_use, custom_script_path=None,
-                        custom_functions=None):
+                        custom_functions=None, cache=None):
     """Compute feature values for a given single time-series. Data is
     returned as dictionaries/lists of lists.
 
@@ -38,6 +250,9 @@ def featurize_single_ts(ts, features_to_use, custom_script_path=None,
         dask graph, these arrays should be referenced as 't', 'm', 'e',
         respectively, and any values with keys present in `features_to_use`
         will be computed.
+    cache : cache.FeatureCache, optional
+        Cache of previously computed feature values; only features that are
+        not found in the cache are computed (and then added to it).
 
     Returns
     -------
@@ -45,35 +260,180 @@ def featurize_single_ts(ts, features_to_use, custom_script_path=None,
         Dictionary with feature names as keys, lists of feature values (one per
         channel) as values.
     """
+
     # Initialize empty feature array for all channels
     all_feature_lists = {feature: [0.] * ts.n_channels
                          for feature in features_to_use}
+    # Steps that only depend on times/errors shared by all channels (e.g. the
+    # Cadence and Error features) are computed once and reused
+    shared = None
+    if ts.n_channels > 1:
+        shared = SharedSteps(ts.shared_inputs())
     for (t_i, m_i, e_i), i in zip(ts.channels(), range(ts.n_channels)):
-        feature_graph = generate_dask_graph(t_i, m_i, e_i)
-        feature_graph.update(ts.meta_features)
-
-        if custom_functions:
-            # If values in custom_functions are functions, add calls to graph
-            if all(hasattr(v, '__call__') for v in custom_functions.values()):
-                feature_graph.update({feat: f(t_i, m_i, e_i)
-                                      for feat, f in custom_functions.items()})
-            # Otherwise, custom_functions is another dask graph
-            else:
-                feature_graph.update(custom_functions)
-
-        # Do not execute in parallel; parallelization has already taken place at
-        # the level of time series, so we compute features for a single time series
-        # in serial.
-        values = dask.async.get_sync(feature_graph, features_to_use)
-
-        # We set values in this order so that custom features take priority
-        # over cesium features in the case of name conflicts
+        # Do not execute in parallel; parallelization has already taken place
+        # at the level of time series, so we compute features for a single
+        # time series in serial.
+        values = _run_features(features_to_use, t_i, m_i, e_i,
+                               ts.meta_features, custom_functions, cache,
+                               shared)
+
+        # Custom features take priority over cesium features in the case of
+        # name conflicts (see `FeaturePlan`)
         for feature, value in zip(features_to_use, values):
             all_feature_lists[feature][i] = value
 
     return all_feature_lists
 
 
+def featurize_ts_batch(all_time_series, features_to_use):
+    """Compute features for a list of time series using the vectorized batch
+    engine (see `features.batch.featurize_batch`).
+
+    Every channel of every time series is treated as a separate row of the
+    batch, so only features listed in `features.BATCH_FEATS` are supported.
+
+    Parameters
+    ----------
+    all_time_series : list of TimeSeries
+        Time series to be featurized.
+    features_to_use : list of str
+        List of feature names to be generated.
+
+    Returns
+    -------
+    Featureset
+        Featureset with `data_vars` containing feature values and `coords`
+        containing labels (`name`) and targets (`target`), if applicable.
+    """
+    channels = [c for ts in all_time_series for c in ts.channels()]
+    t, m, e = (np.concatenate(x) for x in zip(*channels))
+    offsets = np.cumsum([0] + [len(m_i) for t_i, m_i, e_i in channels])
+    values = featurize_batch(t, m, e, features_to_use, offsets=offsets)
+
+    feature_dicts = []
+    i = 0
+    for ts in all_time_series:
+        feature_dicts.append({feature: list(values[feature][i:i +
+                                                            ts.n_channels])
+                              for feature in features_to_use})
+        i += ts.n_channels
+    return assemble_featureset(feature_dicts, all_time_series)
+
+
+def _shared_memory_dir():
+    """Create a temporary directory for memory-mapped buffers, in RAM-backed
+    storage if available.
+    """
+    return tempfile.mkdtemp(prefix='cesium-',
+                            dir='/dev/shm' if os.path.isdir('/dev/shm')
+                            else None)
+
+
+def _featurize_shared_range(path, start, stop, features_to_use,
+                            meta_features, custom_functions=None, cache=None):
+    """Compute features for time series `start:stop` of the shared buffers in
+    `path` (see `_featurize_shared`), writing the results into the shared
+    output matrix.
+    """
+    # Copy-on-write maps, so that feature functions cannot modify the inputs
+    values = np.load(pjoin(path, 'values.npy'), mmap_mode='c')
+    offsets = np.load(pjoin(path, 'offsets.npy'), mmap_mode='r')
+    channels = np.load(pjoin(path, 'channels.npy'), mmap_mode='r')
+    out = np.load(pjoin(path, 'features.npy'), mmap_mode='r+')
+    for i, meta in zip(range(start, stop), meta_features):
+        for j, c in enumerate(range(channels[i], channels[i + 1])):
+            t_i, m_i, e_i = values[:, offsets[c]:offsets[c + 1]]
+            out[i, j] = _run_features(features_to_use, t_i, m_i, e_i, meta,
+                                      custom_functions, cache)
+    out.flush()
+    return stop - start
+
+
+def _featurize_shared(all_time_series, features_to_use, custom_functions=None,
+                      scheduler=dask.multiprocessing.get, n_tasks=None,
+                      cache=None):
+    """Compute features for a list of time series, transporting the data to
+    and from the workers through shared memory.
+
+    The (t, m, e) values of every channel are concatenated into a single
+    memory-mapped (3, N) array with channel `c` stored in
+    `[:, offsets[c]:offsets[c + 1]]`; time series `i` consists of channels
+    `channels[i]:channels[i + 1]`. Each task featurizes a contiguous range of
+    time series and writes to the rows of a shared (n_series, n_channels,
+    n_features) output matrix, so that only index ranges (and meta features)
+    are serialized.
+
+    Parameters
+    ----------
+    all_time_series : list of TimeSeries
+        Time series to be featurized.
+    features_to_use : list of str
+        List of feature names to be generated.
+    custom_functions : dict, optional
+        Custom feature functions or dask graph; see `featurize_single_ts`.
+    scheduler : function, optional
+        `dask` scheduler function; must run on the local machine.
+    n_tasks : int, optional
+        Number of ranges the time series are split into. Defaults to four per
+        worker for a `Featurizer` and one per CPU otherwise.
+    cache : cache.FeatureCache, optional
+        Cache of feature values; see `featurize_single_ts`.
+
+    Returns
+    -------
+    Featureset
+        Featureset with `data_vars` containing feature values and `coords`
+        containing labels (`name`) and targets (`target`), if applicable.
+    """
+    if n_tasks is None:
+        n_tasks = (4 * scheduler.n_workers if isinstance(scheduler, Featurizer)
+                   else multiprocessing.cpu_count())
+    n_channels = [ts.n_channels for ts in all_time_series]
+    lengths = [len(m_i) for ts in all_time_series
+               for t_i, m_i, e_i in ts.channels()]
+    offsets = np.cumsum([0] + lengths)
+    channels = np.cumsum([0] + n_channels)
+
+    path = _shared_memory_dir()
+    try:
+        values = np.lib.format.open_memmap(pjoin(path, 'values.npy'), 'w+',
+                                           'float64', (3, offsets[-1]))
+        c = 0
+        for ts in all_time_series:
+            for channel in ts.channels():
+                values[:, offsets[c]:offsets[c + 1]] = channel
+                c += 1
+        values.flush()
+        del values
+        np.save(pjoin(path, 'offsets.npy'), offsets)
+        np.save(pjoin(path, 'channels.npy'), channels)
+        out = np.lib.format.open_memmap(pjoin(path, 'features.npy'), 'w+',
+                                        'float64', (len(all_time_series),
+                                                    max(n_channels),
+                                                    len(features_to_use)))
+        out[:] = np.nan
+        out.flush()
+
+        # Split into ranges containing roughly equal numbers of points
+        bounds = np.searchsorted(offsets[channels],
+                                 np.linspace(0, offsets[-1], n_tasks + 1))
+        bounds = np.unique(np.r_[0, bounds, len(all_time_series)])
+        tasks = [delayed(_featurize_shared_range, pure=True)(
+                     path, start, stop, features_to_use,
+                     [dict(ts.meta_features) for ts in
+                      all_time_series[start:stop]], custom_functions, cache)
+                 for start, stop in zip(bounds[:-1], bounds[1:])]
+        dask.compute(*tasks, get=scheduler)
+
+        feature_dicts = [{feature: list(out[i, :n_channels[i], k])
+                          for k, feature in enumerate(features_to_use)}
+                         for i in range(len(all_time_series))]
+        del out
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+    return assemble_featureset(feature_dicts, all_time_series)
+
+
 def assemble_featureset(feature_dicts, time_series=None, targets=None,
                         meta_feature_dicts=None, names=None):
     """Transforms raw feature data (as returned by `featurize_single_ts`) into
@@ -128,6 +488,122 @@ def assemble_featureset(feature_dicts, time_series=None, targets=None,
     return Featureset(featureset)
 
 
+def _featurize_chunk(chunk, features_to_use, custom_script_path=None,
+                     custom_functions=None, cache=None):
+    """Featurize a list of time series (or paths to netCDF files containing
+    time series), returning a partial featureset.
+    """
+    chunk = [ts if isinstance(ts, TimeSeries) else time_series.from_netcdf(ts)
+             for ts in chunk]
+    feature_dicts = [featurize_single_ts(ts, features_to_use,
+                                         custom_script_path, custom_functions,
+                                         cache)
+                     for ts in chunk]
+    fset = assemble_featureset(feature_dicts, chunk)
+    # Always keep targets so that all partial featuresets can be concatenated;
+    # see `_featurize_chunked`
+    fset.coords['target'] = ('name', np.array([ts.target for ts in chunk]))
+    return fset
+
+
+def _finalize_targets(fset):
+    """Restore the usual dtype of the `target` coordinate of a featureset
+    returned by `_featurize_chunk`, or drop it if no targets are present.
+    """
+    targets = list(fset['target'].values)
+    if any(targets):
+        fset.coords['target'] = ('name', np.array(targets))
+    else:
+        del fset.coords['target']
+    return fset
+
+
+def _concat_featuresets(featuresets):
+    """Concatenate partial featuresets along the `name` dimension."""
+    return Featureset(xr.concat(featuresets, dim='name'))
+
+
+def _chunk_costs(costs, n_workers):
+    """Group consecutive time series with estimated featurization times
+    `costs` into chunks.
+
+    Chunks contain roughly `_CHUNK_DURATION` seconds of work, but are made
+    smaller if necessary so that there are at least four chunks per worker.
+
+    Returns
+    -------
+    list of int
+        Boundaries of the chunks, i.e. chunk `i` contains time series
+        `bounds[i]:bounds[i + 1]`.
+    """
+    if len(costs) == 0:
+        return [0]
+    # Fall back to equal costs if the measured time is below timer resolution
+    if np.sum(costs) <= 0:
+        costs = np.ones(len(costs))
+    cumulative_cost = np.cumsum(costs)
+    target = min(_CHUNK_DURATION, cumulative_cost[-1] / (4. * n_workers))
+    n_chunks = max(1, int(np.ceil(cumulative_cost[-1] / target)))
+    bounds = np.searchsorted(cumulative_cost,
+                             np.arange(1, n_chunks) * target) + 1
+    return list(np.unique(np.r_[0, bounds, len(costs)].clip(0, len(costs))))
+
+
+def _featurize_chunked(items, sizes, features_to_use, custom_script_path=None,
+                       custom_functions=None, scheduler=dask.multiprocessing.get,
+                       cache=None):
+    """Featurize time series (or netCDF paths) in chunks of auto-tuned size.
+
+    The first time series is featurized immediately in order to measure the
+    cost of featurization per data point; the remaining series are grouped
+    into chunks whose estimated durations are roughly equal (see
+    `_chunk_costs`), and each chunk becomes a single task returning a partial
+    featureset. The partial featuresets are then concatenated by a tree of
+    tasks with fan-in `_CONCAT_FAN_IN`, rather than by a single task
+    depending on every chunk.
+
+    Parameters
+    ----------
+    items : list of TimeSeries or str
+        Time series or paths to netCDF files to be featurized.
+    sizes : list of int
+        Size of each item (e.g., number of data points or file size), used to
+        estimate relative costs.
+
+    See `featurize_time_series` for a description of the other parameters.
+
+    Returns
+    -------
+    Featureset
+        Featureset with `data_vars` containing feature values and `coords`
+        containing labels (`name`) and targets (`target`), if applicable.
+    """
+    tic = time.time()
+    first = _featurize_chunk(items[:1], features_to_use, custom_script_path,
+                             custom_functions, cache)
+    cost = time.time() - tic
+    costs = cost / max(sizes[0], 1) * np.asarray(sizes[1:], dtype=float)
+    n_workers = (scheduler.n_workers if isinstance(scheduler, Featurizer)
+                 else multiprocessing.cpu_count())
+
+    bounds = _chunk_costs(costs, n_workers)
+    featuresets = [first] + [
+        delayed(_featurize_chunk, pure=True)(items[1 + start:1 + stop],
+                                             features_to_use,
+                                             custom_script_path,
+                                             custom_functions, cache)
+        for start, stop in zip(bounds[:-1], bounds[1:])]
+    while len(featuresets) > 1:
+        featuresets = [delayed(_concat_featuresets, pure=True)(
+                           featuresets[i:i + _CONCAT_FAN_IN])
+                       for i in range(0, len(featuresets), _CONCAT_FAN_IN)]
+    fset = featuresets[0]
+    if fset is not first:
+        fset = fset.compute(get=scheduler)
+
+    return _finalize_targets(fset)
+
+
 def load_and_store_feature_data(features_path, output_path):
     """Read features from CSV file and save as an xarray.Dataset."""
     targets, meta_features = data_management.parse_headerfile(features_path)
@@ -143,7 +619,7 @@ def load_and_store_feature_data(features_path, output_path):
 def featurize_time_series(times, values, errors=None, features_to_use=[],
                           targets=None, meta_features={}, labels=None,
                           custom_script_path=None, custom_functions=None,
-                          scheduler=dask.multiprocessing.get):
+                          scheduler=dask.multiprocessing.get, cache=None):
     """Versatile feature generation function for one or more time series.
 
     For a single time series, inputs may have the form:
@@ -210,9 +686,15 @@ def featurize_time_series(times, values, errors=None, features_to_use=[],
         dask graph, these arrays should be referenced as 't', 'm', 'e',
         respectively, and any values with keys present in `features_to_use`
         will be computed.
-    scheduler : function, optional
+    scheduler : function or Featurizer, optional
         `dask` scheduler function used to perform feature extraction
-        computation. Defaults to `dask.multiprocessing.get`.
+        computation, or a `Featurizer` whose persistent worker pool should be
+        used (e.g. `Featurizer(threads=True)` to featurize in multiple threads
+        of the current process). Defaults to `dask.multiprocessing.get`.
+    cache : cache.FeatureCache, optional
+        Cache of previously computed feature values; only features that are
+        not found in the cache are computed (and then added to it). Defaults
+        to None.
 
     Returns
     -------
@@ -267,29 +749,108 @@ def featurize_time_series(times, values, errors=None, features_to_use=[],
         meta_features = meta_features.to_dict()
     meta_features = pd.DataFrame(meta_features, index=labels)
 
-    all_time_series = [delayed(TimeSeries(t, m, e, target=targets.loc[label],
-                                          meta_features=meta_features.loc[label],
-                                          name=label), pure=True)
+    all_time_series = [TimeSeries(t, m, e, target=targets.loc[label],
+                                  meta_features=meta_features.loc[label],
+                                  name=label)
                        for t, m, e, label in zip(times, values, errors,
                                                  labels)]
 
-    all_features = [delayed(featurize_single_ts, pure=True)(ts, features_to_use,
-                                                            custom_script_path,
-                                                            custom_functions)
-                    for ts in all_time_series]
-    result = delayed(assemble_featureset, pure=True)(all_features, all_time_series)
-    return result.compute(get=scheduler)
+    # Features that can be vectorized across time series are computed
+    # in-process, without the overhead of scheduling one task per series
+    if (features_to_use and custom_script_path is None and
+            custom_functions is None and
+            all(f in BATCH_FEATS for f in features_to_use)):
+        return featurize_ts_batch(all_time_series, features_to_use)
+
+    if isinstance(scheduler, Featurizer) and scheduler.shared_memory:
+        return _featurize_shared(all_time_series, features_to_use,
+                                 custom_functions, scheduler, cache=cache)
+
+    return _featurize_chunked(all_time_series,
+                              [sum(len(m_i) for t_i, m_i, e_i in ts.channels())
+                               for ts in all_time_series],
+                              features_to_use, custom_script_path,
+                              custom_functions, scheduler, cache)
+
+
+def iter_featurize(source, features_to_use, custom_script_path=None,
+                   custom_functions=None, featurizer=None, chunk_size=1,
+                   max_in_flight=None, cache=None):
+    """Lazily featurize a stream of time series, yielding partial featuresets.
+
+    Time series are pulled from `source` only as fast as they are featurized,
+    so that at most `max_in_flight` chunks of `chunk_size` series are held in
+    memory at any time; results are yielded in the order of `source`. This
+    allows featurizing collections of time series that do not fit in memory,
+    and passing the results directly on to storage or prediction.
+
+    Parameters
+    ----------
+    source : iterable of TimeSeries or str
+        Iterable (e.g., list, generator or parser) of `TimeSeries` objects or
+        paths to time series stored in NetCDF format; paths are loaded by the
+        worker that featurizes them.
+    features_to_use : list of str
+        List of feature names to be generated.
+    custom_script_path : str, optional
+        Path to Python script containing function definitions for the
+        generation of any custom features. Defaults to None.
+    custom_functions : dict, optional
+        Dictionary of custom feature functions to be evaluated for the given
+        time series, or a dictionary representing a dask graph of function
+        evaluations; see `featurize_time_series`.
+    featurizer : Featurizer, optional
+        Executor whose worker processes are used to featurize chunks
+        concurrently. By default, chunks are featurized serially in the
+        current process.
+    chunk_size : int, optional
+        Number of time series in each yielded featureset. Defaults to 1.
+    max_in_flight : int, optional
+        Maximum number of chunks being featurized (or waiting to be yielded)
+        at once when using a `featurizer`. Defaults to twice the number of
+        workers.
+    cache : cache.FeatureCache, optional
+        Cache of previously computed feature values; only features that are
+        not found in the cache are computed (and then added to it). Defaults
+        to None.
+
+    Yields
+    ------
+    Featureset
+        Featureset containing `chunk_size` (or, for the last chunk, fewer)
+        time series, with `data_vars` containing feature values and `coords`
+        containing labels (`name`) and targets (`target`), if applicable.
+    """
+    iterator = iter(source)
+    chunks = iter(lambda: list(islice(iterator, chunk_size)), [])
+    args = (features_to_use, custom_script_path, custom_functions, cache)
+    if featurizer is None:
+        for chunk in chunks:
+            yield _finalize_targets(_featurize_chunk(chunk, *args))
+        return
+
+    if max_in_flight is None:
+        max_in_flight = 2 * featurizer.n_workers
+    in_flight = collections.deque()
+    for chunk in chunks:
+        if len(in_flight) >= max_in_flight:
+            yield _finalize_targets(in_flight.popleft().get())
+        in_flight.append(featurizer.submit(_featurize_chunk, chunk, *args))
+    while in_flight:
+        yield _finalize_targets(in_flight.popleft().get())
 
 
 def featurize_ts_files(ts_paths, features_to_use, output_path=None,
                        custom_script_path=None, custom_functions=None,
-                       scheduler=dask.multiprocessing.get):
+                       scheduler=dask.multiprocessing.get, cache=None):
     """Feature generation function for on-disk time series (NetCDF) files.
 
     By default, computes features concurrently using the
     `dask.multiprocessing.get` scheduler. Other possible options include
     `dask.async.get_sync` for synchronous computation (e.g., when debugging),
-    or `dask.distributed.Executor.get` for distributed computation.
+    `dask.distributed.Executor.get` for distributed computation, or a
+    `Featurizer` that reuses the same worker processes (or threads) across
+    calls.
 
     In the case of multichannel measurements, each channel will be
     featurized separately, and the data variables of the output
@@ -314,9 +875,15 @@ def featurize_ts_files(ts_paths, features_to_use, output_path=None,
         dask graph, these arrays should be referenced as 't', 'm', 'e',
         respectively, and any values with keys present in `features_to_use`
         will be computed.
-    scheduler : function, optional
+    scheduler : function or Featurizer, optional
         `dask` scheduler function used to perform feature extraction
-        computation. Defaults to `dask.multiprocessing.get`.
+        computation, or a `Featurizer` whose persistent worker pool should be
+        used (e.g. `Featurizer(threads=True)` to featurize in multiple threads
+        of the current process). Defaults to `dask.multiprocessing.get`.
+    cache : cache.FeatureCache, optional
+        Cache of previously computed feature values; only features that are
+        not found in the cache are computed (and then added to it). Defaults
+        to None.
 
     Returns
     -------
@@ -324,14 +891,11 @@ def featurize_ts_files(ts_paths, features_to_use, output_path=None,
         Featureset with `data_vars` containing feature values and `coords`
         containing labels (`name`) and targets (`target`), if applicable.
     """
-    all_time_series = [delayed(time_series.from_netcdf, pure=True)(ts_path)
-                       for ts_path in ts_paths]
-    all_features = [delayed(featurize_single_ts, pure=True)(ts, features_to_use,
-                                                            custom_script_path,
-                                                            custom_functions)
-                    for ts in all_time_series]
-    result = delayed(assemble_featureset, pure=True)(all_features, all_time_series)
-    fset = result.compute(get=scheduler)
+    ts_paths = list(ts_paths)
+    fset = _featurize_chunked(ts_paths,
+                              [os.path.getsize(path) for path in ts_paths],
+                              features_to_use, custom_script_path,
+                              custom_functions, scheduler, cache)
     if output_path:
         fset.to_netcdf(output_path)
 
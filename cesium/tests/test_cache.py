@@ -0,0 +1,117 @@
+import multiprocessing.pool
+import os
+import pickle
+import shutil
+import tempfile
+
+import numpy as np
+import numpy.testing as npt
+
+from cesium import featurize
+from cesium.cache import FeatureCache
+from cesium.tests.fixtures import sample_values
+
+
+def setup(module):
+    module.TEMP_DIR = tempfile.mkdtemp()
+
+
+def teardown(module):
+    shutil.rmtree(module.TEMP_DIR)
+
+
+def test_feature_cache_featurize():
+    """Test that cached feature values are reused by `featurize_single_ts`"""
+    cache = FeatureCache(os.path.join(TEMP_DIR, 'featurize'))
+    ts = featurize.TimeSeries(*sample_values(channels=2))
+    features_to_use = ['amplitude', 'freq1_freq']
+    expected = featurize.featurize_single_ts(ts, features_to_use)
+
+    cached = featurize.featurize_single_ts(ts, features_to_use, cache=cache)
+    assert cache.stats == {'hits': 0, 'misses': 4, 'memory_hits': 0,
+                           'disk_hits': 0}
+    cached = featurize.featurize_single_ts(ts, features_to_use, cache=cache)
+    assert cache.stats['hits'] == cache.stats['memory_hits'] == 4
+    for feature in features_to_use:
+        npt.assert_allclose(cached[feature], expected[feature])
+
+    # Only the new feature is missing; values are read back from disk
+    other_cache = FeatureCache(cache.path)
+    featurize.featurize_single_ts(ts, features_to_use + ['std_err'],
+                                  cache=other_cache)
+    assert other_cache.stats == {'hits': 4, 'misses': 2, 'memory_hits': 0,
+                                 'disk_hits': 4}
+
+    # Different custom functions for the same name are cached separately
+    custom_cached = featurize.featurize_single_ts(
+        ts, ['amplitude'], custom_functions={'amplitude': lambda t, m, e: -1.},
+        cache=cache)
+    npt.assert_allclose(custom_cached['amplitude'], [-1., -1.])
+
+
+def test_feature_cache_eviction():
+    """Test LRU eviction and pickling of FeatureCache"""
+    cache = FeatureCache(os.path.join(TEMP_DIR, 'eviction'), max_size=2000)
+    keys = [cache.series_key(*sample_values()) for i in range(20)]
+    for key in keys:
+        cache.store(key, {'feature': np.arange(10.)})
+    cache.evict()
+    sizes = [os.path.getsize(os.path.join(d, f))
+             for d, _, files in os.walk(cache.path) for f in files]
+    assert 0 < sum(sizes) <= 2000
+    assert pickle.loads(pickle.dumps(cache)) is cache
+
+    cache._memory.clear()
+    found = [key for key in keys if cache.lookup(key, ['feature'])]
+    assert found == keys[-len(found):]
+
+
+def test_feature_cache_intermediates():
+    """Test that persisted intermediate models are reused for new features"""
+    cache = FeatureCache(os.path.join(TEMP_DIR, 'intermediates'),
+                         persist_intermediates=True)
+    ts = featurize.TimeSeries(*sample_values())
+    featurize.featurize_single_ts(ts, ['freq1_freq'], cache=cache)
+    key = cache.series_key(ts.time, ts.measurement, ts.error)
+    signature = featurize._feature_plan(['freq1_freq']).signatures[
+        '_lomb_model']
+    lomb_model = cache.lookup(key, [signature])[signature]
+    assert 'model' not in lomb_model['freq_fits'][0]
+    assert 'resid' in lomb_model['freq_fits'][0]
+
+    features_to_use = ['freq2_freq', 'scatter_res_raw', 'medperc90_2p_p']
+    expected = featurize.featurize_single_ts(ts, features_to_use)
+    other_cache = FeatureCache(cache.path, persist_intermediates=True)
+    cached = featurize.featurize_single_ts(ts, features_to_use,
+                                           cache=other_cache)
+    assert other_cache.stats['misses'] == len(features_to_use)
+    for feature in features_to_use:
+        npt.assert_allclose(cached[feature], expected[feature])
+
+    # The stored model is used instead of fitting a new one
+    lomb_model['freq_fits'][2]['freq'] = 123.
+    cache.store(key, {signature: lomb_model})
+    other_cache._memory.clear()
+    cached = featurize.featurize_single_ts(ts, ['freq3_freq'],
+                                           cache=other_cache)
+    npt.assert_allclose(cached['freq3_freq'], 123.)
+
+
+def test_feature_cache_concurrent_store():
+    """Test that concurrent writers of the same entry do not drop values"""
+    path = os.path.join(TEMP_DIR, 'concurrent')
+    key = FeatureCache.series_key(*sample_values())
+
+    def store_values(i):
+        cache = FeatureCache(path)
+        for j in range(20):
+            cache.store(key, {'feature_{}_{}'.format(i, j): float(j)})
+
+    pool = multiprocessing.pool.ThreadPool(8)
+    pool.map(store_values, range(8))
+    pool.close()
+
+    signatures = ['feature_{}_{}'.format(i, j)
+                  for i in range(8) for j in range(20)]
+    found = FeatureCache(path).lookup(key, signatures)
+    assert sorted(found) == sorted(signatures)
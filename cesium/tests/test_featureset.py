@@ -4,7 +4,9 @@ import numpy as np
 import numpy.testing as npt
 import scipy.stats
 import xarray as xr
-from cesium.tests.fixtures import sample_featureset
+from dask.async import get_sync
+from cesium import featurize
+from cesium.tests.fixtures import sample_featureset, sample_values
 
 
 def test_repr():
@@ -48,3 +50,32 @@ def test_indexing():
     assert all(fset[['a', 'b']] == fset.sel(name=['a', 'b']))
     npt.assert_allclose(fset['amplitude'].values.ravel(),
                         fset.data_vars['amplitude'].values.ravel())
+
+
+def test_extend():
+    """Test adding features to an existing Featureset."""
+    n_series = 5
+    list_of_series = [sample_values(channels=2) for i in range(n_series)]
+    times, values, errors = [list(x) for x in zip(*list_of_series)]
+    labels = ['ts{}'.format(i) for i in range(n_series)]
+    fset = featurize.featurize_time_series(times, values, errors, ['std_err'],
+                                           labels=labels, scheduler=get_sync)
+    std_err = fset.std_err.values.copy()
+
+    # Time series in a different order than in the featureset
+    all_time_series = [featurize.TimeSeries(t, m, e, name=label)
+                       for t, m, e, label in zip(times, values, errors,
+                                                 labels)][::-1]
+    extended = fset.extend(all_time_series, ['std_err', 'freq1_freq',
+                                             'amplitude'], chunk_size=2)
+    assert extended is fset
+    npt.assert_array_equal(sorted(fset.data_vars),
+                           ['amplitude', 'freq1_freq', 'std_err'])
+    npt.assert_array_equal(fset.name, labels)
+    npt.assert_array_equal(fset.std_err.values, std_err)
+    expected = featurize.featurize_time_series(times, values, errors,
+                                               ['freq1_freq', 'amplitude'],
+                                               labels=labels,
+                                               scheduler=get_sync)
+    npt.assert_allclose(fset.freq1_freq, expected.freq1_freq)
+    npt.assert_allclose(fset.amplitude, expected.amplitude)
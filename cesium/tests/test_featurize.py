@@ -1,4 +1,4 @@
-from nose.tools import with_setup
+from nose.tools import assert_raises, with_setup
 import numpy.testing as npt
 import os
 from os.path import join as pjoin
@@ -10,6 +10,8 @@ from dask.async import get_sync
 
 from cesium import featurize
 from cesium import util
+from cesium.features import time_cache
+from cesium.time_series import TimeSeries
 from cesium.tests.fixtures import sample_values, sample_ts_files
 
 
@@ -107,6 +109,37 @@ def test_featurize_time_series_single_multichannel():
     npt.assert_array_equal(fset.target.values, ['class1'])
 
 
+def test_featurize_single_ts_shared_times():
+    """Test that steps depending on shared times/errors are computed once"""
+    n_channels = 3
+    t, m, e = sample_values(channels=n_channels)
+    calls = []
+
+    def time_feature(t):
+        calls.append(t)
+        return t.mean()
+
+    custom_functions = {'time_feature': (time_feature, 't'),
+                        'value_feature': (lambda m: m.mean(), 'm')}
+    features_to_use = ['n_epochs', 'total_time', 'cads_std', 'std_err',
+                       'amplitude', 'time_feature', 'value_feature']
+    ts = TimeSeries(t, m, e[0])
+    max_bytes = time_cache.TIME_GRID_CACHE.max_bytes
+    time_cache.TIME_GRID_CACHE.max_bytes = 0  # disable time grid cache
+    try:
+        values = featurize.featurize_single_ts(
+            ts, features_to_use, custom_functions=custom_functions)
+    finally:
+        time_cache.TIME_GRID_CACHE.max_bytes = max_bytes
+    assert len(calls) == 1
+    for i, (t_i, m_i, e_i) in enumerate(ts.channels()):
+        expected = featurize.featurize_single_ts(
+            TimeSeries(t_i, m_i, e_i), features_to_use,
+            custom_functions=custom_functions)
+        for feature in features_to_use:
+            npt.assert_equal(values[feature][i], expected[feature][0])
+
+
 def test_featurize_time_series_multiple():
     """Test featurize wrapper function for multiple time series"""
     n_series = 5
@@ -144,6 +177,140 @@ def test_featurize_time_series_multiple_multichannel():
     npt.assert_array_equal(fset.target.values, targets)
 
 
+def test_featurize_time_series_batch():
+    """Test that batchable features match per-series featurization"""
+    n_series = 5
+    n_channels = 3
+    list_of_series = [sample_values(channels=n_channels)
+                      for i in range(n_series)]
+    times, values, errors = [list(x) for x in zip(*list_of_series)]
+    features_to_use = ['amplitude', 'median', 'stetson_k']
+    meta_features = {'meta1': 0.5}
+    fset = featurize.featurize_time_series(times, values, errors,
+                                           features_to_use,
+                                           meta_features=meta_features,
+                                           scheduler=get_sync)
+    npt.assert_array_equal(sorted(fset.data_vars),
+                           ['amplitude', 'median', 'meta1', 'stetson_k'])
+    npt.assert_array_equal(fset.channel, np.arange(n_channels))
+    for i, (t, m, e) in enumerate(list_of_series):
+        ts = featurize.TimeSeries(t, m, e)
+        expected = featurize.featurize_single_ts(ts, features_to_use)
+        for feature in features_to_use:
+            npt.assert_allclose(fset[feature].values[i], expected[feature])
+
+
+def test_featurizer_persistent_pool():
+    """Test featurization with a reusable worker pool"""
+    n_series = 5
+    list_of_series = [sample_values() for i in range(n_series)]
+    times, values, errors = [list(x) for x in zip(*list_of_series)]
+    features_to_use = ['amplitude', 'std_err']
+    expected = featurize.featurize_time_series(times, values, errors,
+                                               features_to_use,
+                                               scheduler=get_sync)
+    with featurize.Featurizer(2, features_to_use) as featurizer:
+        pool = featurizer.pool
+        for i in range(2):
+            fset = featurize.featurize_time_series(times, values, errors,
+                                                   features_to_use,
+                                                   scheduler=featurizer)
+            assert featurizer.pool is pool
+            for feature in features_to_use:
+                npt.assert_allclose(fset[feature], expected[feature])
+        with sample_ts_files(size=4) as ts_paths:
+            fset = featurize.featurize_ts_files(ts_paths, ['std_err'],
+                                                scheduler=featurizer)
+        assert("std_err" in fset.data_vars)
+    assert featurizer.pool is None
+
+
+def test_featurizer_threads():
+    """Test featurization with a reusable thread pool"""
+    list_of_series = [sample_values() for i in range(5)]
+    times, values, errors = [list(x) for x in zip(*list_of_series)]
+    features_to_use = ['amplitude', 'freq1_freq']
+    expected = featurize.featurize_time_series(times, values, errors,
+                                               features_to_use,
+                                               scheduler=get_sync)
+    with featurize.Featurizer(2, threads=True) as featurizer:
+        fset = featurize.featurize_time_series(times, values, errors,
+                                               features_to_use,
+                                               scheduler=featurizer)
+        for feature in features_to_use:
+            npt.assert_allclose(fset[feature], expected[feature])
+        assert featurizer.submit(len, times).get() == len(times)
+    assert_raises(ValueError, featurize.Featurizer, threads=True,
+                  shared_memory=True)
+
+
+def test_featurizer_shared_memory():
+    """Test featurization with shared-memory transport to the workers"""
+    n_series = 5
+    n_channels = 3
+    list_of_series = [sample_values(channels=n_channels)
+                      for i in range(n_series)]
+    times, values, errors = [list(x) for x in zip(*list_of_series)]
+    features_to_use = ['amplitude', 'std_err', 'test_f']
+    meta_features = {'meta1': 0.5}
+    custom_functions = {'test_f': (lambda x, y: x * y, 'amplitude', 'meta1')}
+    expected = featurize.featurize_time_series(
+        times, values, errors, features_to_use, meta_features=meta_features,
+        custom_functions=custom_functions, scheduler=get_sync)
+    with featurize.Featurizer(2, shared_memory=True) as featurizer:
+        fset = featurize.featurize_time_series(
+            times, values, errors, features_to_use,
+            meta_features=meta_features, custom_functions=custom_functions,
+            scheduler=featurizer)
+    npt.assert_array_equal(sorted(fset.data_vars),
+                           ['amplitude', 'meta1', 'std_err', 'test_f'])
+    for feature in features_to_use:
+        npt.assert_allclose(fset[feature], expected[feature])
+
+
+def test_featurize_time_series_chunked():
+    """Test that chunked featurization preserves the order of time series"""
+    n_series = 50
+    list_of_series = [sample_values(size=np.random.randint(10, 200))
+                      for i in range(n_series)]
+    times, values, errors = [list(x) for x in zip(*list_of_series)]
+    features_to_use = ['amplitude', 'std_err']
+    labels = ['ts{}'.format(i) for i in range(n_series)]
+    targets = np.arange(n_series) % 2
+    fset = featurize.featurize_time_series(times, values, errors,
+                                           features_to_use, targets,
+                                           labels=labels, scheduler=get_sync)
+    npt.assert_array_equal(fset.name, labels)
+    npt.assert_array_equal(fset.target, targets)
+    for i, (t, m, e) in enumerate(list_of_series):
+        npt.assert_allclose(fset.std_err.values[i], np.std(e))
+
+
+def test_iter_featurize():
+    """Test streaming featurization of time series from an iterable"""
+    n_series = 7
+    list_of_series = [sample_values() for i in range(n_series)]
+    features_to_use = ['amplitude', 'std_err']
+    all_time_series = (featurize.TimeSeries(t, m, e, name=i)
+                       for i, (t, m, e) in enumerate(list_of_series))
+    fsets = list(featurize.iter_featurize(all_time_series, features_to_use,
+                                          chunk_size=3))
+    npt.assert_array_equal([len(fset.name) for fset in fsets], [3, 3, 1])
+    fset = xr.concat(fsets, dim='name')
+    npt.assert_array_equal(fset.name, np.arange(n_series))
+    for i, (t, m, e) in enumerate(list_of_series):
+        npt.assert_allclose(fset.std_err.values[i], np.std(e))
+
+    with sample_ts_files(size=4, targets=['class1', 'class2']) as ts_paths:
+        with featurize.Featurizer(2) as featurizer:
+            fsets = list(featurize.iter_featurize(ts_paths, features_to_use,
+                                                  featurizer=featurizer,
+                                                  max_in_flight=1))
+    assert len(fsets) == 4
+    npt.assert_array_equal([fset.target.values[0] for fset in fsets],
+                           ['class1', 'class2', 'class1', 'class2'])
+
+
 def test_featurize_time_series_uneven_multichannel():
     """Test featurize wrapper function for uneven-length multichannel data"""
     n_channels = 3
@@ -154,6 +154,20 @@ def test_channels_iterator():
         npt.assert_allclose(e_i, e[i])
 
 
+def test_shared_inputs():
+    n_channels = 3
+    t, m, e = sample_time_series(channels=n_channels)
+    assert TimeSeries(t[0], m[0], e[0]).shared_inputs() == ['t', 'e']
+    assert TimeSeries(t[0], m, e).shared_inputs() == ['t']
+    assert TimeSeries(np.tile(t[0], (n_channels, 1)), m,
+                      e[0]).shared_inputs() == ['t', 'e']
+    assert TimeSeries(t, m, e).shared_inputs() == []
+    t = [t[i][0:i+2] for i in range(len(t))]
+    m = [m[i][0:i+2] for i in range(len(m))]
+    e = [e[i][0:i+2] for i in range(len(e))]
+    assert TimeSeries(t, m, e).shared_inputs() == []
+
+
 @with_setup(teardown=teardown)
 def test_time_series_netCDF():
     n_channels = 3
@@ -247,6 +247,18 @@ class TimeSeries(object):
             e_channels = [self.error] * self.n_channels
         return zip(t_channels, m_channels, e_channels)
 
+    def shared_inputs(self):
+        """Return the names ('t' and/or 'e') of the time and error arrays that
+        are shared by all channels, i.e. that were provided as a single 1d
+        array or whose channels are all equal.
+        """
+        shared = []
+        for name, x in (('t', self.time), ('e', self.error)):
+            if (isinstance(x, np.ndarray) and
+                (x.ndim == 1 or x.strides[0] == 0 or (x == x[0]).all())):
+                shared.append(name)
+        return shared
+
     def to_netcdf(self, path=None):
         """Store TimeSeries object as a single netCDF.
 